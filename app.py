@@ -1,134 +1,174 @@
 
+import argparse
 import subprocess
 import webbrowser
-import time
 import sys
 import os
 import shutil
-import requests
 
+from backend.server import default_worker_count, wait_until_healthy
 
-# Paths to backend and frontend start commands
-BACKEND_CMD = [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", "8001"]
-FRONTEND_CMD = ["cmd", "/c", "npm run dev"]
 
-
-# Detect frontend directory (project root or 'app' subfolder)
-PROJECT_ROOT = os.path.dirname(__file__)
-FRONTEND_DIR = None
-if os.path.exists(os.path.join(PROJECT_ROOT, "package.json")):
-    FRONTEND_DIR = PROJECT_ROOT
-elif os.path.exists(os.path.join(PROJECT_ROOT, "app", "package.json")):
-    FRONTEND_DIR = os.path.join(PROJECT_ROOT, "app")
-
-
-# Check if npm is available and package.json exists
-if shutil.which("npm") is None:
-    print("Error: npm is not installed or not in your PATH. Please install Node.js and npm.")
-    sys.exit(1)
-if FRONTEND_DIR is None:
-    print("Error: Could not find package.json for frontend in project root or ./app. Please check your project structure.")
-    sys.exit(1)
-if not os.path.exists(os.path.join(FRONTEND_DIR, "package.json")):
-    print(f"Error: package.json not found in {FRONTEND_DIR}. Please ensure your frontend is set up correctly.")
-    sys.exit(1)
+BACKEND_HOST = "127.0.0.1"
+BACKEND_PORT = 8001
+BACKEND_HEALTH_URL = f"http://{BACKEND_HOST}:{BACKEND_PORT}/health"
 
 # Main website URL
 MAIN_URL = "http://localhost:3000"
 
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Start the backend and frontend")
+    parser.add_argument("--prod", action="store_true",
+                        help="production mode: multi-worker backend and `npm run build` + `npm run start`")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="backend worker processes in production mode (default: CPU count)")
+    parser.add_argument("--no-preload", action="store_true",
+                        help="import the app in each worker instead of once before forking")
+    parser.add_argument("--skip-build", action="store_true", help="skip `npm run build` in production mode")
+    parser.add_argument("--no-browser", action="store_true", help="don't open the website when ready")
+    return parser.parse_args()
+
+
+def backend_command(args):
+    if not args.prod:
+        return [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", BACKEND_HOST, "--port", str(BACKEND_PORT)]
+    cmd = [sys.executable, "-m", "backend.server", "--host", BACKEND_HOST, "--port", str(BACKEND_PORT),
+           "--workers", str(args.workers or default_worker_count())]
+    if args.no_preload:
+        cmd.append("--no-preload")
+    return cmd
+
+
+def npm_command(*npm_args):
+    # Resolve npm (npm.cmd on Windows) instead of going through `cmd /c`
+    return [shutil.which("npm"), *npm_args]
+
+
+def find_frontend_dir():
+    """Detect frontend directory (project root or 'app' subfolder)"""
+    if os.path.exists(os.path.join(PROJECT_ROOT, "package.json")):
+        return PROJECT_ROOT
+    if os.path.exists(os.path.join(PROJECT_ROOT, "app", "package.json")):
+        return os.path.join(PROJECT_ROOT, "app")
+    return None
+
+
+def run_backend_setup():
+    """Run backend setup script to ensure dependencies are installed"""
+    setup_script = os.path.join("backend", "setup_backend.bat")
+    if os.name != "nt":
+        return
+    if os.path.exists(setup_script):
+        print("Running backend/setup_backend.bat to install backend dependencies...")
+        setup_result = subprocess.run(["cmd", "/c", setup_script], cwd=PROJECT_ROOT)
+        if setup_result.returncode != 0:
+            print("Error: setup_backend.bat failed. Please check the script output above.")
+            sys.exit(1)
+    else:
+        print("Warning: setup_backend.bat not found. Skipping backend setup.")
 
 
-# Run backend setup script to ensure dependencies are installed
-setup_script = os.path.join("backend", "setup_backend.bat")
-if os.path.exists(setup_script):
-    print("Running backend/setup_backend.bat to install backend dependencies...")
-    setup_result = subprocess.run(["cmd", "/c", setup_script], cwd=PROJECT_ROOT)
-    if setup_result.returncode != 0:
-        print("Error: setup_backend.bat failed. Please check the script output above.")
-        sys.exit(1)
-else:
-    print("Warning: setup_backend.bat not found. Skipping backend setup.")
+def stop(proc):
+    proc.terminate()
+    proc.wait()
 
 
-# Start backend
-backend_proc = subprocess.Popen(BACKEND_CMD)
+def start_backend(cmd, timeout):
+    """Start the backend and wait (with backoff) until /health answers"""
+    backend_proc = subprocess.Popen(cmd, cwd=PROJECT_ROOT)
+    if wait_until_healthy(BACKEND_HEALTH_URL, timeout=timeout, proc=backend_proc):
+        print("Backend health check passed.")
+        return backend_proc
 
-# Wait for backend to become healthy
-backend_healthy = False
-for i in range(20):  # Try for up to 10 seconds
-    try:
-        resp = requests.get("http://127.0.0.1:8001/health", timeout=0.5)
-        if resp.status_code == 200:
-            backend_healthy = True
-            print("Backend health check passed.")
-            break
-    except Exception:
-        pass
-    time.sleep(0.5)
-if not backend_healthy:
     print("Backend health check failed. Attempting to install backend requirements and retry...")
-    backend_proc.terminate()
-    backend_proc.wait()
+    stop(backend_proc)
     # Try to install requirements.txt if it exists
     req_path = os.path.join("backend", "requirements.txt")
-    if os.path.exists(req_path):
-        # Check if pip is available
-        import importlib.util
-        pip_spec = importlib.util.find_spec("pip")
-        if pip_spec is None:
-            print("pip is not installed in your Python environment. Please install pip and run setup_backend.bat manually.")
-            sys.exit(1)
-        print("Installing backend requirements with pip...")
-        pip_result = subprocess.run([sys.executable, "-m", "pip", "install", "-r", req_path], cwd=PROJECT_ROOT)
-        if pip_result.returncode != 0:
-            print("Error: pip install failed. Please check requirements.txt and your Python environment.")
-            sys.exit(1)
-        # Try to start backend again
-        backend_proc = subprocess.Popen(BACKEND_CMD)
-        for i in range(20):
-            try:
-                resp = requests.get("http://127.0.0.1:8001/health", timeout=0.5)
-                if resp.status_code == 200:
-                    backend_healthy = True
-                    print("Backend health check passed after installing requirements.")
-                    break
-            except Exception:
-                pass
-            time.sleep(0.5)
-        if not backend_healthy:
-            print("Error: Backend health check still failed after installing requirements. The backend server did not start or /health endpoint is not available.")
-            backend_proc.terminate()
-            backend_proc.wait()
-            sys.exit(1)
-    else:
+    if not os.path.exists(req_path):
         print("Error: Backend health check failed and requirements.txt not found. The backend server did not start or /health endpoint is not available.")
         sys.exit(1)
-
-# Start frontend (in detected frontend directory)
-try:
-    frontend_proc = subprocess.Popen(FRONTEND_CMD, cwd=FRONTEND_DIR)
-except FileNotFoundError as e:
-    print(f"Error starting frontend: {e}\nCheck if npm is installed and package.json exists in {FRONTEND_DIR}.")
-    backend_proc.terminate()
-    backend_proc.wait()
+    # Check if pip is available
+    import importlib.util
+    pip_spec = importlib.util.find_spec("pip")
+    if pip_spec is None:
+        print("pip is not installed in your Python environment. Please install pip and run setup_backend.bat manually.")
+        sys.exit(1)
+    print("Installing backend requirements with pip...")
+    pip_result = subprocess.run([sys.executable, "-m", "pip", "install", "-r", req_path], cwd=PROJECT_ROOT)
+    if pip_result.returncode != 0:
+        print("Error: pip install failed. Please check requirements.txt and your Python environment.")
+        sys.exit(1)
+    # Try to start backend again
+    backend_proc = subprocess.Popen(cmd, cwd=PROJECT_ROOT)
+    if wait_until_healthy(BACKEND_HEALTH_URL, timeout=timeout, proc=backend_proc):
+        print("Backend health check passed after installing requirements.")
+        return backend_proc
+    print("Error: Backend health check still failed after installing requirements. The backend server did not start or /health endpoint is not available.")
+    stop(backend_proc)
     sys.exit(1)
 
-# Wait for servers to start
-print("Starting backend and frontend...")
-time.sleep(5)
-
-# Open the main website
-print(f"\nYour app is running at: {MAIN_URL}\n")
-webbrowser.open(MAIN_URL)
-
-try:
-    # Wait for the frontend process to exit (user closes site/dev server)
-    frontend_proc.wait()
-finally:
-    # On exit, terminate backend and frontend
-    print("Shutting down backend and frontend...")
-    backend_proc.terminate()
-    frontend_proc.terminate()
-    backend_proc.wait()
-    frontend_proc.wait()
-    print("All processes closed.")
+
+def main():
+    args = parse_args()
+    frontend_dir = find_frontend_dir()
+
+    # Check if npm is available and package.json exists
+    if shutil.which("npm") is None:
+        print("Error: npm is not installed or not in your PATH. Please install Node.js and npm.")
+        sys.exit(1)
+    if frontend_dir is None:
+        print("Error: Could not find package.json for frontend in project root or ./app. Please check your project structure.")
+        sys.exit(1)
+
+    run_backend_setup()
+
+    # Production workers import the app before forking, so give them longer to come up
+    backend_proc = start_backend(backend_command(args), timeout=60 if args.prod else 30)
+    if args.prod:
+        print(f"Backend supervisor running with pid {backend_proc.pid}. "
+              f"Send it SIGHUP for a rolling restart of the workers.")
+
+    # Start frontend (in detected frontend directory)
+    try:
+        if args.prod and not args.skip_build:
+            print("Building frontend (npm run build)...")
+            if subprocess.run(npm_command("run", "build"), cwd=frontend_dir).returncode != 0:
+                print("Error: npm run build failed.")
+                stop(backend_proc)
+                sys.exit(1)
+        frontend_proc = subprocess.Popen(npm_command("run", "start" if args.prod else "dev"), cwd=frontend_dir)
+    except FileNotFoundError as e:
+        print(f"Error starting frontend: {e}\nCheck if npm is installed and package.json exists in {frontend_dir}.")
+        stop(backend_proc)
+        sys.exit(1)
+
+    # Wait for the frontend to start serving
+    print("Starting backend and frontend...")
+    if not wait_until_healthy(MAIN_URL, timeout=120, proc=frontend_proc):
+        print("Warning: frontend did not respond yet; it may still be compiling.")
+
+    # Open the main website
+    print(f"\nYour app is running at: {MAIN_URL}\n")
+    if not args.no_browser:
+        webbrowser.open(MAIN_URL)
+
+    try:
+        # Wait for the frontend process to exit (user closes site/dev server)
+        frontend_proc.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # On exit, terminate backend and frontend
+        print("Shutting down backend and frontend...")
+        backend_proc.terminate()
+        frontend_proc.terminate()
+        backend_proc.wait()
+        frontend_proc.wait()
+        print("All processes closed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,19 +19,19 @@ import {
 import { useOCR, useBackendHealth } from "@/hooks/use-ai-backend"
 
 export default function NotebotPage() {
-  const [uploadedFile, setUploadedFile] = useState<File | null>(null)
+  const [uploadedFiles, setUploadedFiles] = useState<File[]>([])
   const [processingStep, setProcessingStep] = useState<"" | "ocr">("")
 
   // Backend hooks
-  const { extractText, isLoading: ocrLoading, error: ocrError } = useOCR()
+  const { extractText, extractTextFromPages, isLoading: ocrLoading, error: ocrError } = useOCR()
   const { isHealthy, isLoading: healthLoading } = useBackendHealth()
 
   const handleFileUpload = (event: React.ChangeEvent<HTMLInputElement>) => {
-    const file = event.target.files?.[0]
-    if (file) {
+    const files = Array.from(event.target.files ?? [])
+    if (files.length) {
       const supportedTypes = ['application/pdf', 'image/jpeg', 'image/png', 'image/jpg']
-      if (supportedTypes.includes(file.type)) {
-        setUploadedFile(file)
+      if (files.every((file) => supportedTypes.includes(file.type))) {
+        setUploadedFiles(files)
       } else {
         alert("Please upload a PDF or image file (JPEG, PNG)")
       }
@@ -39,15 +39,16 @@ export default function NotebotPage() {
   }
 
   const handleProcessFile = async () => {
-    if (!uploadedFile) return
+    if (!uploadedFiles.length) return
 
     try {
       setProcessingStep("ocr")
-      
 
-      // Use extractText for both images and PDFs
-      console.log("📸 Calling extractText with file:", uploadedFile.name, uploadedFile.type)
-      const text = await extractText(uploadedFile) || ""
+      // Use extractText for both images and PDFs; several pages are OCR'd in parallel in one upload session
+      console.log("📸 Extracting text from:", uploadedFiles.map((file) => file.name))
+      const text = (uploadedFiles.length === 1
+        ? await extractText(uploadedFiles[0])
+        : await extractTextFromPages(uploadedFiles)) || ""
       console.log("📝 OCR result:", text)
 
       if (!text) {
@@ -59,7 +60,7 @@ export default function NotebotPage() {
       // Navigate to results page with extracted text
       const params = new URLSearchParams({
         text: text,
-        filename: uploadedFile.name
+        filename: uploadedFiles.length === 1 ? uploadedFiles[0].name : `${uploadedFiles.length} pages`
       })
       window.location.href = `/notebot/results?${params.toString()}`
 
@@ -147,6 +148,7 @@ export default function NotebotPage() {
                 <Input
                   type="file"
                   accept=".pdf,.jpg,.jpeg,.png"
+                  multiple
                   onChange={handleFileUpload}
                   className="hidden"
                   id="file-upload"
@@ -158,14 +160,14 @@ export default function NotebotPage() {
                       Click to upload document or image
                     </p>
                     <p className="text-sm text-gray-500 dark:text-gray-400">
-                      PDF, JPEG, PNG files supported
+                      PDF, JPEG, PNG files supported; select several pages at once
                     </p>
                   </div>
                 </label>
               </div>
 
-              {uploadedFile && (
-                <div className="mt-4 p-4 bg-green-50 dark:bg-green-900/20 rounded-lg border border-green-200 dark:border-green-800">
+              {uploadedFiles.map((uploadedFile) => (
+                <div key={uploadedFile.name} className="mt-4 p-4 bg-green-50 dark:bg-green-900/20 rounded-lg border border-green-200 dark:border-green-800">
                   <div className="flex items-center justify-between">
                     <div className="flex items-center gap-2">
                       <CheckCircle className="h-5 w-5 text-green-600" />
@@ -176,11 +178,11 @@ export default function NotebotPage() {
                     </Badge>
                   </div>
                 </div>
-              )}
+              ))}
 
               <Button
                 onClick={handleProcessFile}
-                disabled={!uploadedFile || isProcessing || !isHealthy}
+                disabled={!uploadedFiles.length || isProcessing || !isHealthy}
                 className="w-full mt-4 bg-blue-600 hover:bg-blue-700"
               >
                 {isProcessing && processingStep === "ocr" ? (
@@ -0,0 +1,253 @@
+"""
+Lazily initialized Google AI clients.
+
+Importing google.generativeai and google.cloud.vision (and building the Vision
+client) takes seconds, so nothing here runs at import time. Each client is
+created on first use, or ahead of time by `warm_up()`.
+
+GEMINI_API_ENDPOINT, VISION_API_ENDPOINT and TTS_API_ENDPOINT point the
+clients at other hosts (e.g. the local stand-ins in backend/benchmarks);
+Gemini and Vision then use their REST transports.
+
+The calls that leave the process (generate_text, count_tokens, detect_text,
+synthesize_mp3) go through backend/cassette.py, so they can be recorded and
+replayed.
+"""
+import base64
+import importlib
+import io
+import os
+import threading
+import time
+
+from . import cassette, server_timing
+from .structured_log import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_MODEL = "gemini-2.0-flash-thinking-exp"
+GEMINI_REST_BASE = "https://generativelanguage.googleapis.com"
+TTS_TRANSLATE_HOST = "https://translate.google.com"
+
+# Rough per-call token costs used to charge the scheduler before the real usage is known
+IMAGE_TOKEN_ESTIMATE = 258
+OUTPUT_TOKEN_ESTIMATE = 1024
+
+# Heavy modules imported by warm_up() so the first real request doesn't pay for them
+WARM_UP_MODULES = [
+    "PIL.Image",
+    "PyPDF2",
+    "gtts",
+    "fpdf",
+    "reportlab.platypus",
+    "reportlab.lib.styles",
+    "requests",
+    "numpy",
+]
+
+_lock = threading.RLock()
+_genai = None
+_vision = None
+_vision_client = None
+_vision_init_attempted = False
+_tts_class = None
+
+
+def gemini_api_key():
+    return os.getenv("GEMINI_API_KEY")
+
+
+def gemini_configured():
+    key = gemini_api_key()
+    return bool(key and key != "your_gemini_api_key_here")
+
+
+def gemini_api_endpoint():
+    return os.getenv("GEMINI_API_ENDPOINT")
+
+
+def gemini_rest_base():
+    """Base URL for direct REST calls to the Gemini API"""
+    return (gemini_api_endpoint() or GEMINI_REST_BASE).rstrip("/")
+
+
+def vision_api_endpoint():
+    return os.getenv("VISION_API_ENDPOINT")
+
+
+def vision_credentials_path():
+    credentials_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+    if credentials_path and os.path.exists(credentials_path):
+        return credentials_path
+    return None
+
+
+def get_genai():
+    """Import and configure google.generativeai on first use"""
+    global _genai
+    if _genai is None:
+        with _lock:
+            if _genai is None:
+                import google.generativeai as genai
+                if gemini_configured() and gemini_api_endpoint():
+                    genai.configure(api_key=gemini_api_key(), transport="rest",
+                                    client_options={"api_endpoint": gemini_api_endpoint()})
+                    log.info("Gemini API configured", endpoint=gemini_api_endpoint())
+                elif gemini_configured():
+                    genai.configure(api_key=gemini_api_key())
+                    log.info("Gemini API configured successfully")
+                else:
+                    log.warning("Gemini API key not found or invalid")
+                _genai = genai
+    return _genai
+
+
+def get_model(model_name=DEFAULT_MODEL):
+    """Return a Gemini GenerativeModel, configuring the SDK if needed"""
+    return get_genai().GenerativeModel(model_name)
+
+
+def estimate_request_tokens(contents):
+    """Cheap token estimate for a generate_content request"""
+    from .token_budget import estimate_tokens
+    parts = contents if isinstance(contents, (list, tuple)) else [contents]
+    tokens = OUTPUT_TOKEN_ESTIMATE
+    for part in parts:
+        if isinstance(part, str):
+            tokens += estimate_tokens(part) + 1
+        else:
+            tokens += IMAGE_TOKEN_ESTIMATE
+    return tokens
+
+
+def generate_text(contents, model_name=DEFAULT_MODEL):
+    """Run one Gemini generate_content call through the scheduler and return the response text"""
+    from .gemini_scheduler import scheduler
+    estimate = estimate_request_tokens(contents)
+    with scheduler.slot(estimate) as usage:
+        result = cassette.call(
+            "gemini.generate_content",
+            {"model": model_name, "contents": contents},
+            lambda: _generate_content(contents, model_name),
+        )
+        usage["total_tokens"] = result["total_tokens"]
+    server_timing.add_tokens(result["total_tokens"])
+    return result["text"]
+
+
+def _generate_content(contents, model_name):
+    response = get_model(model_name).generate_content(contents)
+    usage_metadata = getattr(response, "usage_metadata", None)
+    total_tokens = getattr(usage_metadata, "total_token_count", 0) or None
+    return {"text": response.text, "total_tokens": total_tokens}
+
+
+def count_tokens(contents, model_name=DEFAULT_MODEL):
+    """Exact prompt token count from the Gemini count_tokens API"""
+    return cassette.call(
+        "gemini.count_tokens",
+        {"model": model_name, "contents": contents},
+        lambda: get_model(model_name).count_tokens(contents).total_tokens,
+    )
+
+
+def get_vision():
+    """Return the google.cloud.vision module, imported on first use"""
+    global _vision
+    if _vision is None:
+        with _lock:
+            if _vision is None:
+                from google.cloud import vision
+                _vision = vision
+    return _vision
+
+
+def get_vision_client():
+    """Return the Vision ImageAnnotatorClient, or None if it can't be created"""
+    global _vision_client, _vision_init_attempted
+    if not _vision_init_attempted:
+        with _lock:
+            if not _vision_init_attempted:
+                credentials_path = vision_credentials_path()
+                if credentials_path:
+                    log.info("Vision API credentials found", credentials_path=credentials_path)
+                try:
+                    if vision_api_endpoint():
+                        from google.auth.credentials import AnonymousCredentials
+                        _vision_client = get_vision().ImageAnnotatorClient(
+                            credentials=AnonymousCredentials(),
+                            transport="rest",
+                            client_options={"api_endpoint": vision_api_endpoint()},
+                        )
+                    else:
+                        _vision_client = get_vision().ImageAnnotatorClient()
+                except Exception as e:
+                    log.warning("Could not initialize Vision API client", error=str(e))
+                    _vision_client = None
+                _vision_init_attempted = True
+    return _vision_client
+
+
+def vision_available():
+    """Whether Vision OCR can be used, without forcing the client to be built"""
+    if vision_credentials_path() is None and not vision_api_endpoint():
+        return False
+    return _vision_client is not None or not _vision_init_attempted
+
+
+def new_tts(text, lang="en"):
+    """Return a gTTS instance for `text`, sending its requests to TTS_API_ENDPOINT if set"""
+    global _tts_class
+    from gtts import gTTS
+    endpoint = os.getenv("TTS_API_ENDPOINT")
+    if not endpoint:
+        return gTTS(text, lang=lang)
+    if _tts_class is None:
+        class RedirectedTTS(gTTS):
+            def _prepare_requests(self):
+                prepared = super()._prepare_requests()
+                for request in prepared:
+                    request.url = request.url.replace(TTS_TRANSLATE_HOST, os.environ["TTS_API_ENDPOINT"].rstrip("/"), 1)
+                return prepared
+        _tts_class = RedirectedTTS
+    return _tts_class(text, lang=lang)
+
+
+def detect_text(content):
+    """Vision TEXT_DETECTION on image bytes: {"text", "error"}, or None if Vision isn't available"""
+    def live():
+        client = get_vision_client()
+        if client is None:
+            return None
+        response = client.text_detection(image=get_vision().Image(content=content))
+        texts = response.text_annotations
+        return {"text": texts[0].description if texts else "", "error": response.error.message}
+    return cassette.call("vision.text_detection", {"image": content}, live)
+
+
+def synthesize_mp3(text, lang="en"):
+    """Render `text` to MP3 bytes with gTTS"""
+    def render():
+        buffer = io.BytesIO()
+        new_tts(text, lang=lang).write_to_fp(buffer)
+        return buffer.getvalue()
+    if cassette.mode() == cassette.OFF:
+        return render()
+
+    def live():
+        # Cassettes are JSON, so recorded audio is kept base64-encoded
+        return base64.b64encode(render()).decode("ascii")
+    return base64.b64decode(cassette.call("tts.gtts", {"text": text, "lang": lang}, live))
+
+
+def warm_up():
+    """Import heavy dependencies and build clients ahead of the first request"""
+    started = time.perf_counter()
+    for module_name in WARM_UP_MODULES:
+        try:
+            importlib.import_module(module_name)
+        except ImportError as e:
+            log.warning("Warm-up import failed", module=module_name, error=str(e))
+    get_genai()
+    get_vision_client()
+    log.info("Warm-up completed", duration_ms=round((time.perf_counter() - started) * 1000, 1))
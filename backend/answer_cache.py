@@ -0,0 +1,171 @@
+"""
+Semantic cache of NoteBot answers, per set of notes.
+
+Students working from the same notes ask the same things in different words
+("what is photosynthesis", "explain photosynthesis"). Each question is turned
+into an offline vector: hashed character 3- and 4-grams of its content words
+(question words like "what", "explain" are dropped) plus their word bigrams,
+so "did France invade Britain" and "did Britain invade France" don't match,
+L2-normalized. A new question is compared with the earlier questions on the
+same notes by cosine similarity (one NumPy matrix-vector product); above
+ANSWER_CACHE_THRESHOLD the earlier answer is returned without calling Gemini.
+Questions that differ in their numbers ("question 3" / "question 4"), in
+negation or in what they ask for ("when did ..." / "why did ...") never
+match; "what" and "which" ask the same as "explain".
+
+The cache is in memory and per worker process. Lookups, hits and the upstream
+time saved are exported as metrics.
+
+Environment:
+    ANSWER_CACHE            set to 0 to disable
+    ANSWER_CACHE_THRESHOLD  minimum cosine similarity for a hit (default 0.9)
+    ANSWER_CACHE_SIZE       questions kept per set of notes (default 256)
+    ANSWER_CACHE_NOTES      sets of notes kept (default 64, least recently used dropped)
+    ANSWER_CACHE_TTL        seconds an answer is reused (default 86400)
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from . import metrics
+
+DIMENSIONS = 4096
+NGRAM_SIZES = (3, 4)
+# Weight of each word bigram against a character n-gram
+BIGRAM_WEIGHT = 2.0
+QUESTION_WORDS = frozenset("""
+a an the is are was were be do does did can could would should will please
+what whats which who whom how why when where
+explain describe define tell me about give show list state say us i you
+of to in on for with this that these those it its and or
+meaning definition mean means
+""".split())
+# Interrogatives that ask for something else; "what" and "which" aren't among them
+INTERROGATIVES = {"who": "who", "whom": "who", "whose": "who", "when": "when", "where": "where", "why": "why", "how": "how"}
+NEGATIONS = frozenset(("not", "no", "never", "without", "except", "isn't", "aren't", "doesn't", "don't", "cannot", "can't"))
+_WORD = re.compile(r"[\w']+")
+
+lookups = metrics.counter("answer_cache_lookups_total", "NoteBot answer cache lookups, by result")
+saved_seconds = metrics.counter("answer_cache_saved_seconds_total", "Upstream time saved by NoteBot answer cache hits")
+entries_gauge = metrics.gauge("answer_cache_entries", "Questions held in the NoteBot answer cache")
+
+
+def enabled():
+    return os.getenv("ANSWER_CACHE", "1").lower() not in ("0", "false", "no", "off")
+
+
+def _features(question):
+    """(content text, words that must match exactly) of a question"""
+    words = _WORD.findall(question.lower())
+    content = [word for word in words if word not in QUESTION_WORDS]
+    guard = (
+        frozenset(word for word in words if word.isdigit()),
+        frozenset(word for word in words if word in NEGATIONS),
+        frozenset(INTERROGATIVES[word] for word in words if word in INTERROGATIVES),
+    )
+    return " ".join(content), guard
+
+
+def vectorize(text):
+    """Unit-length hashed character n-gram and word bigram vector of `text` (all zeros if empty)"""
+    import numpy as np
+    padded = f" {text} "
+    grams = [padded[i:i + n] for n in NGRAM_SIZES for i in range(len(padded) - n + 1)]
+    words = text.split()
+    # The \0 keeps bigrams apart from character n-grams; ^ and $ mark the first and last word
+    bigrams = [f"{first}\0{second}" for first, second in zip(["^"] + words, words + ["$"])] if words else []
+    features = grams + bigrams
+    indices = np.fromiter(
+        (zlib.crc32(feature.encode("utf-8")) % DIMENSIONS for feature in features), dtype=np.int64, count=len(features)
+    )
+    weights = np.ones(len(features))
+    weights[len(grams):] = BIGRAM_WEIGHT
+    vector = np.bincount(indices, weights=weights, minlength=DIMENSIONS).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class _Notes:
+    """Questions asked about one set of notes, as rows of a matrix"""
+
+    def __init__(self):
+        import numpy as np
+        self.matrix = np.zeros((0, DIMENSIONS), dtype=np.float32)
+        self.entries = []    # (question, guard, answer, upstream seconds, stored at)
+
+
+class AnswerCache:
+    def __init__(self, threshold=None, size=None, max_notes=None, ttl=None):
+        self.threshold = threshold if threshold is not None else float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.9"))
+        self.size = size or int(os.getenv("ANSWER_CACHE_SIZE", "256"))
+        self.max_notes = max_notes or int(os.getenv("ANSWER_CACHE_NOTES", "64"))
+        self.ttl = ttl or float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+        self._notes = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def notes_key(notes_context):
+        return hashlib.sha256(notes_context.encode("utf-8")).hexdigest()
+
+    def lookup(self, notes_context, question):
+        """{"answer", "question", "similarity", "saved_seconds"} of the best earlier match, or None"""
+        text, guard = _features(question)
+        vector = vectorize(text)
+        key = self.notes_key(notes_context)
+        now = time.time()
+        with self._lock:
+            notes = self._notes.get(key)
+            if notes is None or not notes.entries or not text:
+                lookups.inc(result="miss")
+                return None
+            self._notes.move_to_end(key)
+            scores = notes.matrix @ vector
+            for index in scores.argsort()[::-1]:
+                similarity = float(scores[index])
+                if similarity < self.threshold:
+                    break
+                cached_question, cached_guard, answer, seconds, stored_at = notes.entries[index]
+                if cached_guard == guard and now - stored_at <= self.ttl:
+                    lookups.inc(result="hit")
+                    saved_seconds.inc(seconds)
+                    return {"answer": answer, "question": cached_question, "similarity": similarity, "saved_seconds": seconds}
+        lookups.inc(result="miss")
+        return None
+
+    def store(self, notes_context, question, answer, seconds):
+        import numpy as np
+        text, guard = _features(question)
+        if not text:
+            return
+        vector = vectorize(text)
+        key = self.notes_key(notes_context)
+        with self._lock:
+            notes = self._notes.get(key)
+            if notes is None:
+                notes = self._notes[key] = _Notes()
+                while len(self._notes) > self.max_notes:
+                    self._notes.popitem(last=False)
+            self._notes.move_to_end(key)
+            notes.entries.append((question, guard, answer, seconds, time.time()))
+            notes.matrix = np.vstack([notes.matrix, vector])
+            if len(notes.entries) > self.size:
+                # Oldest questions go first
+                notes.entries = notes.entries[-self.size:]
+                notes.matrix = notes.matrix[-self.size:]
+            entries_gauge.set(sum(len(item.entries) for item in self._notes.values()))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache()
+        return _cache
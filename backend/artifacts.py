@@ -0,0 +1,89 @@
+"""
+Generated files (PDF reports, MP3 summaries) kept for download by id.
+
+Pipelines that produce files in the same request as text results store them
+here and return only an id; the client fetches `/artifacts/{id}` when it
+needs the file, without sending the source text again. Artifacts are stored
+in SQLite so every worker process can serve them, and expire after
+ARTIFACT_TTL seconds.
+
+Environment:
+    ARTIFACT_DB_PATH   SQLite file (default backend/data/artifacts.sqlite3)
+    ARTIFACT_TTL       seconds an artifact is kept (default 3600)
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from .jobs import _Closing
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "artifacts.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    id TEXT PRIMARY KEY,
+    media_type TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    data BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_expiry ON artifacts (expires_at);
+"""
+
+
+class ArtifactNotFound(Exception):
+    pass
+
+
+class ArtifactStore:
+    def __init__(self, path=None, ttl=None):
+        self.path = path or os.getenv("ARTIFACT_DB_PATH", DEFAULT_DB_PATH)
+        self.ttl = ttl or float(os.getenv("ARTIFACT_TTL", "3600"))
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        with self._lock:
+            if not self._ready:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                conn.close()
+                self._ready = True
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return _Closing(conn)
+
+    def put(self, data, media_type, filename):
+        """Store bytes and return {"artifact_id", "url", "media_type", "size_bytes", "expires_at"}"""
+        artifact_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM artifacts WHERE expires_at < ?", (now,))
+            conn.execute(
+                "INSERT INTO artifacts (id, media_type, filename, data, created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (artifact_id, media_type, filename, bytes(data), now, now + self.ttl),
+            )
+        return {
+            "artifact_id": artifact_id,
+            "url": f"/artifacts/{artifact_id}",
+            "media_type": media_type,
+            "size_bytes": len(data),
+            "expires_at": now + self.ttl,
+        }
+
+    def get(self, artifact_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT media_type, filename, data FROM artifacts WHERE id = ? AND expires_at >= ?",
+                (artifact_id, time.time()),
+            ).fetchone()
+        if row is None:
+            raise ArtifactNotFound(artifact_id)
+        return dict(row)
@@ -0,0 +1,296 @@
+"""
+Offline batch processing of a folder of notes.
+
+Walks INPUT_DIR for PDFs, images and text files and runs each through the
+same pipeline as the API:
+
+    ocr       PDF text layer, or Vision/Gemini OCR for images (.txt/.md are read as is)
+    correct   correct_ocr_text
+    summary   generate_structured_summary
+    pdf       generate_pdf_with_fpdf
+
+Each stage has its own concurrency limit, so slow Gemini stages don't starve
+the local ones. Outputs go to OUTPUT_DIR/<relative path>.out/ (extracted.txt,
+corrected.txt, summary.md, report.pdf; notes.pdf and notes.png get separate
+directories) and progress to
+OUTPUT_DIR/manifest.json after every stage, so a re-run after a crash skips
+stages that already finished (unless the source file changed). A stage whose
+Gemini call fails fails the item instead of saving the uncorrected text or the
+error message, so --retry-failed runs it again. Batch calls run at BACKGROUND
+priority, whose queue is the first to fill while the API is busy; a stage the
+scheduler turns away (SchedulerBusy) waits for its Retry-After and runs again,
+up to BUSY_RETRIES times, before the item fails. Images with
+no text (blank backs of pages, dividers) are recorded as blank without an
+OCR call and skipped on re-runs. Throughput statistics are printed at the end
+and stored in the manifest.
+
+Usage (from the project root):
+    python -m backend.batch course-pack/ out/
+    python -m backend.batch course-pack/ out/ --ocr-workers 8 --correct-workers 2 --summary-workers 2
+    python -m backend.batch course-pack/ out/ --retry-failed
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .gemini_scheduler import BACKGROUND, SchedulerBusy, use_priority
+from .page_analysis import BlankPage
+from .structured_log import get_logger
+
+log = get_logger(__name__)
+
+PDF_EXTENSIONS = (".pdf",)
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+TEXT_EXTENSIONS = (".txt", ".md")
+STAGES = ("ocr", "correct", "summary", "pdf")
+OUTPUT_FILES = {
+    "ocr": "extracted.txt",
+    "correct": "corrected.txt",
+    "summary": "summary.md",
+    "pdf": "report.pdf",
+}
+MANIFEST_NAME = "manifest.json"
+DEFAULT_WORKERS = {"ocr": 4, "correct": 2, "summary": 2, "pdf": 2}
+# Times a stage is retried after SchedulerBusy before its item fails
+BUSY_RETRIES = 10
+
+
+def find_inputs(input_dir):
+    extensions = PDF_EXTENSIONS + IMAGE_EXTENSIONS + TEXT_EXTENSIONS
+    paths = []
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(extensions):
+                paths.append(os.path.join(root, name))
+    return paths
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Per-item stage state, saved atomically after every change"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {"items": {}}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.data = json.load(f)
+
+    def item(self, item_id, sha256):
+        with self.lock:
+            entry = self.data["items"].get(item_id)
+            if entry is None or entry.get("sha256") != sha256:
+                # New or changed source: start over
+                entry = self.data["items"][item_id] = {"sha256": sha256, "status": "pending", "stages": {}, "error": None}
+            return entry
+
+    def update(self, entry, **fields):
+        with self.lock:
+            entry.update(fields)
+            self._save()
+
+    def stage_done(self, entry, stage, seconds, output):
+        with self.lock:
+            entry["stages"][stage] = {"seconds": round(seconds, 3), "output": output}
+            self._save()
+
+    def set_run(self, stats):
+        with self.lock:
+            self.data["last_run"] = stats
+            self._save()
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def _summarize(generate_structured_summary, text):
+    # Raised before the stage output is written, so a failed summary isn't reused on the next run
+    summary = generate_structured_summary(text)
+    if summary.startswith("Error generating summary"):
+        raise RuntimeError(summary)
+    return summary
+
+
+class BatchRunner:
+    def __init__(self, input_dir, output_dir, workers, retry_failed=False):
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.workers = workers
+        self.retry_failed = retry_failed
+        self.limits = {stage: threading.BoundedSemaphore(count) for stage, count in workers.items()}
+        self.manifest = Manifest(os.path.join(output_dir, MANIFEST_NAME))
+        self.stage_times = {stage: [] for stage in STAGES}
+        self.counts = {"processed": 0, "skipped": 0, "blank": 0, "failed": 0}
+        self.lock = threading.Lock()
+
+    def _run_stage(self, stage, entry, item_dir, func):
+        """Run one stage under its concurrency limit, or reuse its output from an earlier run"""
+        path = os.path.join(item_dir, OUTPUT_FILES[stage])
+        if stage in entry["stages"] and os.path.exists(path):
+            if stage == "pdf":
+                return None
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                with self.limits[stage]:
+                    started = time.perf_counter()
+                    result = func()
+                    seconds = time.perf_counter() - started
+                break
+            except SchedulerBusy as e:
+                if attempt == BUSY_RETRIES:
+                    raise
+                log.info("Gemini busy, retrying batch stage", stage=stage, retry_after=e.retry_after, attempt=attempt + 1)
+                # Outside the stage limit, so other items' stages keep running meanwhile
+                time.sleep(e.retry_after)
+        if isinstance(result, (bytes, bytearray)):
+            with open(path, "wb") as f:
+                f.write(result)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(result)
+        with self.lock:
+            self.stage_times[stage].append(seconds)
+        self.manifest.stage_done(entry, stage, seconds, os.path.relpath(path, self.output_dir))
+        return result
+
+    def _ocr(self, path):
+        from .main import extract_image_text, extract_pdf_text
+        lower = path.lower()
+        if lower.endswith(TEXT_EXTENSIONS):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                return f.read()
+        with open(path, "rb") as f:
+            contents = f.read()
+        if lower.endswith(PDF_EXTENSIONS):
+            text = extract_pdf_text(contents)
+        else:
+            text = extract_image_text(contents, os.path.basename(path))
+        if not text.strip():
+            raise ValueError("No text could be extracted")
+        return text
+
+    def process(self, path):
+        from .main import correct_ocr_text, generate_structured_summary
+        from .pdf_generator_fpdf import generate_pdf_with_fpdf
+        item_id = os.path.relpath(path, self.input_dir)
+        entry = self.manifest.item(item_id, file_sha256(path))
+        if entry["status"] in ("done", "blank") or (entry["status"] == "failed" and not self.retry_failed):
+            with self.lock:
+                self.counts["skipped"] += 1
+            return
+        # The full name, extension included, so notes.pdf and notes.png don't share outputs
+        item_dir = os.path.join(self.output_dir, item_id + ".out")
+        os.makedirs(item_dir, exist_ok=True)
+        started = time.perf_counter()
+        try:
+            with use_priority(BACKGROUND):
+                extracted = self._run_stage("ocr", entry, item_dir, lambda: self._ocr(path))
+                corrected = self._run_stage("correct", entry, item_dir, lambda: correct_ocr_text(extracted, strict=True))
+                summary = self._run_stage("summary", entry, item_dir, lambda: _summarize(generate_structured_summary, corrected))
+                title = os.path.splitext(os.path.basename(path))[0]
+                self._run_stage("pdf", entry, item_dir,
+                                lambda: generate_pdf_with_fpdf(title, corrected, summary, ""))
+        except BlankPage as e:
+            self.manifest.update(entry, status="blank", error=str(e))
+            with self.lock:
+                self.counts["blank"] += 1
+            print(f"blank   {item_id}")
+            return
+        except Exception as e:
+            self.manifest.update(entry, status="failed", error=str(e))
+            log.warning("Batch item failed", item=item_id, error=str(e))
+            with self.lock:
+                self.counts["failed"] += 1
+            print(f"FAILED  {item_id}: {e}")
+            return
+        self.manifest.update(entry, status="done", error=None)
+        with self.lock:
+            self.counts["processed"] += 1
+        print(f"done    {item_id} ({time.perf_counter() - started:.1f}s)")
+
+    def run(self):
+        paths = find_inputs(self.input_dir)
+        print(f"{len(paths)} input files, workers per stage: "
+              + ", ".join(f"{stage}={count}" for stage, count in self.workers.items()))
+        started = time.perf_counter()
+        # Enough threads that every stage can run at its limit at once
+        with ThreadPoolExecutor(max_workers=max(1, sum(self.workers.values()))) as pool:
+            for future in [pool.submit(self.process, path) for path in paths]:
+                future.result()
+        return self.statistics(len(paths), time.perf_counter() - started)
+
+    def statistics(self, total, elapsed):
+        stages = {}
+        for stage, times in self.stage_times.items():
+            if not times:
+                continue
+            ordered = sorted(times)
+            stages[stage] = {
+                "count": len(times),
+                "mean_seconds": round(statistics.mean(times), 3),
+                "p95_seconds": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+                # Share of the stage's worker capacity that was busy during the run
+                "utilization": round(sum(times) / (elapsed * self.workers[stage]), 3) if elapsed else None,
+            }
+        stats = {
+            "files": total,
+            **self.counts,
+            "elapsed_seconds": round(elapsed, 2),
+            "files_per_minute": round(self.counts["processed"] / elapsed * 60, 2) if elapsed else None,
+            "stages": stages,
+        }
+        self.manifest.set_run(stats)
+        return stats
+
+
+def print_statistics(stats):
+    print(f"\n{stats['processed']} processed, {stats['skipped']} skipped, {stats['blank']} blank, "
+          f"{stats['failed']} failed "
+          f"of {stats['files']} files in {stats['elapsed_seconds']}s ({stats['files_per_minute']} files/min)")
+    for stage, numbers in stats["stages"].items():
+        print(f"  {stage:<8} {numbers['count']:>5} runs  mean {numbers['mean_seconds']:>7.2f}s  "
+              f"p95 {numbers['p95_seconds']:>7.2f}s  utilization {numbers['utilization']:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run OCR, correction, summary and PDF generation over a folder")
+    parser.add_argument("input_dir")
+    parser.add_argument("output_dir")
+    for stage in STAGES:
+        parser.add_argument(f"--{stage}-workers", type=int, default=DEFAULT_WORKERS[stage],
+                            help=f"concurrent {stage} stages (default {DEFAULT_WORKERS[stage]})")
+    parser.add_argument("--retry-failed", action="store_true", help="retry items that failed in an earlier run")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.input_dir):
+        parser.error(f"{args.input_dir} is not a directory")
+    os.makedirs(args.output_dir, exist_ok=True)
+    workers = {stage: max(1, getattr(args, f"{stage}_workers")) for stage in STAGES}
+    runner = BatchRunner(args.input_dir, args.output_dir, workers, retry_failed=args.retry_failed)
+    stats = runner.run()
+    print_statistics(stats)
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
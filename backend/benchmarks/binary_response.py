@@ -0,0 +1,223 @@
+"""
+Memory and throughput of binary downloads (backend/responses.py).
+
+Serves a generated PDF-sized body (random bytes, which like the compressed
+streams of a real PDF hold a b"\\n" every 256 bytes on average) from uvicorn
+in a child process, once per mode:
+
+    streaming   StreamingResponse(io.BytesIO(body)), how the PDF and MP3
+                endpoints answered before: one body message per line, chunked
+                transfer encoding, no Content-Length
+    buffer      BufferResponse(body): CHUNK_BYTES pieces copied one at a time from a view
+    single      BufferResponse(body) with the whole body as one slice, to show
+                what asyncio's transport buffer copies
+
+and downloads it --requests times with --concurrency clients. Each request
+renders a fresh copy of the body, like the endpoints do. For each mode it
+prints requests per second, MB/s, server CPU seconds per request, body
+messages per response, the server's peak RSS above its idle RSS, and checks
+Content-Length plus a Range request (206 / 416) where the mode supports them.
+
+Usage (from the project root):
+    python -m backend.benchmarks.binary_response
+    python -m backend.benchmarks.binary_response --size-mb 64 --concurrency 16 --output binary_response.json
+"""
+import argparse
+import http.client
+import io
+import json
+import random
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+MODES = ("streaming", "buffer", "single")
+
+
+def _rss_mb():
+    """(current, peak) resident set size of this process in MB"""
+    with open("/proc/self/status") as f:
+        fields = dict(line.split(":", 1) for line in f)
+    current = int(fields["VmRSS"].split()[0]) / 1024
+    return current, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def serve(mode, port, size):
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Route
+
+    from backend import responses
+    from backend.responses import BufferResponse
+
+    template = random.Random(0).randbytes(size)
+    counts = {"messages": 0, "responses": 0}
+    if mode == "single":
+        responses.CHUNK_BYTES = size
+
+    class CountingApp:
+        def __init__(self, app):
+            self.app = app
+
+        async def __call__(self, scope, receive, send):
+            async def counting_send(message):
+                if message["type"] == "http.response.body" and scope["path"] == "/download":
+                    counts["messages"] += 1
+                    counts["responses"] += not message.get("more_body", False)
+                await send(message)
+            await self.app(scope, receive, counting_send)
+
+    async def download(request):
+        body = bytes(bytearray(template))    # a freshly rendered document
+        if mode == "streaming":
+            return StreamingResponse(io.BytesIO(body), media_type="application/pdf")
+        return BufferResponse(body, media_type="application/pdf", filename="report.pdf")
+
+    async def stats(request):
+        current, peak = _rss_mb()
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return JSONResponse({"rss_mb": current, "peak_rss_mb": peak, "cpu_seconds": usage.ru_utime + usage.ru_stime, **counts})
+
+    app = CountingApp(Starlette(routes=[Route("/download", download), Route("/stats", stats)]))
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(port, path, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    try:
+        conn.request("GET", path, headers=headers or {})
+        response = conn.getresponse()
+        received = 0
+        while chunk := response.read(256 * 1024):
+            received += len(chunk)
+        return response.status, dict(response.getheaders()), received
+    finally:
+        conn.close()
+
+
+def _wait_ready(port, process):
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            return json.loads(_stats_body(port))
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def _stats_body(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        conn.request("GET", "/stats")
+        return conn.getresponse().read()
+    finally:
+        conn.close()
+
+
+def run_mode(mode, args):
+    size = int(args.size_mb * 1024 * 1024)
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "backend.benchmarks.binary_response", "--serve", mode, "--port", str(port),
+         "--size-mb", str(args.size_mb)],
+    )
+    try:
+        idle = _wait_ready(port, process)
+        status, headers, received = _get(port, "/download")    # warm-up
+        content_length = {name.lower(): value for name, value in headers.items()}.get("content-length")
+        before = json.loads(_stats_body(port))
+
+        errors = []
+        remaining = iter(range(args.requests))
+        lock = threading.Lock()
+
+        def client():
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+                status, headers, received = _get(port, "/download")
+                if status != 200 or received != size:
+                    errors.append((status, received))
+
+        started = time.perf_counter()
+        clients = [threading.Thread(target=client) for _ in range(args.concurrency)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        seconds = time.perf_counter() - started
+        after = json.loads(_stats_body(port))
+
+        ranges = None
+        if mode != "streaming":
+            partial = _get(port, "/download", {"Range": "bytes=1000-1999"})
+            beyond = _get(port, "/download", {"Range": f"bytes={size}-"})
+            ranges = partial[0] == 206 and partial[2] == 1000 and beyond[0] == 416
+        responses = after["responses"] - before["responses"]
+        return {
+            "mode": mode,
+            "requests_per_second": round(args.requests / seconds, 2),
+            "mb_per_second": round(args.requests * size / seconds / 1024 / 1024, 1),
+            "cpu_ms_per_request": round((after["cpu_seconds"] - before["cpu_seconds"]) / args.requests * 1000, 1),
+            "messages_per_response": round((after["messages"] - before["messages"]) / max(responses, 1), 1),
+            "peak_rss_over_idle_mb": round(after["peak_rss_mb"] - idle["rss_mb"], 1),
+            "content_length": content_length is not None and int(content_length) == size,
+            "ranges": ranges,
+            "errors": len(errors),
+        }
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory and throughput of binary download responses")
+    parser.add_argument("--size-mb", type=float, default=8, help="body size in MB (default 8)")
+    parser.add_argument("--requests", type=int, default=16, help="downloads per mode (default 16)")
+    parser.add_argument("--concurrency", type=int, default=4, help="simultaneous clients (default 4)")
+    parser.add_argument("--modes", default=",".join(MODES), help=f"comma-separated subset of {', '.join(MODES)}")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--serve", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, int(args.size_mb * 1024 * 1024))
+        return 0
+
+    print(f"{args.size_mb:g} MB body, {args.requests} downloads with {args.concurrency} clients per mode")
+    print(f"{'mode':<10} {'req/s':>7} {'MB/s':>8} {'cpu ms/req':>11} {'msgs/resp':>10} {'peak RSS +MB':>13} "
+          f"{'length':>7} {'range':>6} {'errors':>7}")
+    results = []
+    for mode in args.modes.split(","):
+        row = run_mode(mode.strip(), args)
+        results.append(row)
+        ranges = "-" if row["ranges"] is None else ("ok" if row["ranges"] else "FAIL")
+        print(f"{row['mode']:<10} {row['requests_per_second']:>7} {row['mb_per_second']:>8} "
+              f"{row['cpu_ms_per_request']:>11} {row['messages_per_response']:>10} "
+              f"{row['peak_rss_over_idle_mb']:>13} {'yes' if row['content_length'] else 'no':>7} {ranges:>6} "
+              f"{row['errors']:>7}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"size_mb": args.size_mb, "requests": args.requests, "concurrency": args.concurrency,
+                       "results": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
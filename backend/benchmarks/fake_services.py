@@ -0,0 +1,213 @@
+"""
+Local stand-ins for the Gemini, Cloud Vision and Google Translate TTS APIs.
+
+Each service is a small threaded HTTP server that answers in the wire format
+the real client libraries expect, after sleeping for a delay drawn from a
+configurable latency distribution. Point the backend at them with
+GEMINI_API_ENDPOINT, VISION_API_ENDPOINT and TTS_API_ENDPOINT (see
+`FakeServices.environment()`).
+
+Latency specs:
+    fixed:0.2               always 200 ms
+    uniform:0.05,0.4        uniformly between 50 and 400 ms
+    normal:0.3,0.05         mean 300 ms, standard deviation 50 ms (clamped at 0)
+    lognormal:-1.2,0.5      exp(N(mu, sigma)), a long right tail like real APIs
+"""
+import base64
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A tiny valid MPEG audio frame header, enough for the response to look like MP3
+FAKE_MP3_CHUNK = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+SUMMARY_MARKDOWN = """# Benchmark Topic
+
+## Section 1: Basics
+- Key point one explains the first concept with an example
+- Key point two gives a formula: E = mc^2
+- Key point three lists important facts
+
+## Section 2: Details
+- A deeper concept with context
+- Additional details and applications
+"""
+
+
+class Latency:
+    def __init__(self, spec="fixed:0"):
+        self.spec = spec
+        kind, _, args = spec.partition(":")
+        values = [float(value) for value in args.split(",") if value]
+        samplers = {
+            "fixed": lambda: values[0],
+            "uniform": lambda: random.uniform(values[0], values[1]),
+            "normal": lambda: max(0.0, random.gauss(values[0], values[1])),
+            "lognormal": lambda: random.lognormvariate(values[0], values[1]),
+        }
+        if kind not in samplers:
+            raise ValueError(f"Unknown latency distribution {spec!r}")
+        self._sample = samplers[kind]
+        self._sample()    # validate the arguments now rather than in a request thread
+
+    def sleep(self):
+        time.sleep(self._sample())
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.service.latency.sleep()
+        with self.service.lock:
+            self.service.requests += 1
+        status, content_type, payload = self.service.respond(self.path, body)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakeService:
+    """One HTTP stand-in; subclasses implement respond(path, body)"""
+
+    name = "service"
+
+    def __init__(self, latency="fixed:0"):
+        self.latency = Latency(latency) if isinstance(latency, str) else latency
+        self.lock = threading.Lock()
+        self.requests = 0
+        handler = type(f"{type(self).__name__}Handler", (_Handler,), {"service": self})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name=f"fake-{self.name}", daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def respond(self, path, body):
+        raise NotImplementedError
+
+
+def _json(status, payload):
+    return status, "application/json", json.dumps(payload).encode("utf-8")
+
+
+class FakeGemini(FakeService):
+    """generateContent and countTokens for any model, on v1 and v1beta"""
+
+    name = "gemini"
+
+    def __init__(self, latency="fixed:0", output=SUMMARY_MARKDOWN):
+        super().__init__(latency)
+        self.output = output
+
+    def respond(self, path, body):
+        request = json.loads(body or b"{}")
+        request = request.get("generateContentRequest", request)
+        prompt_chars = sum(
+            len(part.get("text", "")) + (1032 if "inline_data" in part or "inlineData" in part else 0)
+            for content in request.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        prompt_tokens = prompt_chars // 4 + 1
+        if ":countTokens" in path:
+            return _json(200, {"totalTokens": prompt_tokens})
+        if ":generateContent" not in path:
+            return _json(404, {"error": {"code": 404, "message": f"Unknown path {path}", "status": "NOT_FOUND"}})
+        output_tokens = len(self.output) // 4 + 1
+        return _json(200, {
+            "candidates": [{
+                "content": {"parts": [{"text": self.output}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": output_tokens,
+                "totalTokenCount": prompt_tokens + output_tokens,
+            },
+        })
+
+
+class FakeVision(FakeService):
+    """images:annotate answering TEXT_DETECTION with a fixed text"""
+
+    name = "vision"
+
+    def __init__(self, latency="fixed:0", text="Benchmark OCR text\nsecond line of the page"):
+        super().__init__(latency)
+        self.text = text
+
+    def respond(self, path, body):
+        request = json.loads(body or b"{}")
+        annotation = {
+            "textAnnotations": [{"locale": "en", "description": self.text}],
+            "fullTextAnnotation": {"text": self.text},
+        }
+        return _json(200, {"responses": [annotation for _ in request.get("requests", [{}])]})
+
+
+class FakeTTS(FakeService):
+    """The Translate batchexecute RPC used by gTTS, returning a fake MP3 chunk"""
+
+    name = "tts"
+
+    def respond(self, path, body):
+        audio = base64.b64encode(FAKE_MP3_CHUNK).decode("ascii")
+        line = json.dumps([["wrb.fr", "jQ1olc", f'["{audio}"]', None, None, None, "generic"]], separators=(",", ":"))
+        return 200, "application/json; charset=utf-8", f")]}}'\n\n{len(line)}\n{line}\n".encode("utf-8")
+
+
+class FakeServices:
+    """Start all three stand-ins; use as a context manager"""
+
+    def __init__(self, gemini_latency="fixed:0", vision_latency="fixed:0", tts_latency="fixed:0"):
+        self.gemini = FakeGemini(gemini_latency)
+        self.vision = FakeVision(vision_latency)
+        self.tts = FakeTTS(tts_latency)
+
+    def __enter__(self):
+        for service in (self.gemini, self.vision, self.tts):
+            service.start()
+        return self
+
+    def __exit__(self, *exc):
+        for service in (self.gemini, self.vision, self.tts):
+            service.stop()
+
+    def environment(self):
+        return {
+            "GEMINI_API_ENDPOINT": self.gemini.url,
+            "VISION_API_ENDPOINT": self.vision.url,
+            "TTS_API_ENDPOINT": self.tts.url,
+        }
+
+    def request_counts(self):
+        return {service.name: service.requests for service in (self.gemini, self.vision, self.tts)}
+
+
+def parse_latency(spec):
+    """argparse type for latency specs"""
+    if not re.match(r"^\w+:[\d.,eE+-]*$", spec):
+        raise ValueError(spec)
+    return Latency(spec)
@@ -0,0 +1,261 @@
+"""
+Match and false-match rates of the perceptual-hash image index (backend/image_dedup.py).
+
+Builds a fixed test set of distinct whiteboard and notebook photos (random
+handwriting-like strokes and text on uneven lighting, same content on every
+run), optionally adds the images of --images DIR, and derives re-uploads of
+each: JPEG re-compression, messaging-app resizing, brightness changes, small
+crops and rotations. For every Hamming distance up to --max-distance it
+prints:
+
+    match rate         share of re-uploads within that distance of their original,
+                       per kind of change
+    false-match rate   share of pairs of different images within that distance
+
+and the largest distance whose false-match rate is at most --max-false-match.
+It also times lookups among --index-size hashes with the index's NumPy scan
+and with a BK-tree (which only visits subtrees that can hold a match, but at
+these distances on 143-bit hashes still visits most of them).
+
+Usage (from the project root):
+    python -m backend.benchmarks.image_dedup
+    python -m backend.benchmarks.image_dedup --images ~/whiteboards --output image_dedup.json
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+WORDS = (
+    "energy force mass velocity integral derivative matrix vector enzyme cell membrane theorem proof lemma "
+    "graph node edge tree array stack queue photosynthesis glucose oxygen carbon electron proton neutron"
+).split()
+
+
+def _whiteboard(rng, size=(1600, 1200)):
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFont
+
+    width, height = size
+    # Uneven lighting: a random brightness ramp plus a soft vignette
+    ys, xs = np.mgrid[0:height, 0:width]
+    ramp = rng.uniform(-30, 30) * xs / width + rng.uniform(-30, 30) * ys / height
+    vignette = -25 * (((xs - width / 2) / width) ** 2 + ((ys - height / 2) / height) ** 2)
+    base = np.clip(rng.uniform(205, 240) + ramp + vignette, 0, 255).astype(np.uint8)
+    image = Image.fromarray(base).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    if rng.random() < 0.5:
+        # Ruled notebook paper
+        for y in range(80, height, 48):
+            draw.line([(0, y), (width, y)], fill=(170, 190, 220), width=2)
+    try:
+        font = ImageFont.load_default(size=rng.randint(28, 56))
+    except TypeError:
+        font = ImageFont.load_default()
+    ink = rng.choice([(20, 20, 30), (20, 40, 140), (150, 20, 20), (10, 100, 40)])
+    y = rng.randint(40, 200)
+    while y < height - 80:
+        x = rng.randint(30, 250)
+        line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 7)))
+        if rng.random() < 0.3:
+            line += f" = {rng.randint(2, 99)}x^{rng.randint(2, 4)}"
+        draw.text((x, y), line, fill=ink, font=font)
+        y += rng.randint(50, 140)
+    for _ in range(rng.randint(0, 4)):
+        # Diagrams: boxes, arrows and circles
+        x0, y0 = rng.randint(0, width - 300), rng.randint(0, height - 300)
+        x1, y1 = x0 + rng.randint(80, 300), y0 + rng.randint(80, 300)
+        shape = rng.choice(["rectangle", "ellipse", "line"])
+        if shape == "line":
+            draw.line([(x0, y0), (x1, y1)], fill=ink, width=rng.randint(3, 8))
+        else:
+            getattr(draw, shape)([x0, y0, x1, y1], outline=ink, width=rng.randint(3, 8))
+    return image
+
+
+def _encode(image, quality=92):
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def _resized(image, side):
+    image = image.copy()
+    image.thumbnail((side, side))
+    return image
+
+
+def variants(image):
+    """kind -> encoded re-upload of `image`"""
+    from PIL import ImageEnhance
+
+    width, height = image.size
+    crop = int(min(width, height) * 0.03)
+    return {
+        "jpeg-q40": _encode(image, 40),
+        "jpeg-q70": _encode(image, 70),
+        "messaging-1280": _encode(_resized(image, 1280), 70),
+        "messaging-800": _encode(_resized(image, 800), 60),
+        "png": (lambda buffer: (image.save(buffer, format="PNG"), buffer.getvalue())[1])(io.BytesIO()),
+        "brighter-15%": _encode(ImageEnhance.Brightness(image).enhance(1.15), 85),
+        "crop-3%": _encode(image.crop((crop, crop, width - crop, height - crop)), 85),
+        "rotate-2deg": _encode(image.rotate(2, expand=False, fillcolor=(230, 230, 230)), 85),
+    }
+
+
+def load_images(count, directory, seed):
+    from PIL import Image
+
+    rng = random.Random(seed)
+    images = [(f"generated-{index}", _whiteboard(rng)) for index in range(count)]
+    if directory:
+        for root, dirs, files in os.walk(directory):
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    images.append((os.path.relpath(path, directory), Image.open(path).convert("RGB")))
+    return images
+
+
+class BKTree:
+    """Burkhard-Keller tree over Hamming distance, for comparison with the index's scan"""
+
+    def __init__(self, distance):
+        self.distance = distance
+        self.root = None    # [hash, {distance: child node}]
+        self.visited = 0
+
+    def add(self, key):
+        if self.root is None:
+            self.root = [key, {}]
+            return
+        node = self.root
+        while True:
+            distance = self.distance(key, node[0])
+            if distance == 0:
+                return    # already present
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [key, {}]
+                return
+            node = child
+
+    def search(self, key, radius):
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            self.visited += 1
+            distance = self.distance(key, node[0])
+            if distance <= radius:
+                found.append(node[0])
+            # Triangle inequality: only children at distance - radius .. distance + radius can hold matches
+            stack.extend(child for child_distance, child in node[1].items() if abs(child_distance - distance) <= radius)
+        return found
+
+
+def time_lookups(hashes, queries, radius, index_size, seed):
+    """Mean milliseconds per lookup with the NumPy scan and with a BK-tree, and the share of nodes the tree visits"""
+    import numpy as np
+    from backend.image_dedup import HASH_BYTES, distances, hamming
+
+    rng = random.Random(seed)
+    population = list(hashes) + [rng.randbytes(HASH_BYTES) for _ in range(max(0, index_size - len(hashes)))]
+    matrix = np.frombuffer(b"".join(population), dtype=np.uint8).reshape(len(population), HASH_BYTES)
+    started = time.perf_counter()
+    for query in queries:
+        np.flatnonzero(distances(matrix, query) <= radius)
+    scan_seconds = (time.perf_counter() - started) / len(queries)
+
+    tree = BKTree(hamming)
+    for value in population:
+        tree.add(value)
+    started = time.perf_counter()
+    for query in queries:
+        tree.search(query, radius)
+    tree_seconds = (time.perf_counter() - started) / len(queries)
+    return {
+        "entries": len(population),
+        "numpy_scan_ms": round(scan_seconds * 1000, 3),
+        "bk_tree_ms": round(tree_seconds * 1000, 3),
+        "bk_tree_visited_fraction": round(tree.visited / len(queries) / len(population), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure perceptual-hash matches and false matches")
+    parser.add_argument("--count", type=int, default=150, help="generated distinct images (default 150)")
+    parser.add_argument("--images", help="directory of real photos to add to the test set")
+    parser.add_argument("--max-distance", type=int, default=40, help="largest distance to report (default 40)")
+    parser.add_argument("--max-false-match", type=float, default=0.0,
+                        help="false-match rate allowed when recommending a distance (default 0)")
+    parser.add_argument("--index-size", type=int, default=20000, help="hashes in the lookup timing index")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    from backend.image_dedup import HASH_BITS, DEFAULT_DISTANCE, hamming, phash
+
+    images = load_images(args.count, args.images, args.seed)
+    print(f"{len(images)} distinct images, {HASH_BITS}-bit pHash")
+    started = time.perf_counter()
+    originals = []
+    reupload_distances = {}    # kind -> distances of re-uploads to their original
+    for name, image in images:
+        original = phash(_encode(image))
+        originals.append(original)
+        for kind, contents in variants(image).items():
+            reupload_distances.setdefault(kind, []).append(hamming(original, phash(contents)))
+    hash_count = len(images) * (1 + len(reupload_distances))
+    print(f"hashed {hash_count} images in {time.perf_counter() - started:.1f}s")
+
+    different = [
+        hamming(originals[i], originals[j]) for i in range(len(originals)) for j in range(i + 1, len(originals))
+    ]
+    rows = []
+    for distance in range(args.max_distance + 1):
+        rows.append({
+            "distance": distance,
+            "match_rate": {kind: round(sum(d <= distance for d in values) / len(values), 4)
+                           for kind, values in reupload_distances.items()},
+            "false_match_rate": round(sum(d <= distance for d in different) / len(different), 6) if different else 0.0,
+        })
+
+    kinds = list(reupload_distances)
+    print("\n" + f"{'dist':>4} " + " ".join(f"{kind:>14}" for kind in kinds) + f" {'false match':>12}")
+    for row in rows:
+        print(f"{row['distance']:>4} " + " ".join(f"{row['match_rate'][kind]:>14.1%}" for kind in kinds)
+              + f" {row['false_match_rate']:>12.4%}")
+    if different:
+        print(f"\nclosest pair of different images: {min(different)} bits apart "
+              f"(over {len(different)} pairs)")
+    safe = [row["distance"] for row in rows if row["false_match_rate"] <= args.max_false_match]
+    recommended = max(safe) if safe else None
+    print(f"largest distance with false-match rate <= {args.max_false_match:.2%}: {recommended} "
+          f"(IMAGE_DEDUP_DISTANCE default: {DEFAULT_DISTANCE})")
+
+    radius = DEFAULT_DISTANCE
+    timing = time_lookups(originals, originals[:50], radius, args.index_size, args.seed)
+    print(f"lookup at distance {radius} among {timing['entries']} hashes: NumPy scan {timing['numpy_scan_ms']} ms, "
+          f"BK-tree {timing['bk_tree_ms']} ms (visits {timing['bk_tree_visited_fraction']:.1%} of nodes)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "images": len(images),
+                "hash_bits": HASH_BITS,
+                "rows": rows,
+                "closest_different_pair": min(different) if different else None,
+                "recommended_distance": recommended,
+                "lookup": timing,
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
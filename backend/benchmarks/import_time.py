@@ -0,0 +1,118 @@
+"""
+Import-time benchmark for backend.main.
+
+Runs `python -X importtime -c "import backend.main"` in fresh interpreters and
+reports the median cold-import time plus the slowest modules. It exits with a
+non-zero status if any of the heavy dependencies that must stay lazy are
+imported, or if the median exceeds --budget-ms.
+
+Usage (from the project root):
+    python -m backend.benchmarks.import_time
+    python -m backend.benchmarks.import_time --runs 10 --budget-ms 800 --output import_time.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TARGET_MODULE = "backend.main"
+
+# These must only be imported on first use (see backend/ai_clients.py)
+LAZY_MODULES = [
+    "google.generativeai",
+    "google.cloud.vision",
+    "reportlab",
+    "PIL",
+    "gtts",
+    "PyPDF2",
+    "fpdf",
+    "numpy",
+]
+
+DEFAULT_BUDGET_MS = 1500
+
+
+def run_once(target):
+    """Import `target` in a fresh interpreter and return [(module, self_us, cumulative_us)]"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{result.stderr}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def summarize(runs, target, top):
+    totals_ms = []
+    for rows in runs:
+        total = next((cumulative for name, _, cumulative in rows if name == target), 0)
+        totals_ms.append(total / 1000)
+    last = runs[-1]
+    imported = {name for name, _, _ in last}
+    leaked = sorted(
+        module for module in LAZY_MODULES
+        if any(name == module or name.startswith(module + ".") for name in imported)
+    )
+    slowest = sorted(last, key=lambda row: row[1], reverse=True)[:top]
+    return {
+        "target": target,
+        "runs": len(runs),
+        "median_ms": round(statistics.median(totals_ms), 1),
+        "min_ms": round(min(totals_ms), 1),
+        "max_ms": round(max(totals_ms), 1),
+        "modules_imported": len(imported),
+        "eager_heavy_modules": leaked,
+        "slowest_self_ms": [
+            {"module": name, "self_ms": round(self_us / 1000, 2), "cumulative_ms": round(cumulative_us / 1000, 2)}
+            for name, self_us, cumulative_us in slowest
+        ],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default=TARGET_MODULE)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    runs = [run_once(args.target) for _ in range(args.runs)]
+    report = summarize(runs, args.target, args.top)
+    report["budget_ms"] = args.budget_ms
+
+    print(f"{args.target}: median {report['median_ms']} ms over {report['runs']} runs "
+          f"(min {report['min_ms']}, max {report['max_ms']}, {report['modules_imported']} modules)")
+    for row in report["slowest_self_ms"]:
+        print(f"  {row['self_ms']:>9.2f} ms self  {row['cumulative_ms']:>9.2f} ms cumulative  {row['module']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    failed = False
+    if report["eager_heavy_modules"]:
+        print(f"FAIL: imported eagerly: {', '.join(report['eager_heavy_modules'])}")
+        failed = True
+    if report["median_ms"] > args.budget_ms:
+        print(f"FAIL: median import time {report['median_ms']} ms exceeds budget {args.budget_ms} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+"""
+Offline load test for the backend API.
+
+Runs backend.main in-process (through httpx's ASGI transport, lifespan
+included) against the local Gemini, Vision and TTS stand-ins from
+fake_services.py, so no API keys or network access are needed. Every
+endpoint is driven by a pool of concurrent clients and the script reports
+p50/p95/p99 latency, throughput, errors, peak RSS and the mean
+Server-Timing stage durations per scenario. Every SQLite store (jobs, upload
+sessions, artifacts, incremental summaries, image hashes) lives in a
+temporary directory, and the re-uploaded image cache is off (IMAGE_DEDUP=0)
+so the image scenarios measure OCR rather than cache hits.
+
+The JSON written with --output is stable (sorted keys, no timestamps) so CI
+can diff it against a stored run; --baseline fails the run if any scenario's
+p95 latency regressed by more than --max-regression.
+
+Usage (from the project root):
+    python -m backend.benchmarks.loadtest
+    python -m backend.benchmarks.loadtest --requests 200 --concurrency 16 \\
+        --gemini-latency lognormal:-1.2,0.5 --output loadtest.json
+    python -m backend.benchmarks.loadtest --scenario chat --scenario notebot-chat
+    python -m backend.benchmarks.loadtest --baseline loadtest.json --max-regression 0.25
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+from .fake_services import FakeServices, parse_latency
+
+DEFAULT_REQUESTS = 50
+DEFAULT_CONCURRENCY = 8
+JOB_POLL_INTERVAL = 0.02
+
+NOTES = (
+    "Photosynthesis converts light energy into chemical energy.\n"
+    "The light reactions happen in the thylakoid membranes.\n"
+    "The Calvin cycle fixes carbon dioxide in the stroma.\n"
+) * 20
+
+
+def _png_bytes():
+    from PIL import Image, ImageDraw
+    image = Image.new("RGB", (400, 120), "white")
+    ImageDraw.Draw(image).text((10, 40), "Benchmark OCR text", fill="black")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _pdf_bytes(pages=3):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    for page in range(pages):
+        for line_number, line in enumerate(NOTES.splitlines()[:40]):
+            pdf.drawString(40, 750 - 16 * line_number, f"{page + 1}.{line_number} {line}")
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def build_scenarios(fixtures):
+    """name -> async function(client, i) returning the final HTTP response"""
+
+    async def post_json(client, path, payload):
+        return await client.post(path, json=payload)
+
+    async def run_session(client, pages):
+        # Pages are uploaded side by side, as the frontend does; the text is awaited with a long poll
+        response = await client.post("/ocr/sessions", json={"expected_pages": pages})
+        if response.status_code != 201:
+            return response
+        session_id = response.json()["session_id"]
+        uploads = await asyncio.gather(*(
+            client.post(f"/ocr/sessions/{session_id}/pages", data={"page_index": str(index)},
+                        files={"file": (f"page{index}.png", fixtures["png"], "image/png")})
+            for index in range(pages)
+        ))
+        for upload in uploads:
+            if upload.status_code != 202:
+                return upload
+        response = await client.get(f"/ocr/sessions/{session_id}", params={"wait": 30})
+        if response.status_code == 200 and response.json()["status"] != "complete":
+            raise RuntimeError(f"session ended {response.json()['status']}")
+        return response
+
+    async def run_job(client, path, payload):
+        response = await client.post(path, json=payload)
+        if response.status_code != 202:
+            return response
+        job_id = response.json()["job_id"]
+        while True:
+            response = await client.get(f"/jobs/{job_id}/result")
+            if response.status_code != 202:
+                return response
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+
+    return {
+        "health": lambda client, i: client.get("/health"),
+        "chat": lambda client, i: post_json(client, "/chat", {"message": f"Explain topic {i}", "context": "Biology"}),
+        "chat-with-image": lambda client, i: client.post(
+            "/chat/with-image", params={"message": "What does this say?"},
+            files={"file": ("page.png", fixtures["png"], "image/png")}),
+        "ocr-extract-image": lambda client, i: client.post(
+            "/ocr/extract", files={"file": ("page.png", fixtures["png"], "image/png")}),
+        "ocr-extract-pdf": lambda client, i: client.post(
+            "/ocr/extract", files={"file": ("notes.pdf", fixtures["pdf"], "application/pdf")}),
+        "notebot-chat": lambda client, i: post_json(
+            client, "/notebot/chat", {"question": f"What happens in step {i}?", "notes_context": NOTES}),
+        "enhance-summary": lambda client, i: post_json(client, "/enhance-summary", {"text": NOTES}),
+        "text-to-speech": lambda client, i: post_json(client, "/text-to-speech", {"text": NOTES[:600]}),
+        "generate-pdf": lambda client, i: client.post(
+            "/generate-pdf", params={"title": "Notes", "extracted_text": NOTES, "summary": NOTES[:800]}),
+        "ocr-pdf-report": lambda client, i: client.post(
+            "/ocr/pdf-report", data={"summary": "Short summary"},
+            files={"file": ("notes.pdf", fixtures["pdf"], "application/pdf")}),
+        "generate-roadmap": lambda client, i: post_json(client, "/generate-roadmap", {"topic": f"Topic {i}"}),
+        "download-roadmap-pdf": lambda client, i: post_json(
+            client, "/download-roadmap-pdf", {"topic": "Biology", "roadmap": "# Biology\n\n## Phase 1\n- Cells"}),
+        "notebot-process": lambda client, i: client.post(
+            "/notebot/process", data={"audio": "true"},
+            files={"file": ("notes.pdf", fixtures["pdf"], "application/pdf")}),
+        "ocr-session": lambda client, i: run_session(client, 3),
+        # Unique text per request so the job store doesn't deduplicate them
+        "job-enhance-summary": lambda client, i: run_job(client, "/jobs/enhance-summary", {"text": f"{i}\n{NOTES}"}),
+    }
+
+
+class RSSSampler:
+    """Track the peak resident set size of this process while running"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    @staticmethod
+    def current():
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, AttributeError):
+            # No procfs (macOS): fall back to the lifetime peak
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def parse_server_timing(header):
+    """{stage: milliseconds} from a Server-Timing header"""
+    stages = {}
+    for entry in header.split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "dur" and name:
+                stages[name] = float(value)
+    return stages
+
+
+def _is_error(response):
+    if response.status_code >= 400:
+        return True
+    if response.headers.get("content-type", "").startswith("application/x-ndjson"):
+        events = [json.loads(line) for line in response.text.splitlines() if line.strip()]
+        # A stream fails as a whole, or one of its artifacts does
+        return not events or events[-1].get("stage") != "done" or any("error" in event for event in events)
+    if response.headers.get("content-type", "").startswith("application/json"):
+        body = response.json()
+        return isinstance(body, dict) and body.get("success") is False
+    return False
+
+
+async def run_scenario(client, send, requests, concurrency):
+    latencies = []
+    stage_totals = {}
+    status_codes = {}
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                response = await send(client, i)
+                status = str(response.status_code)
+                failed = _is_error(response)
+                for name, ms in parse_server_timing(response.headers.get("server-timing", "")).items():
+                    stage_totals[name] = stage_totals.get(name, 0.0) + ms
+            except Exception as e:
+                status = type(e).__name__
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            status_codes[status] = status_codes.get(status, 0) + 1
+            errors += failed
+
+    await send(client, -1)    # warm-up: lazy imports and client construction
+    with RSSSampler() as rss:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "status_codes": status_codes,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        "throughput_rps": round(requests / elapsed, 2),
+        "peak_rss_mb": round(rss.peak / 1024 / 1024, 1),
+        # Mean Server-Timing stage durations (for jobs, only the final poll's)
+        "stages_ms": {name: round(total / requests, 2) for name, total in stage_totals.items()},
+    }
+
+
+async def run(args):
+    import httpx
+    from ..main import app
+
+    fixtures = {"png": _png_bytes(), "pdf": _pdf_bytes()}
+    scenarios = build_scenarios(fixtures)
+    selected = args.scenario or list(scenarios)
+    unknown = sorted(set(selected) - set(scenarios))
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s): {', '.join(unknown)}. Available: {', '.join(scenarios)}")
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for name in selected:
+                results[name] = await run_scenario(client, scenarios[name], args.requests, args.concurrency)
+                print(f"{name:<22} p50 {results[name]['p50_ms']:>8.1f} ms  p95 {results[name]['p95_ms']:>8.1f} ms  "
+                      f"p99 {results[name]['p99_ms']:>8.1f} ms  {results[name]['throughput_rps']:>7.1f} req/s  "
+                      f"errors {results[name]['errors']}  peak RSS {results[name]['peak_rss_mb']} MB")
+    return results
+
+
+def compare(results, baseline_path, max_regression):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["scenarios"]
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name, {}).get("p95_ms")
+        if before and result["p95_ms"] > before * (1 + max_regression):
+            regressions.append(f"{name}: p95 {before} ms -> {result['p95_ms']} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the backend API")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="concurrent clients per scenario")
+    parser.add_argument("--scenario", action="append", help="run only this scenario (repeatable)")
+    parser.add_argument("--gemini-latency", type=parse_latency, default="lognormal:-2.3,0.5",
+                        help="Gemini latency distribution (default lognormal:-2.3,0.5, about 100 ms median)")
+    parser.add_argument("--vision-latency", type=parse_latency, default="uniform:0.03,0.08")
+    parser.add_argument("--tts-latency", type=parse_latency, default="uniform:0.02,0.06")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="previous --output file to compare p95 latencies against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="allowed p95 increase over the baseline as a fraction (default 0.2)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, FakeServices(
+        args.gemini_latency, args.vision_latency, args.tts_latency
+    ) as services:
+        # Must be set before backend.main is imported
+        os.environ.update(services.environment())
+        os.environ["GEMINI_API_KEY"] = "benchmark-key"
+        # Keep the run's SQLite stores out of backend/data
+        for name, filename in (("JOB_DB_PATH", "jobs.sqlite3"), ("UPLOAD_DB_PATH", "uploads.sqlite3"),
+                               ("ARTIFACT_DB_PATH", "artifacts.sqlite3"), ("SUMMARY_DB_PATH", "summaries.sqlite3"),
+                               ("IMAGE_DEDUP_DB_PATH", "image_hashes.sqlite3"),
+                               ("GEMINI_QUOTA_DB_PATH", "gemini_quota.sqlite3")):
+            os.environ[name] = os.path.join(tmp, filename)
+        os.environ["PROFILE_DIR"] = os.path.join(tmp, "profiles")
+        # Every request sends the same image; with the cache on, all but the first would skip OCR
+        os.environ.setdefault("IMAGE_DEDUP", "0")
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        # Measure the app, not the production quota: lift the scheduler's rate limits
+        os.environ.setdefault("GEMINI_RPM", "1000000")
+        os.environ.setdefault("GEMINI_TPM", "1000000000")
+        os.environ.setdefault("GEMINI_MAX_CONCURRENCY", "64")
+        os.environ.setdefault("GEMINI_QUEUE_LIMITS", "interactive=1000,heavy=1000,background=1000")
+        results = asyncio.run(run(args))
+        upstream_requests = services.request_counts()
+
+    report = {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "gemini_latency": args.gemini_latency.spec,
+            "vision_latency": args.vision_latency.spec,
+            "tts_latency": args.tts_latency.spec,
+            "python": platform.python_version(),
+        },
+        "upstream_requests": upstream_requests,
+        "scenarios": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    failed = [name for name, result in results.items() if result["errors"]]
+    if failed:
+        print(f"FAIL: scenarios with errors: {', '.join(failed)}")
+    regressions = compare(results, args.baseline, args.max_regression) if args.baseline else []
+    for regression in regressions:
+        print(f"FAIL: p95 regression {regression}")
+    return 1 if failed or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+Adversarial-input benchmark for the maths highlighting of the HTML report.
+
+Renders inputs of doubling size with backend/math_markup.py and with the six
+regular expressions it replaced (kept below as LEGACY_PATTERNS), and prints
+the time per size plus the growth exponent between the two largest sizes
+(1 = linear, 2 = quadratic). Each legacy render runs in a child process that
+is killed after --timeout seconds; once a case times out, larger sizes of it
+are skipped.
+
+Usage (from the project root):
+    python -m backend.benchmarks.math_markup
+    python -m backend.benchmarks.math_markup --max-size 262144 --max-exponent 1.3   # exit 1 if not ~linear
+"""
+import argparse
+import json
+import math
+import re
+import subprocess
+import sys
+import time
+
+LEGACY_PATTERNS = [
+    (r'\b([a-zA-Z0-9\s\+\-\*\/\^\(\)\.]+\s*[=≤≥<>≠≈≅∝≡]\s*[a-zA-Z0-9\s\+\-\*\/\^\(\)\.]+)\b', r'<strong>\1</strong>'),
+    (r'\b(sin|cos|tan|cot|sec|csc|sinh|cosh|tanh|asin|acos|atan|log|ln|lg|exp|sqrt|cbrt|abs|floor|ceil|round|min|max|det|trace|rank|dim|lim|sup|inf)\s*\([^)]+\)', r'<strong>\1</strong>'),
+    (r'\b([a-zA-Z0-9\(\)\[\]_{}\^\+\-\*]+)\/([a-zA-Z0-9\(\)\[\]_{}\^\+\-\*]+)\b', r'<strong>\1/\2</strong>'),
+    (r'\b([a-zA-Z0-9\(\)]+)[\^]([a-zA-Z0-9\+\-\*\/]+)\b', r'<strong>\1<sup>\2</sup></strong>'),
+    (r'([π∞αβγδεζηθικλμνξοπρστυφχψωΑΒΓΔΕΖΗΘΙΚΛΜΝΞΟΠΡΣΤΥΦΧΨΩ√∛∜∑∏∫∬∭∮∯∰∇∂∆∴∵∀∃∈∉⊂⊃⊆⊇∩∪∅ℝℂℕℤℚ℘ℵ≈≅≡≠≤≥⊥∥⟂∠∡∢°′″‰‱%])', r'<strong>\1</strong>'),
+    (r'\b([0-9]+\.?\d*\s*[+\-×÷*/÷]\s*[0-9]+\.?\d*(?:\s*[+\-×÷*/÷]\s*[0-9]+\.?\d*)*)\b', r'<strong>\1</strong>'),
+]
+
+SAMPLE_LINE = "Newton's second law F = m a, so with m = 2 kg and a = 3 m/s^2 the force is 2 × 3 = 6 N; sin(30°) = 1/2. "
+
+# name -> function building a text of about `size` characters
+CASES = {
+    # One long OCR line of words and spaces: no operator, so every start position scans to the end
+    "words": lambda size: ("a " * (size // 2))[:size],
+    # Words with an operator but nothing after it
+    "dangling-operator": lambda size: ("a " * (size // 2))[:size - 2] + "= ",
+    "many-equals": lambda size: ("x = " * (size // 4))[:size],
+    "unclosed-functions": lambda size: ("sin(" * (size // 4))[:size],
+    "long-fraction-token": lambda size: ("ab" * (size // 2))[:size - 1] + "/",
+    "realistic": lambda size: (SAMPLE_LINE * (size // len(SAMPLE_LINE) + 1))[:size],
+    "realistic-lines": lambda size: ((SAMPLE_LINE + "\n") * (size // len(SAMPLE_LINE) + 1))[:size],
+}
+
+
+def legacy_to_html(text):
+    html = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('\n', '<br>')
+    for pattern, replacement in LEGACY_PATTERNS:
+        html = re.sub(pattern, replacement, html)
+    return html
+
+
+def render_seconds(engine, case, size):
+    text = CASES[case](size)
+    if engine == "legacy":
+        render = legacy_to_html
+    else:
+        from backend.math_markup import to_html as render
+    started = time.perf_counter()
+    render(text)
+    return time.perf_counter() - started
+
+
+def _legacy_in_child(case, size, timeout):
+    try:
+        completed = subprocess.run(
+            [sys.executable, "-m", "backend.benchmarks.math_markup", "--worker", case, str(size)],
+            capture_output=True, text=True, timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        return None
+    return float(completed.stdout.strip())
+
+
+def growth_exponent(timings):
+    """log-log slope between the two largest sizes that finished"""
+    finished = [(size, seconds) for size, seconds in timings if seconds]
+    if len(finished) < 2:
+        return None
+    (small, t_small), (large, t_large) = finished[-2], finished[-1]
+    return round(math.log(t_large / t_small) / math.log(large / small), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark maths highlighting on adversarial inputs")
+    parser.add_argument("--min-size", type=int, default=1024, help="smallest input in characters")
+    parser.add_argument("--max-size", type=int, default=65536, help="largest input in characters")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds before a legacy render is abandoned")
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="only run this case (repeatable)")
+    parser.add_argument("--skip-legacy", action="store_true", help="only time the new engine")
+    parser.add_argument("--max-exponent", type=float, help="exit 1 if the new engine grows faster than this")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--worker", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        case, size = args.worker
+        print(render_seconds("legacy", case, int(size)))
+        return 0
+
+    sizes = []
+    size = args.min_size
+    while size <= args.max_size:
+        sizes.append(size)
+        size *= 2
+
+    results = {}
+    failed = False
+    for case in args.case or list(CASES):
+        new = [(size, render_seconds("new", case, size)) for size in sizes]
+        legacy = []
+        if not args.skip_legacy:
+            for size in sizes:
+                seconds = _legacy_in_child(case, size, args.timeout)
+                legacy.append((size, seconds))
+                if seconds is None:
+                    break
+        results[case] = {
+            "new": {"seconds": dict(new), "exponent": growth_exponent(new)},
+            "legacy": {"seconds": dict(legacy), "exponent": growth_exponent(legacy)},
+        }
+        print(f"\n{case}")
+        print(f"  {'chars':>8} {'new ms':>10} {'legacy ms':>12}")
+        legacy_by_size = dict(legacy)
+        for size, seconds in new:
+            if size not in legacy_by_size:
+                legacy_text = "skipped" if not args.skip_legacy else "-"
+            elif legacy_by_size[size] is None:
+                legacy_text = f">{args.timeout * 1000:.0f}"
+            else:
+                legacy_text = f"{legacy_by_size[size] * 1000:.1f}"
+            print(f"  {size:>8} {seconds * 1000:>10.2f} {legacy_text:>12}")
+        print(f"  growth exponent: new {results[case]['new']['exponent']}, legacy {results[case]['legacy']['exponent']}")
+        exponent = results[case]["new"]["exponent"]
+        if args.max_exponent and exponent is not None and exponent > args.max_exponent:
+            print(f"  FAIL: new engine grows with exponent {exponent} > {args.max_exponent}")
+            failed = True
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"sizes": sizes, "cases": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
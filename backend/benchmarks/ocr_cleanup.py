@@ -0,0 +1,223 @@
+"""
+Quality scores and Gemini routing of the local OCR cleanup (backend/ocr_cleanup.py).
+
+Takes a fixed set of clean study-note passages (physics, biology, chemistry,
+maths, computing, history and economics; a PDF text layer looks like this)
+plus the .txt files of --texts DIR, and corrupts each the way OCR does at
+increasing character error rates: letter/digit confusions (l/1, O/0, S/5),
+"m" read as "rn" and "w" as "vv", dropped and doubled letters, stray symbols
+and words hyphenated across line breaks. For every error rate it prints the
+mean score, the share of texts routed to Gemini at OCR_CLEAN_MIN_SCORE (the
+rest skip the correction call), and the share of corrupted words normalize()
+repaired by itself. A good threshold keeps clean text local and sends text
+with more than a few percent of errors to Gemini.
+
+Usage (from the project root):
+    python -m backend.benchmarks.ocr_cleanup
+    python -m backend.benchmarks.ocr_cleanup --texts ~/extracted --min-score 0.8 --output ocr_cleanup.json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+PASSAGES = [
+    """Newton's Laws of Motion
+
+The first law states that a body remains at rest or moves with constant velocity unless a net external force acts
+on it. This tendency to resist changes in motion is called inertia, and it depends only on the mass of the body.
+The second law relates the net force on a body to its acceleration: F = ma, where the force is measured in newtons,
+the mass in kilograms and the acceleration in metres per second squared. The third law states that every action has
+an equal and opposite reaction, so when you push against a wall, the wall pushes back on you with the same force.
+Together these laws explain the motion of everyday objects, from a ball rolling down a slope to a rocket leaving the
+launch pad, and they form the basis of classical mechanics.""",
+    """Photosynthesis
+
+Photosynthesis is the process by which green plants use light energy to make glucose from carbon dioxide and
+water. It takes place in the chloroplasts, which contain the green pigment chlorophyll. The overall equation is
+6CO2 + 6H2O -> C6H12O6 + 6O2. The light-dependent reactions happen in the thylakoid membranes, where water is split
+and oxygen is released as a by-product. The energy captured is stored in ATP and NADPH, which are then used in the
+Calvin cycle in the stroma to fix carbon dioxide into sugars. The rate of photosynthesis is limited by light
+intensity, carbon dioxide concentration and temperature; whichever factor is in shortest supply limits the rate.""",
+    """Chemical Bonding
+
+Atoms form bonds to reach a more stable arrangement of electrons. In an ionic bond, one atom transfers electrons to
+another, producing positive and negative ions that attract each other strongly; sodium chloride is a typical
+example. In a covalent bond, two atoms share a pair of electrons, as in the water molecule, where oxygen shares
+electrons with two hydrogen atoms. Metallic bonding is described as a lattice of positive ions surrounded by a sea of
+delocalised electrons, which explains why metals conduct heat and electricity. The type of bond strongly affects
+physical properties such as melting point, solubility and electrical conductivity.""",
+    """Quadratic Equations
+
+A quadratic equation has the general form ax^2 + bx + c = 0, where a is not zero. It can be solved by factorising,
+by completing the square or by using the quadratic formula x = (-b ± √(b^2 - 4ac)) / 2a. The expression under the
+square root is called the discriminant. If the discriminant is positive, the equation has two real roots; if it is
+zero, there is exactly one repeated root; and if it is negative, there are no real roots. The graph of a quadratic
+function is a parabola, which opens upwards when a is positive and downwards when a is negative. The vertex of the
+parabola gives the maximum or minimum value of the function.""",
+    """Sorting Algorithms
+
+A sorting algorithm arranges the elements of a list in order. Bubble sort repeatedly compares neighbouring elements
+and swaps them if they are in the wrong order; it is simple to write but takes O(n^2) time in the worst case. Merge
+sort divides the list into two halves, sorts each half recursively and then merges the sorted halves, which takes
+O(n log n) time but needs extra memory. Quick sort picks a pivot, partitions the list around it and sorts the parts;
+it is usually fast in practice, although a poor choice of pivot can make it slow. Choosing the right algorithm
+depends on the size of the data, whether it is nearly sorted and how much memory is available.""",
+    """The Industrial Revolution
+
+The Industrial Revolution began in Britain in the late eighteenth century and changed the way goods were produced.
+New machines, such as the spinning jenny and the steam engine, allowed factories to make textiles far faster than
+workers could by hand. Coal and iron became the basis of the economy, and canals and later railways carried raw
+materials and finished products across the country. Many people moved from the countryside to rapidly growing
+towns, where working conditions were often dangerous and wages were low. Over time, reforms limited working hours,
+improved safety and introduced education for children.""",
+    """Supply and Demand
+
+In a market economy, prices are set by the interaction of supply and demand. The law of demand states that, other
+things being equal, consumers buy more of a good when its price falls. The law of supply states that producers offer
+more of a good when its price rises. The equilibrium price is the price at which the quantity demanded equals the
+quantity supplied. If the price is above equilibrium, there is a surplus and sellers lower their prices; if it is
+below equilibrium, there is a shortage and prices rise. Changes in income, tastes or the prices of related goods
+shift the demand curve, while changes in costs or technology shift the supply curve.""",
+    """Cell Structure
+
+All living organisms are made of cells, the basic units of life. Animal cells contain a nucleus, which holds the
+genetic material, cytoplasm, where most chemical reactions take place, and a cell membrane, which controls what
+enters and leaves the cell. Mitochondria release energy from glucose during aerobic respiration, and ribosomes are
+the site of protein synthesis. Plant cells also have a cell wall made of cellulose, which strengthens the cell, a
+permanent vacuole filled with cell sap, and chloroplasts, which absorb light for photosynthesis. Bacterial cells are
+much smaller and have no nucleus; their genetic material is a single loop of DNA in the cytoplasm.""",
+    """Electric Circuits
+
+An electric current is a flow of charge, measured in amperes. The potential difference across a component, measured
+in volts, is the energy transferred per unit of charge. Resistance opposes the current and is measured in ohms; for
+an ohmic conductor at constant temperature, the current is directly proportional to the potential difference, so
+V = IR. In a series circuit, the same current flows through each component and the total resistance is the sum of
+the individual resistances. In a parallel circuit, the potential difference across each branch is the same, and the
+total current is the sum of the currents in the branches.""",
+    """Probability
+
+Probability measures how likely an event is to happen, on a scale from 0 (impossible) to 1 (certain). When all
+outcomes are equally likely, the probability of an event is the number of favourable outcomes divided by the total
+number of outcomes. For two independent events, the probability that both happen is the product of their
+probabilities, P(A and B) = P(A) x P(B). For mutually exclusive events, the probability that either happens is the
+sum of their probabilities. Tree diagrams and tables help to list the outcomes of combined events, and relative
+frequency from repeated experiments can be used to estimate probabilities that cannot be calculated directly.""",
+]
+
+ERROR_RATES = (0.0, 0.01, 0.02, 0.04, 0.08, 0.15)
+# (correct, OCR reading)
+CONFUSIONS = [("l", "1"), ("o", "0"), ("O", "0"), ("s", "5"), ("m", "rn"), ("w", "vv"), ("e", "c"), ("h", "b"),
+              ("I", "l"), ("i", "l"), ("n", "u"), ("a", "o")]
+STRAY = "~|^`'\\.,:;"
+
+
+def corrupt(text, rate, rng):
+    """`text` with about `rate` of its letters misread, and (counted separately) hyphenated line breaks"""
+    lines = []
+    for line in text.split("\n"):
+        words = line.split(" ")
+        out = []
+        for word in words:
+            letters = list(word)
+            for index, character in enumerate(letters):
+                if not character.isalpha() or rng.random() >= rate:
+                    continue
+                kind = rng.random()
+                matching = [wrong for right, wrong in CONFUSIONS if right == character]
+                if kind < 0.6 and matching:
+                    letters[index] = rng.choice(matching)
+                elif kind < 0.75:
+                    letters[index] = ""
+                elif kind < 0.85:
+                    letters[index] = character * 2
+                else:
+                    letters[index] = character + rng.choice(STRAY)
+            out.append("".join(letters))
+        lines.append(" ".join(out))
+    text = "\n".join(lines)
+    # Break a few long words across lines, the way a narrow scanned column does
+    def hyphenate(match):
+        word = match.group()
+        return word[:len(word) // 2] + "-\n" + word[len(word) // 2:] if rng.random() < 0.15 else word
+    return re.sub(r"(?<= )[a-z]{8,}(?= )", hyphenate, text)
+
+
+def word_errors(reference, text):
+    """Words of `reference` that aren't in `text`, as a multiset difference"""
+    from collections import Counter
+    pattern = re.compile(r"[A-Za-z0-9']+")
+    return sum((Counter(pattern.findall(reference)) - Counter(pattern.findall(text))).values())
+
+
+def load_texts(directory):
+    texts = []
+    if directory:
+        for root, dirs, files in os.walk(directory):
+            for name in sorted(files):
+                if name.endswith(".txt"):
+                    with open(os.path.join(root, name), encoding="utf-8", errors="replace") as f:
+                        texts.append(f.read())
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure OCR text scores and how many Gemini corrections they avoid")
+    parser.add_argument("--texts", help="directory of clean .txt files to add to the passages")
+    parser.add_argument("--min-score", type=float, help="threshold to evaluate (default OCR_CLEAN_MIN_SCORE)")
+    parser.add_argument("--samples", type=int, default=10, help="corrupted copies per text and error rate (default 10)")
+    parser.add_argument("--seed", type=int, default=3)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    from backend import ocr_cleanup
+
+    threshold = args.min_score if args.min_score is not None else ocr_cleanup.min_score()
+    texts = PASSAGES + load_texts(args.texts)
+    rng = random.Random(args.seed)
+    print(f"{len(texts)} texts, {args.samples} corrupted copies each per error rate, threshold {threshold}")
+    print(f"{'errors':>7} {'mean score':>11} {'min':>6} {'max':>6} {'to Gemini':>10} {'repaired':>9} {'ms/text':>8}")
+    rows = []
+    for rate in ERROR_RATES:
+        scores, routed, broken, repaired, seconds = [], 0, 0, 0, 0.0
+        for text in texts:
+            for _ in range(args.samples if rate else 1):
+                noisy = corrupt(text, rate, rng)
+                started = time.perf_counter()
+                normalized = ocr_cleanup.normalize(noisy)
+                quality = ocr_cleanup.score(normalized)
+                seconds += time.perf_counter() - started
+                scores.append(quality["score"])
+                routed += quality["words"] < ocr_cleanup.MIN_WORDS or quality["score"] < threshold
+                before, after = word_errors(text, noisy), word_errors(text, normalized)
+                broken += before
+                repaired += max(0, before - after)
+        row = {
+            "error_rate": rate,
+            "texts": len(scores),
+            "mean_score": round(sum(scores) / len(scores), 4),
+            "min_score": min(scores),
+            "max_score": max(scores),
+            "to_gemini": round(routed / len(scores), 4),
+            "repaired_words": round(repaired / broken, 4) if broken else None,
+            "ms_per_text": round(seconds / len(scores) * 1000, 2),
+        }
+        rows.append(row)
+        repaired_text = "-" if row["repaired_words"] is None else f"{row['repaired_words']:.1%}"
+        print(f"{rate:>7.0%} {row['mean_score']:>11.3f} {row['min_score']:>6.3f} {row['max_score']:>6.3f} "
+              f"{row['to_gemini']:>10.0%} {repaired_text:>9} {row['ms_per_text']:>8}")
+
+    clean = rows[0]
+    print(f"\nclean text kept local (Gemini correction avoided): {1 - clean['to_gemini']:.0%}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"threshold": threshold, "texts": len(texts), "rows": rows}, f, indent=2, sort_keys=True)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Throughput and memory benchmark for the PDF text backends (backend/pdf_text.py).
+
+Builds a fixed corpus of PDFs with reportlab (same content on every run),
+optionally adds the PDFs of --corpus DIR, and extracts every document with
+each installed backend. Each backend runs in a fresh interpreter so its peak
+RSS isn't inflated by the others; pages/sec is the median over --runs.
+
+Usage (from the project root):
+    python -m backend.benchmarks.pdf_text
+    python -m backend.benchmarks.pdf_text --runs 5 --corpus ~/pdfs --output pdf_text.json
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (name, pages, lines per page, columns)
+GENERATED_CORPUS = [
+    ("short-notes", 3, 40, 1),
+    ("lecture-slides", 30, 12, 1),
+    ("textbook-chapter", 80, 50, 1),
+    ("two-column-paper", 20, 55, 2),
+]
+
+SENTENCES = [
+    "Photosynthesis converts light energy into chemical energy stored in glucose.",
+    "Newton's second law states that force equals mass times acceleration, F = ma.",
+    "The derivative of x^2 with respect to x is 2x, and its integral is x^3/3 + C.",
+    "Mitochondria produce ATP through oxidative phosphorylation in the inner membrane.",
+    "A binary search halves the search interval at every step: O(log n) comparisons.",
+]
+
+
+def build_corpus(directory):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+    paths = []
+    width, height = letter
+    for name, pages, lines, columns in GENERATED_CORPUS:
+        path = os.path.join(directory, f"{name}.pdf")
+        pdf = canvas.Canvas(path, pagesize=letter)
+        pdf.setFont("Helvetica", 8 if columns > 1 else 10)
+        column_width = (width - 80) / columns
+        for page in range(pages):
+            for column in range(columns):
+                for line in range(lines):
+                    sentence = SENTENCES[(page + column + line) % len(SENTENCES)]
+                    if columns > 1:
+                        sentence = sentence[:60]
+                    pdf.drawString(40 + column * column_width, height - 50 - line * 13, f"{page}.{line} {sentence}")
+            pdf.showPage()
+        pdf.save()
+        paths.append(path)
+    return paths
+
+
+def _peak_rss_mb():
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round((maxrss if sys.platform == "darwin" else maxrss * 1024) / 1024 / 1024, 1)
+
+
+def run_worker(backend_name, paths, runs):
+    """Runs inside the child interpreter: benchmark one backend, print JSON"""
+    from backend.pdf_text import get_backend
+    backend = get_backend(backend_name)
+    documents = [(os.path.basename(path), open(path, "rb").read()) for path in paths]
+    baseline_rss = _peak_rss_mb()
+    per_document = {}
+    for name, data in documents:
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            texts = list(backend.page_texts(data))
+            timings.append(time.perf_counter() - started)
+        seconds = statistics.median(timings)
+        per_document[name] = {
+            "pages": len(texts),
+            "characters": sum(len(text) for text in texts),
+            "seconds": round(seconds, 4),
+            "pages_per_second": round(len(texts) / seconds, 1) if seconds else None,
+        }
+    total_pages = sum(result["pages"] for result in per_document.values())
+    total_seconds = sum(result["seconds"] for result in per_document.values())
+    print(json.dumps({
+        "backend": backend.name,
+        "pages_per_second": round(total_pages / total_seconds, 1) if total_seconds else None,
+        "peak_rss_mb": _peak_rss_mb(),
+        "rss_growth_mb": round(_peak_rss_mb() - baseline_rss, 1),
+        "documents": per_document,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the PDF text extraction backends")
+    parser.add_argument("--runs", type=int, default=3, help="extractions per document and backend (median is reported)")
+    parser.add_argument("--corpus", help="directory of extra PDFs to include")
+    parser.add_argument("--backend", action="append", help="only benchmark this backend (repeatable)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("paths", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.paths, args.runs)
+        return 0
+
+    from backend.pdf_text import available_backends
+    backends = args.backend or available_backends()
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = build_corpus(tmp)
+        if args.corpus:
+            paths += sorted(os.path.join(args.corpus, name) for name in os.listdir(args.corpus) if name.lower().endswith(".pdf"))
+        results = {}
+        for backend_name in backends:
+            completed = subprocess.run(
+                [sys.executable, "-m", "backend.benchmarks.pdf_text", "--worker", backend_name, "--runs", str(args.runs), *paths],
+                cwd=PROJECT_ROOT, capture_output=True, text=True,
+            )
+            if completed.returncode != 0:
+                print(f"{backend_name}: failed\n{completed.stderr}")
+                continue
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            results[backend_name] = result
+            print(f"{backend_name:<10} {result['pages_per_second']:>9.1f} pages/s  "
+                  f"peak RSS {result['peak_rss_mb']:>6.1f} MB  (+{result['rss_growth_mb']} MB while extracting)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"runs": args.runs, "backends": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Latency of the two speech-text modes of /text-to-speech (backend/speech_text.py).
+
+First times the local Markdown-to-speech conversion alone on a study summary
+repeated to increasing sizes, then sends the same summary to /text-to-speech
+--requests times per mode through an in-process TestClient, with Gemini and
+TTS replaced by the fake services of backend/benchmarks/fake_services.py.
+"llm" pays one Gemini rewrite per request (--gemini-latency, about a second
+by default, which is what the rewrite of a short summary takes); "local"
+pays only the conversion. The fake Gemini answers with the local conversion
+of the summary, so both modes synthesize the same text and pay the same fake
+TTS time; the difference is the time-to-first-audio the local mode saves.
+
+Usage (from the project root):
+    python -m backend.benchmarks.speech_text
+    python -m backend.benchmarks.speech_text --show
+    python -m backend.benchmarks.speech_text --requests 20 --gemini-latency fixed:2 --output speech_text.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from .fake_services import FakeServices, parse_latency
+from .loadtest import percentile
+
+SUMMARY = """# Kinematics and Forces
+
+## Section 1: Motion in a Straight Line
+- **Velocity** is the rate of change of displacement: v = s/t, measured in m/s
+- Acceleration is a = (v - u)/t, measured in m/s^2
+- The *suvat* equations, e.g. v^2 = u^2 + 2as, hold only for constant acceleration
+
+## Section 2: Forces
+- Newton's second law: F = ma
+- Weight W = mg, with g ≈ 9.81 m/s^2
+- Friction ≤ μR, where R is the normal reaction
+
+### Worked example
+1. A 2 kg mass accelerates at 3 m/s^2, so F = 2 × 3 = 6 N
+2. Momentum p = mv is conserved -> m1u1 + m2u2 = m1v1 + m2v2
+
+| Quantity | Unit |
+|----------|------|
+| Force | newton (N) |
+| Energy | joule (J) |
+
+## Section 3: Key Takeaways
+- Energy is conserved; kinetic energy is ½mv², about 50% of marks test this
+- Read pages 10-20 of the textbook before the quiz
+"""
+
+SIZES = (1, 10, 50)
+
+
+def conversion_times(repeats):
+    """Median milliseconds of markdown_to_speech() per summary size"""
+    from backend import speech_text
+
+    rows = []
+    for size in SIZES:
+        markdown = "\n".join([SUMMARY] * size)
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            speech_text.markdown_to_speech(markdown)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        rows.append({
+            "copies": size,
+            "characters": len(markdown),
+            "median_ms": round(percentile(timings, 0.5) * 1000, 3),
+        })
+    return rows
+
+
+def request_latencies(client, mode, requests):
+    """p50/p95 of /text-to-speech in one mode, and the errors seen"""
+    timings, errors = [], 0
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.post("/text-to-speech", json={"text": SUMMARY, "mode": mode})
+        timings.append(time.perf_counter() - started)
+        errors += response.status_code != 200
+    timings.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(timings, 0.5) * 1000, 1),
+        "p95_ms": round(percentile(timings, 0.95) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the llm and local speech-text modes of /text-to-speech")
+    parser.add_argument("--requests", type=int, default=10, help="requests per mode (default 10)")
+    parser.add_argument("--repeats", type=int, default=50, help="timed conversions per summary size (default 50)")
+    parser.add_argument("--gemini-latency", type=parse_latency, default="lognormal:0,0.3",
+                        help="Gemini latency distribution (default lognormal:0,0.3, about 1 s median)")
+    parser.add_argument("--tts-latency", type=parse_latency, default="uniform:0.02,0.06")
+    parser.add_argument("--show", action="store_true", help="print the spoken text of the sample summary")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.show:
+        from backend import speech_text
+        print(speech_text.markdown_to_speech(SUMMARY))
+        print()
+
+    conversion = conversion_times(args.repeats)
+    print(f"{'copies':>7} {'characters':>11} {'local ms':>9}")
+    for row in conversion:
+        print(f"{row['copies']:>7} {row['characters']:>11} {row['median_ms']:>9}")
+
+    with tempfile.TemporaryDirectory() as tmp, FakeServices(
+        args.gemini_latency, "fixed:0", args.tts_latency
+    ) as services:
+        # Must be set before backend.main is imported
+        os.environ.update(services.environment())
+        os.environ["GEMINI_API_KEY"] = "benchmark-key"
+        os.environ["JOB_DB_PATH"] = os.path.join(tmp, "jobs.sqlite3")
+        os.environ["GEMINI_QUOTA_DB_PATH"] = os.path.join(tmp, "gemini_quota.sqlite3")
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        os.environ.setdefault("GEMINI_RPM", "1000000")
+        os.environ.setdefault("GEMINI_TPM", "1000000000")
+        from fastapi.testclient import TestClient
+        from backend import speech_text
+        from backend.main import app
+
+        services.gemini.output = speech_text.markdown_to_speech(SUMMARY)
+
+        modes = {}
+        with TestClient(app) as client:
+            for mode in ("llm", "local"):
+                before = services.request_counts()["gemini"]
+                modes[mode] = request_latencies(client, mode, args.requests)
+                modes[mode]["gemini_requests"] = services.request_counts()["gemini"] - before
+
+    print(f"\n{'mode':>6} {'p50 ms':>8} {'p95 ms':>8} {'Gemini calls':>13} {'errors':>7}")
+    for mode, row in modes.items():
+        print(f"{mode:>6} {row['p50_ms']:>8} {row['p95_ms']:>8} {row['gemini_requests']:>13} {row['errors']:>7}")
+    print(f"\nlocal saves {modes['llm']['p50_ms'] - modes['local']['p50_ms']:.0f} ms at the median")
+
+    if args.output:
+        report = {
+            "config": {
+                "requests": args.requests,
+                "gemini_latency": args.gemini_latency.spec,
+                "tts_latency": args.tts_latency.spec,
+                "python": platform.python_version(),
+            },
+            "conversion": conversion,
+            "modes": modes,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+    return 1 if any(row["errors"] for row in modes.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
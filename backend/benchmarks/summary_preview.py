@@ -0,0 +1,124 @@
+"""
+Time of the extractive summary preview (backend/extractive_summary.py) as notes grow.
+
+Builds documents of increasing numbers of sentences from the study-note
+passages of the OCR cleanup benchmark (shuffled, with words swapped between
+sentences so no two are identical) and times each step of preview():
+sentence splitting, the sparse TF-IDF matrix and the TextRank iterations. It
+also prints what the dense sentence similarity matrix the sparse form avoids
+would take. For documents up to --check-limit sentences, the TextRank scores
+are checked against a dense NumPy computation of the same graph.
+
+Usage (from the project root):
+    python -m backend.benchmarks.summary_preview
+    python -m backend.benchmarks.summary_preview --sizes 100,1000,50000 --show --output summary_preview.json
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import time
+
+from .ocr_cleanup import PASSAGES
+
+
+def build_document(sentence_count, rng):
+    """About `sentence_count` sentences in paragraphs of eight, each sentence slightly changed"""
+    sentences = [s for passage in PASSAGES for s in re.split(r"(?<=[.!?])\s+", passage.split("\n\n", 1)[1].replace("\n", " "))]
+    vocabulary = sorted({word for sentence in sentences for word in sentence.split() if word.isalpha() and len(word) > 4})
+    out = []
+    for index in range(sentence_count):
+        words = rng.choice(sentences).split()
+        for _ in range(2):
+            position = rng.randrange(len(words))
+            if words[position].isalpha() and len(words[position]) > 4:
+                words[position] = rng.choice(vocabulary)
+        out.append(" ".join(words))
+    return "\n\n".join(" ".join(out[i:i + 8]) for i in range(0, len(out), 8))
+
+
+def dense_textrank(matrix):
+    """The same TextRank scores from the dense similarity matrix, for checking"""
+    import numpy as np
+    from backend.extractive_summary import DAMPING, MAX_ITERATIONS, TOLERANCE
+    n = matrix.shape[0]
+    dense = np.zeros(matrix.shape)
+    dense[matrix.rows, matrix.indices] = matrix.data
+    similarity = dense @ dense.T
+    np.fill_diagonal(similarity, 0.0)
+    degree = similarity.sum(axis=1)
+    dangling = degree <= 1e-12
+    transition = similarity / np.where(dangling, 1.0, degree)[:, None]
+    scores = np.full(n, 1.0 / n)
+    for _ in range(MAX_ITERATIONS):
+        updated = (1 - DAMPING) / n + DAMPING * (transition.T @ scores + scores[dangling].sum() / n)
+        converged = np.abs(updated - scores).sum() < TOLERANCE
+        scores = updated
+        if converged:
+            break
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the extractive summary preview on growing documents")
+    parser.add_argument("--sizes", default="100,1000,10000,50000", help="sentence counts (default 100,1000,10000,50000)")
+    parser.add_argument("--check-limit", type=int, default=2000,
+                        help="compare with dense TextRank up to this many sentences (default 2000)")
+    parser.add_argument("--show", action="store_true", help="print the preview of the passages themselves")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    import numpy as np
+    from backend import extractive_summary
+
+    if args.show:
+        print(extractive_summary.preview("\n\n".join(PASSAGES))["preview_summary"])
+        print()
+
+    rng = random.Random(args.seed)
+    extractive_summary.preview(PASSAGES[0])    # warm up imports
+    print(f"{'sentences':>9} {'non-zeros':>10} {'split ms':>9} {'tf-idf ms':>10} {'rank ms':>8} {'total ms':>9} "
+          f"{'dense GB':>9} {'max diff':>9}")
+    rows = []
+    for size in (int(value) for value in args.sizes.split(",")):
+        text = build_document(size, rng)
+        started = time.perf_counter()
+        sentences = extractive_summary.split_sentences(text)
+        split = time.perf_counter()
+        matrix = extractive_summary.TfidfMatrix(sentences)
+        built = time.perf_counter()
+        scores = extractive_summary.textrank(matrix)
+        ranked = time.perf_counter()
+        extractive_summary.preview(text)
+        total = time.perf_counter() - ranked
+        difference = None
+        if len(sentences) <= args.check_limit:
+            difference = float(np.abs(dense_textrank(matrix) - scores).max() * len(sentences))
+        row = {
+            "sentences": len(sentences),
+            "non_zeros": int(len(matrix.data)),
+            "split_ms": round((split - started) * 1000, 1),
+            "tfidf_ms": round((built - split) * 1000, 1),
+            "textrank_ms": round((ranked - built) * 1000, 1),
+            "preview_ms": round(total * 1000, 1),
+            "dense_similarity_gb": round(len(sentences) ** 2 * 8 / 1e9, 3),
+            # Largest score difference, relative to the uniform score 1/n
+            "dense_max_difference": difference,
+        }
+        rows.append(row)
+        difference_text = "-" if difference is None else f"{difference:.1e}"
+        print(f"{row['sentences']:>9} {row['non_zeros']:>10} {row['split_ms']:>9} {row['tfidf_ms']:>10} "
+              f"{row['textrank_ms']:>8} {row['preview_ms']:>9} {row['dense_similarity_gb']:>9} {difference_text:>9}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rows": rows}, f, indent=2, sort_keys=True)
+            f.write("\n")
+    failed = [row for row in rows if row["dense_max_difference"] is not None and row["dense_max_difference"] > 1e-3]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
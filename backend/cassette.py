@@ -0,0 +1,158 @@
+"""
+Record and replay of upstream AI calls.
+
+Every call to Gemini (SDK and roadmap REST), Vision and gTTS goes through
+`call(boundary, request, live)`. `live()` performs the real call and returns
+a JSON-serializable result; `request` is anything that identifies the call
+(strings, dicts, lists, bytes, PIL images) and is reduced to a SHA-256 key.
+
+    record   run the live call and append {boundary, key, duration, result}
+             (or the error) to the cassette file
+    replay   serve recorded results instead of calling out; repeated calls
+             with the same key get the recordings in the order they were made,
+             and the last one once they run out
+    off      call through (default)
+
+Cassettes are JSON Lines, one interaction per line. API keys never reach the
+cassette: callers leave them out of `request`, and only key hashes and short
+previews of the request are stored.
+
+Environment:
+    CASSETTE_MODE           off (default), record or replay
+    CASSETTE_PATH           cassette file (default backend/data/cassette.jsonl)
+    CASSETTE_REPLAY_SPEED   0 (default) replays instantly; 1 sleeps for the
+                            recorded duration, 2 for half of it, and so on
+    CASSETTE_ON_MISS        error (default) raises CassetteMiss for calls that
+                            weren't recorded; live calls through instead
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from .structured_log import get_logger
+
+log = get_logger(__name__)
+
+OFF = "off"
+RECORD = "record"
+REPLAY = "replay"
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cassette.jsonl")
+PREVIEW_CHARS = 120
+
+_lock = threading.Lock()
+_recordings = None    # (boundary, key) -> [interaction, ...], loaded on first replay
+_positions = {}
+
+
+class CassetteMiss(Exception):
+    """Replay found no recording for a call"""
+
+
+class RecordedError(Exception):
+    """An upstream error captured at record time, raised again on replay"""
+
+
+def mode():
+    return os.getenv("CASSETTE_MODE", OFF).lower()
+
+
+def cassette_path():
+    return os.getenv("CASSETTE_PATH", DEFAULT_PATH)
+
+
+def _canonical(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"sha256": hashlib.sha256(value).hexdigest()}
+    if hasattr(value, "shape"):    # numpy arrays (their size is an element count)
+        return {"sha256": hashlib.sha256(value.tobytes()).hexdigest(), "shape": list(value.shape), "dtype": str(value.dtype)}
+    if hasattr(value, "tobytes"):    # PIL images
+        size = getattr(value, "size", None)
+        return {"sha256": hashlib.sha256(value.tobytes()).hexdigest(), "size": list(size) if size else None}
+    raise TypeError(f"Can't fingerprint {type(value).__name__}")
+
+
+def fingerprint(request):
+    encoded = json.dumps(request, sort_keys=True, default=_canonical, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _preview(request):
+    text = json.dumps(request, sort_keys=True, default=lambda value: "<binary>", ensure_ascii=False)
+    return text[:PREVIEW_CHARS]
+
+
+def _load():
+    global _recordings
+    with _lock:
+        if _recordings is None:
+            recordings = {}
+            path = cassette_path()
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            interaction = json.loads(line)
+                            recordings.setdefault((interaction["boundary"], interaction["key"]), []).append(interaction)
+            log.info("Cassette loaded", path=path, interactions=sum(len(v) for v in recordings.values()))
+            _recordings = recordings
+    return _recordings
+
+
+def reset():
+    """Forget loaded recordings and replay positions (e.g. after switching CASSETTE_PATH)"""
+    global _recordings
+    with _lock:
+        _recordings = None
+        _positions.clear()
+
+
+def _append(interaction):
+    path = cassette_path()
+    line = json.dumps(interaction, ensure_ascii=False) + "\n"
+    with _lock:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def _replay(boundary, key, request, live):
+    interactions = _load().get((boundary, key))
+    if not interactions:
+        if os.getenv("CASSETTE_ON_MISS", "error") == "live":
+            log.info("Cassette miss, calling live", boundary=boundary, key=key[:12])
+            return live()
+        raise CassetteMiss(f"No {boundary} recording for request {key[:12]} ({_preview(request)})")
+    with _lock:
+        position = _positions.get((boundary, key), 0)
+        _positions[(boundary, key)] = position + 1
+    interaction = interactions[min(position, len(interactions) - 1)]
+    speed = float(os.getenv("CASSETTE_REPLAY_SPEED", "0"))
+    if speed > 0:
+        time.sleep(interaction["duration"] / speed)
+    if "error" in interaction:
+        raise RecordedError(interaction["error"])
+    return interaction["result"]
+
+
+def call(boundary, request, live):
+    """Run `live()` for this upstream call, recording or replaying it per CASSETTE_MODE"""
+    current = mode()
+    if current == OFF:
+        return live()
+    key = fingerprint(request)
+    if current == REPLAY:
+        return _replay(boundary, key, request, live)
+    started = time.perf_counter()
+    interaction = {"boundary": boundary, "key": key, "request": _preview(request)}
+    try:
+        result = live()
+    except Exception as e:
+        interaction.update(duration=round(time.perf_counter() - started, 4), error=str(e))
+        _append(interaction)
+        raise
+    interaction.update(duration=round(time.perf_counter() - started, 4), result=result)
+    _append(interaction)
+    return result
@@ -0,0 +1,269 @@
+"""
+Common English words for the OCR text-quality score (backend/ocr_cleanup.py).
+
+Base forms only: the score strips regular suffixes (-s, -ed, -ing, -ly, ...)
+before looking a word up. Together they cover about nine in ten words of
+running text in study notes; subject terms that a list this size can't hold
+are recognized by repetition within the document instead.
+"""
+
+WORDS = frozenset("""
+a about above across act action active activity actual actually add addition additional address adjust admit adopt
+adult advance advantage affect after again against age agency agent ago agree agreement ahead aid aim air all allow
+almost alone along already also alter alternative although always am among amount an analyse analysis analyze ancient
+and angle animal another answer any anyone anything apart appear application apply approach appropriate approximate
+are area argue argument arise arm around arrange arrangement arrive art article as aside ask aspect assess assign
+assist assume assumption at atom attach attack attempt attend attention attitude author available average avoid
+away axis
+
+back background bad balance ball bank bar base basic basis be bear beat beautiful because become bed been before
+begin beginning behavior behaviour behind being belief believe belong below benefit best better between beyond big
+bill billion bind biology bit black block blood blue board body bond book border born both bottom bound boundary box
+boy brain branch break bring broad brown build building business but buy by
+
+calculate calculation call can capacity capital car carbon card care career carry case catch category cause cell
+center central centre century certain chain chair challenge chance change chapter character characteristic charge
+check chemical chemistry child choice choose circle circuit circumstance cite city claim class classify clean clear
+clearly climate close closed club code cold collect collection college colour color column combination combine come
+comment commercial common communicate communication community company compare comparison complete complex component
+compound comprehensive concentrate concentration concept concern conclude conclusion condition conduct conductor
+consider consist constant construct contain content context continue contrast control convert cool copy core
+corner correct cost could count country couple course court cover create creation critical cross culture current
+curve customer cut cycle
+
+daily damage dark data date daughter day dead deal death debate decade decide decision decrease deep default define
+definition degree deliver demand demonstrate density depend dependent deposit depth derive describe description
+design despite detail determine develop development device diagram die difference different differential difficult
+digital dimension direct direction director discover discovery discuss discussion disease display distance distinct
+distribute distribution divide division do doctor document dog domain door double down draw drive drop due during
+duty dynamic
+
+each early earth easily east easy economic economy edge education effect effective efficiency effort either
+electric electrical electron element else employee empty end energy engine enough ensure enter entire environment
+equal equation equilibrium equipment equivalent error especially essential establish estimate even evening event
+ever every everyone everything evidence evolution exact exactly examine example exchange exercise exist existence
+expand expect experience experiment explain explanation express expression extend extent external extra eye
+
+face fact factor fail fall false family far fast father fear feature feel few field figure file fill film final
+finally financial find fine finger finish fire firm first fish fit fix flat floor flow focus follow following food
+foot for force foreign form formal format former formula forward free frequency frequent friend from front full
+function fund fundamental further future
+
+gain game gas general generate generation get girl give given glass global go goal good government graph great
+green ground group grow growth guess guide
+
+hair half hand handle hang happen happy hard have he head health hear heart heat heavy height help her here high
+highly him himself his history hit hold home hope horizontal hot hour house how however huge human hundred husband
+hypothesis
+
+idea identify if image imagine impact implement importance important improve in include including income increase
+indeed independent index indicate individual industry influence inform information initial inner input inside
+instance instead institution integral interest internal international interpret into introduce introduction
+investigate involve issue it item its itself
+
+job join joint journal judge just
+
+keep key kid kill kind kinetic kitchen know knowledge
+
+lab label lack land language large last late later law lay layer lead leader learn least leave lecture left leg
+legal length less lesson let letter level lie life light like likely limit line link liquid list listen literature
+little live local location long look lose loss lot love low lower
+
+machine magnetic main maintain major majority make male man manage management many map mark market mass match
+material mathematics matrix matter maximum may maybe me mean meaning measure measurement mechanism media medical meet
+meeting member memory mention message metal method middle might mind minimum minute miss mission model modern
+molecule moment money month more morning most mother motion move movement much multiple multiply must my myself
+
+name nation national natural nature near nearly necessary need negative neither network never new news next nice
+night no none nor normal north not note nothing notice now nuclear number numerical
+
+object observe obtain obvious occur of off offer office officer often oil ok old on once one only onto open operate
+operation opportunity option or orbit order organ organic organization organize origin original other others our
+out outcome outer output outside over overall own oxygen
+
+page pain pair paper paragraph parallel parameter parent part particle particular particularly partner party pass
+past path pattern pay peace people per percent perform performance perhaps period person personal phase phenomenon
+physical physics pick picture piece place plan planet plant play player please plus point policy political poor
+popular population portion position positive possible post potential power practical practice predict prepare
+presence present president pressure pretty prevent previous price primary principle print prior private probably
+problem procedure process produce product production professor program programme project proof proper property
+propose protect protein prove provide public pull pure purpose push put
+
+quality quantity question quick quickly quiet quite
+
+radiation radius raise range rate rather ratio reach react reaction read ready real reality realize really reason
+receive recent recently recognize record red reduce refer reference reflect region regular relate relation
+relationship relative release remain remember remove repeat replace report represent require research resistance
+resource respect respond response rest result return reveal review rich right rise risk road rock role room root
+rule run
+
+safe same sample save say scale scene school science scientific scientist score sea search season second section
+see seek seem select self sell send sense sentence separate sequence series serious serve service set several sex
+shake shall shape share she short should show side sign signal significant similar simple simply since single sit
+site situation size skill small so social society soft solid solution solve some someone something sometimes son
+soon sort sound source south space speak special species specific speed spend spring square stage stand standard
+star start state statement station stay step still stock stop store story straight strategy stream street strength
+stress strong structure student study stuff style subject substance success successful such suddenly suffer suggest
+sum summary summer supply support suppose sure surface system
+
+table take talk task teach teacher team technique technology tell temperature ten tend term test text than thank
+that the their them themselves then theory there therefore these they thing think third this those though thought
+thousand three through throughout throw thus time to today together too tool top topic total toward towards trade
+traditional transfer transform transport travel treat treatment tree trial trip true truth try turn two type
+typical
+
+under understand unit university unless until up upon us use used useful user usually
+
+valid value variable variation variety various vector velocity version very via view visible voice volume vote
+
+wait walk wall want war watch water wave way we weak wealth weapon wear week weight well west what whatever when
+where whether which while white who whole whom whose why wide wife will win wind window wish with within without
+woman wonder word work worker world worry would write writer wrong
+
+yard yeah year yes yet you young your yourself
+
+zero zone
+
+acceleration acid algebra algorithm amplitude analogy anatomy angular answer approximation arithmetic array atomic
+bacteria binary biological calculus capacitor catalyst cellular charge circumference coefficient component
+conservation coordinate cosine current cytoplasm decimal denominator derivative diameter diffusion digit dna
+dividend electrode electromagnetic electrolyte ellipse enzyme exponent exponential factorial fraction friction gene
+genetic geometry glucose gradient gravity heredity hydrogen hypotenuse inertia infinite integer integration interval
+ion isotope kinetic lens linear logarithm magnet magnitude mammal membrane metabolism mitochondria mitosis momentum
+neutron nucleus numerator oscillation parabola perimeter periodic photosynthesis polynomial prime probability
+proton quadratic radioactive reactant reflection refraction respiration ribosome semester sine slope species
+spectrum statistic tangent theorem thermal tissue triangle trigonometry vertex vertical viscosity wavelength
+
+afterward although among anybody anyway becomes cannot else everywhere hence itself neither nobody otherwise
+rather somebody somewhere thereby whereas wherever whichever whoever within yourselves ourselves herself
+
+ability able absence absolute absorb abstract academic accept access accident accompany accord account accurate
+achieve acquire actor adapt adequate adjacent administration advice afford afraid agenda aggressive agriculture
+alive alliance ally alone amazing ambition amend amplify analog anger angry annual anticipate anxiety apparent
+appeal apple appoint appreciate argue arrow artificial assembly asset atmosphere attract attribute audience authority
+automatic autumn awake aware awful
+
+baby bag bake band bare barrier basket battle beach bean beauty bend bet bias bird birth bite bitter blame blind
+boil bomb bone bonus boost borrow boss bother bowl brave bread breath breathe brick bridge brief bright brilliant
+broadcast brother brush bubble budget burden burn bury bus busy button
+
+cable cake calm camera camp campaign cancel cancer candidate cap captain capture carbon career careful cargo carpet
+cash cast castle casual cat cause cave ceiling celebrate cheap cheese chest chief chip church cigarette cinema
+citizen civil clay climb clinic clock clothes cloud coal coast coat coffee coin collapse colleague colony combat
+comfort command commit committee compete competition complain complaint compose comprehend compress compute
+computer conduct conference confidence confirm conflict confuse congress connect connection conscious consent
+consequence conservative considerable consistent constitution consult consume consumer contact contemporary
+contract contribute convention conversation convince cook cooperate cope corporate corporation correspond cottage
+cotton council counter courage cousin crack craft crash crazy cream credit crime crisis criterion crop crowd crucial
+crystal cup cure curious currency cursor custom cycle
+
+dance danger dangerous dare deaf dear debt decline decorate dedicate defeat defence defense deficit delay delete
+delicate delight democracy deny department departure deposit depress derive deserve desire desk desperate destroy
+detect devote diet dig dinner dioxide disaster discipline discount dish dismiss disorder dispute distinguish
+disturb dive diverse domestic dominant donate doubt downward downwards drag drama dramatic dream dress drink dry dust
+
+eager ear earn ease eat echo ecology edit editor educate egg elderly elect election elegant elevate eliminate
+embrace emerge emergency emission emotion emphasis empire employ enable encounter encourage enemy enforce engage
+engineer enhance enjoy enormous enterprise entertain enthusiasm entry envelope episode equip era escape essay
+estate ethnic evaluate everyday evident evil exceed excellent except exception excess excite exclude exclusive
+excuse execute executive exhibit exit exotic expense expensive expert explode exploit explore export expose extreme
+
+fabric facility faculty fade fair faith familiar famous fan fancy farm farmer fashion fat fault favour favor
+favourable favorable federal fee feed female fence festival fiber fibre fiction fight finance finding fitness flag
+flame flash flexible flight float flood flower fly fold folk fond forecast forest forget forgive fortune foundation
+fragment frame framework fraud freedom freeze fresh fruit frustrate fuel fun funny furniture
+
+gallery gap garage garden gate gather gear gender gene generous gentle genuine ghost giant gift glad glance glory
+god gold golf grab grade gradual grain grand grant grass grateful grave gray grey guarantee guard guest guilty gun
+guy
+
+habit hall harm hat hate headline heal hear heaven hell hero hesitate hide hill hire hobby hole holiday hollow holy
+honest honour honor hook horizon horror horse hospital host hostile hotel household hunt hurry hurt
+
+ice icon ideal identical identity ignore ill illegal illness illustrate immediate immense immune import impose
+impress impression incident incline income incorporate indicator infant infection infinite inflation inherent
+inhibit injure injury inner innocent innovation input inquiry insect insert insight insist inspect inspire install
+instant institute instruct instrument insurance intact integrate intellectual intelligence intend intense intensity
+intention interact interface interfere interior interval intervention interview invasion invent invest invite iron
+isolate
+
+jacket jail jaw jet jewel joke journey joy jump junior jury justice justify
+
+kid kidney king kiss knee knife knock
+
+lake lamp landscape lane laptop large laser latter laugh launch lawn lawyer lazy leaf league lean leap leather
+legacy legend leisure lend lesson liberal liberty library licence license lid lift likewise limb linear lip liquid
+literacy literary load loan lobby lock log logic lonely loop loose lord loud lovely loyal luck lunch lung luxury
+
+mad magazine magic mail mainstream maintenance make mall manner manual manufacture margin marine marriage marry mask
+mate meal meat mechanic medicine medium melt mental menu mere merge merit mess metaphor meter metre mild military
+milk mill mineral minister minor minority miracle mirror mix mobile mode moderate modest modify monitor monkey
+monopoly mood moon moral mortgage motivate motor mount mountain mouse mouth murder muscle museum music mutual
+mystery myth
+
+naked narrative narrow nasty native navy neat neck negotiate neighbour neighbor neighbourhood nerve nervous nest
+net neutral newspaper noble nod noise nominate norm northern notable notion novel nurse nut
+
+oak obey objective obligation obscure occasion occupation occupy ocean odd offence offense offend official online
+opera opinion opponent oppose opposite opposition optimism oral orange ordinary organism orient outline output
+outstanding oven overcome overlook owe owner
+
+pace pack package pad paint pale palm pan panel panic parade pardon parliament partial participate partition
+passage passenger passion passive patch patent patience patient pause peak peer penalty pension pepper perceive
+perfect permanent permit persist perspective persuade phone photo phrase pile pilot pin pink pioneer pipe pitch
+pity pivot plain plastic plate platform pleasant pleasure pledge plenty plot pocket poem poet poison pole police
+polite poll pollution pool pop port portrait pose possess pot pour poverty powder praise pray precise predator
+prefer pregnant premium preserve press pride priest prince princess priority prison privacy prize probe proceed
+producer profile profit profound progress prohibit prominent promise promote prompt proportion proportional
+prospect prosper protest proud province provoke psychology pub pump punch punish pupil purchase purple pursue puzzle
+
+qualify quarter queen quest quote
+
+race racism rail railway rain rally random rank rapid rare raw ray realm rear recall receipt recipe reckon recommend
+recover recruit recycle referee reform refuge refuse regard regime register regret regulate reign reject rejoice
+relax relevant relief religion religious rely remark remarkable remedy remind remote rent repair reply reputation
+rescue reserve reside resign resist resolution resolve resort respective restore restrict retail retain retire
+retreat reverse revenue revolution reward rhythm rice ride ridge rifle ring riot rip ripe rival river rob robot
+robust rocket role roll roof rope rose rough round route routine row royal rubber rude ruin rumour rumor rural rush
+
+sack sacred sad safety sail sake salad salary sale salt sand satellite satisfy sauce scan scandal scatter schedule
+scheme scholar scope scratch scream screen script sculpture seal seat secret secretary sector secure seed segment
+seize seldom senior sensitive sentence sequence session settle severe shadow shallow shame sharp sheep sheet shelf
+shell shelter shield shift shine ship shirt shock shoe shoot shop shore shortage shot shoulder shout shut shy sick
+sight silence silent silk silly silver sin sink sister ski skin skirt sky sleep slice slide slight slip slow smart
+smell smile smoke smooth snake snow soap soccer sock soil soldier sole solar somewhat song sophisticated sore sorry
+soul soup southern sovereign spare spark spatial spectacular speech spell sphere spicy spider spin spirit spite
+split spokesman sponsor spot spray spread squad squeeze stable staff stain stake stamp stare statistics statue
+status steady steal steam steel steep steer stick stiff stimulate stir stomach stone storm stove strain strange
+stranger straw strict strike string strip stroke struggle stupid submit subsequent subsidy substitute subtle
+suburb succeed suck sudden sufficient sugar suicide suit suite sunny superb superior supermarket supervise supplement
+surgeon surgery surplus surprise surrender surround survey survive suspect suspend sustain swallow swear sweat
+sweep sweet swell swim swing switch sword symbol sympathy symptom syndrome
+
+tackle tail tale talent tank tap tape target tax tea tear technical teen telephone telescope television temple
+temporary tenant tender tennis tension tent terminal terrible territory terror testify theatre theater theme
+therapy thick thief thin thirst thorough threat threaten threshold throat thumb ticket tide tidy tie tight tile
+timber tin tiny tip tire tired title toe toilet tolerate toll tomorrow tone tongue tonight tooth torch touch tough
+tour tournament towel tower town toxic toy trace track tradition traffic tragedy trail train trait transaction
+transition translate transmit trap trash tray treasure treaty tremendous trend tribe trick trigger troop tropical
+trouble truck trust tube tune tunnel twin twist
+
+ugly ultimate umbrella uncle undergo undertake unemployment unfortunately uniform union unique unite universe
+unlike unusual update upgrade upper upset upward upwards urban urge urgent utility
+
+vacation vague vain valley van vary vast vegetable vehicle venture verb verdict verify vessel veteran victim
+victory video village violate violence violent virtual virtue virus visa vision visit visitor visual vital vivid
+vocabulary volunteer vulnerable
+
+wage wake wander warm warn wash waste wealth weather web wedding weird welcome welfare wet wheel whisper whistle
+wild willing wine wing winter wipe wire wisdom wise withdraw witness wolf wood wool worse worst worth wound wrap
+wrist
+
+yield youth
+
+i is was were has had did does done made said went gone came become became began begun brought bought built caught
+chose chosen drew drawn fell felt found gave given grew grown held kept knew known laid led left lost meant met paid
+ran read rose saw seen sent set shown sold spoke spoken stood taken told took thought understood won wrote written
+children men women feet teeth mice data criteria phenomena nuclei radii indices matrices vertices analyses theses
+an these those us him her our ours theirs mine whom etc ie eg vs
+""".split())
@@ -0,0 +1,205 @@
+"""
+Extractive preview of a text while the Gemini summary is generated.
+
+The structured summary takes two Gemini calls (correction, then summary), so
+`preview(text)` picks the most central sentences of the text itself to show
+in the meantime. Sentences are split with a few rules (abbreviations,
+initials and decimals don't end a sentence; bullets and headings stand on
+their own), turned into TF-IDF vectors and ranked by TextRank on their
+cosine similarity graph.
+
+The similarity graph of n sentences has n^2 edges, too many for notes of
+tens of thousands of sentences, so it is never built. The TF-IDF vectors are
+kept as a sparse CSR matrix X (NumPy arrays built with bincount, no SciPy),
+and each power iteration multiplies by X X^T as X (X^T p): two passes over
+the non-zero entries. A preview of a few pages takes a few milliseconds.
+
+Environment:
+    SUMMARY_PREVIEW            set to 0 to stop streaming previews
+    SUMMARY_PREVIEW_SENTENCES  sentences in a preview (default 5)
+"""
+import os
+import re
+
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-6
+# Sentences shorter or longer than this are ranked but not shown, unless nothing else is left
+MIN_WORDS, MAX_WORDS = 6, 60
+# A candidate this similar to a sentence already picked repeats it
+MAX_OVERLAP = 0.5
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here hers him
+his how i if in into is it its itself just may me might more most must my no nor not now of off on once only or
+other our ours out over own same she should so some such than that the their theirs them then there these they this
+those through to too under until up us very was we were what when where which while who whom why will with would
+you your yours
+""".split())
+# Words ending in a period that don't end a sentence
+ABBREVIATIONS = frozenset("""
+e.g i.e etc vs cf al approx fig figs eq eqs no nos vol pp p ch sec dr mr mrs ms prof st jr sr inc ltd co
+jan feb mar apr jun jul aug sep sept oct nov dec
+""".split())
+
+_HYPHENATED = re.compile(r"(\w)-\n\s*(\w)")
+_BLOCK_START = re.compile(r"^\s*(?:#{1,6}\s|[-*•]\s|\d{1,3}[.)]\s)")
+_MARKER = re.compile(r"^\s*(?:#{1,6}|[-*•]|\d{1,3}[.)])\s+")
+_BOUNDARY = re.compile(r"[.!?]+[\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])")
+_WORD = re.compile(r"[a-z][a-z0-9']+")
+_SPACES = re.compile(r"\s+")
+
+
+def enabled():
+    return os.getenv("SUMMARY_PREVIEW", "1").lower() not in ("0", "false", "no", "off")
+
+
+def preview_sentences():
+    return int(os.getenv("SUMMARY_PREVIEW_SENTENCES", "5"))
+
+
+def _ends_sentence(block, end):
+    """Whether the period at block[end] ends a sentence rather than an abbreviation or an initial"""
+    word = block[block.rfind(" ", 0, end) + 1:end].lstrip("\"'([").lower()
+    return not (word in ABBREVIATIONS or (len(word) == 1 and word.isalpha()))
+
+
+def split_sentences(text):
+    """Sentences of `text`: line-wrapped paragraphs are joined, bullets and headings kept apart"""
+    text = _HYPHENATED.sub(r"\1\2", text)
+    blocks, current = [], []
+    for line in text.splitlines():
+        if not line.strip() or _BLOCK_START.match(line):
+            if current:
+                blocks.append(" ".join(current))
+            current = [_MARKER.sub("", line).strip()] if line.strip() else []
+            # Headings are never continued on the next line
+            if line.lstrip().startswith("#"):
+                blocks.append(current.pop())
+        else:
+            current.append(line.strip())
+    if current:
+        blocks.append(" ".join(current))
+
+    sentences = []
+    for block in blocks:
+        block = _SPACES.sub(" ", block).strip()
+        start = 0
+        for match in _BOUNDARY.finditer(block):
+            if match.group().startswith(".") and not _ends_sentence(block, match.start()):
+                continue
+            sentences.append(block[start:match.end()].strip())
+            start = match.end()
+        if block[start:].strip():
+            sentences.append(block[start:].strip())
+    return sentences
+
+
+def _terms(sentence):
+    terms = []
+    for word in _WORD.findall(sentence.lower()):
+        if word in STOPWORDS or len(word) < 3:
+            continue
+        # Plurals count as their singular
+        if len(word) > 4 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+class TfidfMatrix:
+    """L2-normalized TF-IDF rows of sentences, in CSR form (data, indices, indptr) plus the row of each entry"""
+
+    def __init__(self, sentences):
+        import numpy as np
+        vocabulary = {}
+        ids, lengths = [], []
+        for sentence in sentences:
+            terms = _terms(sentence)
+            ids.extend(vocabulary.setdefault(term, len(vocabulary)) for term in terms)
+            lengths.append(len(terms))
+        self.shape = (len(sentences), len(vocabulary))
+        rows = np.repeat(np.arange(len(sentences), dtype=np.int64), lengths)
+        # One entry per (sentence, term), counting repeats; keys sort row-major, so rows come out in order
+        keys, counts = np.unique(rows * max(len(vocabulary), 1) + np.asarray(ids, dtype=np.int64), return_counts=True)
+        self.rows = keys // max(len(vocabulary), 1)
+        self.indices = keys % max(len(vocabulary), 1)
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(self.rows, minlength=len(sentences)))))
+        document_frequency = np.bincount(self.indices, minlength=len(vocabulary))
+        idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1
+        data = (1 + np.log(counts)) * idf[self.indices]
+        norms = np.sqrt(np.bincount(self.rows, weights=data * data, minlength=len(sentences)))
+        self.norms = norms
+        self.data = data / norms[self.rows]
+
+    def dot(self, vector):
+        """X @ vector"""
+        import numpy as np
+        return np.bincount(self.rows, weights=self.data * vector[self.indices], minlength=self.shape[0])
+
+    def tdot(self, vector):
+        """X.T @ vector"""
+        import numpy as np
+        return np.bincount(self.indices, weights=self.data * vector[self.rows], minlength=self.shape[1])
+
+    def row(self, index):
+        start, end = self.indptr[index], self.indptr[index + 1]
+        return dict(zip(self.indices[start:end].tolist(), self.data[start:end].tolist()))
+
+
+def textrank(matrix):
+    """TextRank score of each row on the cosine similarity graph X X^T (without self-loops), by power iteration"""
+    import numpy as np
+    n = matrix.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    # Rows with terms have similarity 1 with themselves, which isn't an edge
+    self_similarity = (matrix.norms > 0).astype(float)
+    degree = matrix.dot(matrix.tdot(np.ones(n))) - self_similarity
+    dangling = degree <= 1e-12
+    safe_degree = np.where(dangling, 1.0, degree)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(MAX_ITERATIONS):
+        spread = np.where(dangling, 0.0, scores / safe_degree)
+        incoming = matrix.dot(matrix.tdot(spread)) - self_similarity * spread
+        updated = (1 - DAMPING) / n + DAMPING * (incoming + scores[dangling].sum() / n)
+        converged = np.abs(updated - scores).sum() < TOLERANCE
+        scores = updated
+        if converged:
+            break
+    return scores
+
+
+def _similarity(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(term, 0.0) for term, weight in a.items())
+
+
+def preview(text, count=None):
+    """{"preview_summary": Markdown bullets of the most central sentences in text order, "sentences": n}"""
+    import numpy as np
+    count = count or preview_sentences()
+    sentences = split_sentences(text)
+    if not sentences:
+        return {"preview_summary": "", "sentences": 0}
+    matrix = TfidfMatrix(sentences)
+    scores = textrank(matrix)
+    words = np.array([len(sentence.split()) for sentence in sentences])
+    fits = (words >= MIN_WORDS) & (words <= MAX_WORDS)
+    # Best-scoring sentences of a sensible length first, the rest only as a fallback
+    order = np.lexsort((-scores, ~fits))
+    picked, vectors = [], []
+    for index in order[:count * 10].tolist():
+        vector = matrix.row(index)
+        if not vector or any(_similarity(vector, other) > MAX_OVERLAP for other in vectors):
+            continue
+        picked.append(index)
+        vectors.append(vector)
+        if len(picked) == count:
+            break
+    return {
+        "preview_summary": "\n".join(f"- {sentences[index]}" for index in sorted(picked)),
+        "sentences": len(sentences),
+    }
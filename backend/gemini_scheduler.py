@@ -0,0 +1,419 @@
+"""
+Central admission control for every Gemini call.
+
+All callers share one quota, so each call first takes a slot from the
+scheduler. Two token buckets enforce requests/minute and tokens/minute, a
+concurrency cap limits calls in flight, and waiting callers are ordered by
+weighted fair queuing across priority classes: interactive chat keeps most
+of the quota under contention while heavy and background work still make
+progress. Each class has a bounded queue and a maximum wait; overflowing
+either raises SchedulerBusy, which the API turns into 429 + Retry-After.
+
+The priority of a call comes from the `use_priority()` context, so pipeline
+helpers don't need to pass it around explicitly. Background work that a
+request may end up waiting for runs under an `Escalation` instead of a fixed
+class; `scheduler.escalate()` then moves its queued and later calls up to the
+waiting request's class, so the request doesn't wait behind the lowest one.
+
+The quota belongs to the API key, not to a process: with several workers
+(backend/server.py) the two buckets live in a SQLite file and every admission
+refills and takes from them in one BEGIN IMMEDIATE transaction, so all
+workers together stay within GEMINI_RPM/GEMINI_TPM. Queuing and the
+concurrency cap stay per process. The SQLite I/O never happens under the
+scheduler's lock: only the call at the head of the queue takes from the
+buckets, with the lock released, and token corrections after calls are
+summed and written once the lock is dropped. Setting GEMINI_QUOTA_DB_PATH to
+an empty string keeps the buckets in memory (one process only).
+
+Environment:
+    GEMINI_RPM              requests per minute, for all workers together (default 60)
+    GEMINI_TPM              tokens per minute, for all workers together (default 1000000)
+    GEMINI_QUOTA_DB_PATH    SQLite file of the shared buckets (default backend/data/gemini_quota.sqlite3)
+    GEMINI_MAX_CONCURRENCY  calls in flight at once, per worker (default 8)
+    GEMINI_QUEUE_LIMITS     per-class queue bounds, e.g. "interactive=20,heavy=10,background=5"
+    GEMINI_WEIGHTS          per-class WFQ weights, e.g. "interactive=8,heavy=3,background=1"
+    GEMINI_MAX_WAIT         seconds a call may wait for a slot (default 30)
+"""
+import contextvars
+import heapq
+import itertools
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from . import metrics
+from .jobs import _Closing
+from .structured_log import get_logger
+
+log = get_logger(__name__)
+
+INTERACTIVE = "interactive"
+HEAVY = "heavy"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, HEAVY, BACKGROUND)
+
+DEFAULT_WEIGHTS = {INTERACTIVE: 8, HEAVY: 3, BACKGROUND: 1}
+DEFAULT_QUEUE_LIMITS = {INTERACTIVE: 20, HEAVY: 10, BACKGROUND: 5}
+DEFAULT_QUOTA_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "gemini_quota.sqlite3")
+
+QUOTA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS gemini_buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+_current_priority = contextvars.ContextVar("gemini_priority", default=INTERACTIVE)
+
+queue_wait_seconds = metrics.histogram(
+    "gemini_queue_wait_seconds", "Time Gemini calls waited for a scheduler slot"
+)
+requests_total = metrics.counter(
+    "gemini_requests_total", "Gemini calls admitted by the scheduler"
+)
+rejected_total = metrics.counter(
+    "gemini_rejected_total", "Gemini calls rejected because the queue was full or the wait too long"
+)
+queue_depth = metrics.gauge(
+    "gemini_queue_depth", "Gemini calls currently waiting for a slot"
+)
+
+
+class SchedulerBusy(Exception):
+    """Raised when a call can't be admitted; carries a Retry-After hint in seconds"""
+
+    def __init__(self, priority, retry_after, reason="queue full"):
+        super().__init__(f"Gemini {priority} {reason}, retry after {retry_after}s")
+        self.priority = priority
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class Escalation:
+    """Priority class of a background task that can be raised while it runs (see GeminiScheduler.escalate)"""
+
+    def __init__(self, priority):
+        self.priority = priority
+
+
+def current_priority():
+    priority = _current_priority.get()
+    return priority.priority if isinstance(priority, Escalation) else priority
+
+
+@contextmanager
+def use_priority(priority):
+    """Run the enclosed Gemini calls under the given priority class, or under an Escalation"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def _parse_mapping(value, defaults, cast):
+    result = dict(defaults)
+    for item in (value or "").split(","):
+        if "=" in item:
+            name, number = item.split("=", 1)
+            if name.strip() in result:
+                result[name.strip()] = cast(number)
+    return result
+
+
+class TokenBucket:
+    """Continuously refilling bucket; `rate_per_minute` is also its capacity"""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` tokens are available (0 if they are now)"""
+        self.refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta):
+        """Charge (positive) or refund (negative) tokens after the actual cost is known"""
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class LocalQuota:
+    """Requests/minute and tokens/minute buckets of this process"""
+
+    def __init__(self, rpm, tpm):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    def try_take(self, tokens):
+        """Take one request and `tokens` tokens if both are available; otherwise the seconds to wait"""
+        now = time.monotonic()
+        wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+        if wait == 0:
+            self.requests.take(1)
+            self.tokens.take(tokens)
+        return wait
+
+    def adjust(self, delta):
+        self.tokens.adjust(delta)
+
+    def available_requests(self):
+        return self.requests.tokens
+
+
+class SharedQuota:
+    """The same buckets as LocalQuota in a SQLite file, shared by every process using it"""
+
+    def __init__(self, path, rpm, tpm):
+        self.path = path
+        self.capacity = {"requests": float(rpm), "tokens": float(tpm)}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(QUOTA_SCHEMA)
+        self._seen_requests = (float(rpm), time.time())    # request level after our last transaction
+
+    def _connect(self):
+        # A connection per call: the app is imported before the workers fork
+        return _Closing(sqlite3.connect(self.path, timeout=30, isolation_level=None))
+
+    def _levels(self, conn, now):
+        """name -> tokens available now, refilled for the (wall clock) time since the last update"""
+        stored = {name: (tokens, updated) for name, tokens, updated in conn.execute("SELECT name, tokens, updated FROM gemini_buckets")}
+        levels = {}
+        for name, capacity in self.capacity.items():
+            tokens, updated = stored.get(name, (capacity, now))
+            levels[name] = min(capacity, tokens + max(0.0, now - updated) * capacity / 60.0)
+        return levels
+
+    def _store(self, conn, levels, now):
+        conn.executemany(
+            "INSERT OR REPLACE INTO gemini_buckets (name, tokens, updated) VALUES (?, ?, ?)",
+            [(name, tokens, now) for name, tokens in levels.items()],
+        )
+
+    def try_take(self, tokens):
+        amounts = {"requests": 1.0, "tokens": float(min(tokens, self.capacity["tokens"]))}
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                levels = self._levels(conn, now)
+                wait = max(
+                    max(0.0, amounts[name] - levels[name]) / (self.capacity[name] / 60.0) for name in amounts
+                )
+                if wait == 0:
+                    levels = {name: levels[name] - amounts[name] for name in levels}
+                    self._store(conn, levels, now)
+                conn.execute("COMMIT")
+                self._seen_requests = (levels["requests"], now)
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def adjust(self, delta):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                levels = self._levels(conn, now)
+                levels["tokens"] = min(self.capacity["tokens"], levels["tokens"] - delta)
+                self._store(conn, levels, now)
+                conn.execute("COMMIT")
+                self._seen_requests = (levels["requests"], now)
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def available_requests(self):
+        """Estimate from our last transaction, refilled since; only used for Retry-After, so no I/O"""
+        level, seen = self._seen_requests
+        capacity = self.capacity["requests"]
+        return min(capacity, level + max(0.0, time.time() - seen) * capacity / 60.0)
+
+
+class _Waiter:
+    __slots__ = ("finish", "seq", "priority", "tokens", "enqueued", "escalation")
+
+    def __init__(self, finish, seq, priority, tokens, enqueued, escalation=None):
+        self.finish = finish
+        self.seq = seq
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued = enqueued
+        self.escalation = escalation
+
+    def __lt__(self, other):
+        return (self.finish, self.seq) < (other.finish, other.seq)
+
+
+class GeminiScheduler:
+    def __init__(self, rpm=None, tpm=None, max_concurrency=None, weights=None, queue_limits=None, max_wait=None,
+                 quota_path=None):
+        rpm = rpm or float(os.getenv("GEMINI_RPM", "60"))
+        self.token_capacity = tpm or float(os.getenv("GEMINI_TPM", "1000000"))
+        self.request_rate = rpm / 60.0
+        quota_path = quota_path if quota_path is not None else os.getenv("GEMINI_QUOTA_DB_PATH", DEFAULT_QUOTA_DB_PATH)
+        self.quota = SharedQuota(quota_path, rpm, self.token_capacity) if quota_path else LocalQuota(rpm, self.token_capacity)
+        self.max_concurrency = max_concurrency or int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+        self.weights = weights or _parse_mapping(os.getenv("GEMINI_WEIGHTS"), DEFAULT_WEIGHTS, float)
+        self.queue_limits = queue_limits or _parse_mapping(os.getenv("GEMINI_QUEUE_LIMITS"), DEFAULT_QUEUE_LIMITS, int)
+        self.max_wait = max_wait or float(os.getenv("GEMINI_MAX_WAIT", "30"))
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish = {priority: 0.0 for priority in PRIORITIES}
+        self._queued = {priority: 0 for priority in PRIORITIES}
+        self._in_flight = 0
+        self._taking = False          # the queue head is taking from the quota, outside the lock
+        self._pending_adjustment = 0  # token corrections not yet written to the quota
+
+    def _retry_after(self):
+        backlog = len(self._heap) + self._in_flight + 1
+        seconds = max(backlog - self.quota.available_requests(), 1) / self.request_rate
+        return max(1, math.ceil(seconds))
+
+    def _take_unlocked(self, tokens):
+        """quota.try_take with self._cond released; the caller holds it and is the queue head"""
+        self._taking = True
+        self._cond.release()
+        try:
+            return self.quota.try_take(tokens)
+        finally:
+            self._cond.acquire()
+            self._taking = False
+            self._cond.notify_all()
+
+    def acquire(self, priority, tokens):
+        """Block until a call of `tokens` estimated tokens may start; returns the queue wait in seconds"""
+        tokens = max(1, int(tokens))
+        with self._cond:
+            escalation = priority if isinstance(priority, Escalation) else None
+            if escalation is not None:
+                priority = escalation.priority    # read under the lock escalate() changes it with
+            if priority not in self._queued:
+                priority = INTERACTIVE
+            if self._queued[priority] >= self.queue_limits[priority]:
+                rejected_total.inc(priority=priority, reason="queue_full")
+                raise SchedulerBusy(priority, self._retry_after())
+            now = time.monotonic()
+            # Weighted fair queuing: each class advances its own virtual finish
+            # time by cost/weight, and the smallest finish time is served first.
+            start = max(self._virtual_time, self._last_finish[priority])
+            finish = start + min(tokens, self.token_capacity) / self.weights[priority]
+            self._last_finish[priority] = finish
+            waiter = _Waiter(finish, next(self._seq), priority, tokens, now, escalation)
+            heapq.heappush(self._heap, waiter)
+            self._queued[priority] += 1
+            queue_depth.set(self._queued[priority], priority=priority)
+            deadline = now + self.max_wait
+            try:
+                while True:
+                    now = time.monotonic()
+                    timeout = deadline - now
+                    # Only one caller takes from the quota at a time; it waits for a free slot first
+                    if self._heap[0] is waiter and not self._taking and self._in_flight < self.max_concurrency:
+                        wait = self._take_unlocked(tokens)
+                        if wait == 0:
+                            # Quota taken: admit even if an earlier-finishing call queued meanwhile
+                            self._heap.remove(waiter)
+                            heapq.heapify(self._heap)
+                            self._in_flight += 1
+                            self._virtual_time = max(self._virtual_time, waiter.finish)
+                            self._cond.notify_all()
+                            break
+                        timeout = min(deadline - time.monotonic(), wait)
+                    if deadline - time.monotonic() <= 0:
+                        rejected_total.inc(priority=waiter.priority, reason="timeout")
+                        raise SchedulerBusy(waiter.priority, self._retry_after(), reason="wait timed out")
+                    self._cond.wait(max(0.0, timeout))
+            finally:
+                if waiter in self._heap:    # timed out, or the quota raised
+                    self._heap.remove(waiter)
+                    heapq.heapify(self._heap)
+                    self._cond.notify_all()
+                self._queued[waiter.priority] -= 1
+                queue_depth.set(self._queued[waiter.priority], priority=waiter.priority)
+        waited = time.monotonic() - waiter.enqueued
+        queue_wait_seconds.observe(waited, priority=waiter.priority)
+        requests_total.inc(priority=waiter.priority)
+        return waited
+
+    def escalate(self, escalation, priority):
+        """Raise a running task's class to `priority` (never lower it), requeuing its waiting calls there"""
+        with self._cond:
+            if priority not in self._queued or PRIORITIES.index(priority) >= PRIORITIES.index(escalation.priority):
+                return
+            escalation.priority = priority
+            for waiter in self._heap:
+                if waiter.escalation is not escalation:
+                    continue
+                self._queued[waiter.priority] -= 1
+                queue_depth.set(self._queued[waiter.priority], priority=waiter.priority)
+                waiter.priority = priority
+                self._queued[priority] += 1
+                start = max(self._virtual_time, self._last_finish[priority])
+                waiter.finish = start + min(waiter.tokens, self.token_capacity) / self.weights[priority]
+                self._last_finish[priority] = waiter.finish
+            queue_depth.set(self._queued[priority], priority=priority)
+            heapq.heapify(self._heap)
+            self._cond.notify_all()
+
+    def release(self, estimated_tokens, actual_tokens=None):
+        with self._cond:
+            self._in_flight -= 1
+            if actual_tokens is not None:
+                self._pending_adjustment += actual_tokens - max(1, int(estimated_tokens))
+            self._cond.notify_all()
+        self._flush_adjustments()
+
+    def _flush_adjustments(self):
+        """Write the summed token corrections of finished calls to the quota, outside the lock"""
+        with self._cond:
+            delta, self._pending_adjustment = self._pending_adjustment, 0
+        if not delta:
+            return
+        try:
+            self.quota.adjust(delta)
+        except sqlite3.Error as e:
+            # The call itself succeeded; keep the correction for the next release
+            with self._cond:
+                self._pending_adjustment += delta
+            log.warning("Could not write the Gemini token correction", delta=delta, error=str(e))
+
+    @contextmanager
+    def slot(self, tokens, priority=None):
+        """Hold a scheduler slot around one Gemini call.
+
+        Yields a dict; set `usage["total_tokens"]` to the real token count so
+        the tokens/minute bucket is corrected after the call.
+        """
+        self.acquire(priority or _current_priority.get(), tokens)
+        usage = {"total_tokens": None}
+        try:
+            yield usage
+        finally:
+            self.release(tokens, usage["total_tokens"])
+
+
+scheduler = GeminiScheduler()
@@ -0,0 +1,205 @@
+"""
+OCR text of images seen before, found by perceptual hash.
+
+The same whiteboard photo is often uploaded again after a messaging app has
+re-compressed or resized it, so its bytes (and any hash of them) differ and
+/ocr/extract used to pay for Vision again. Each OCR'd image is stored with a
+perceptual hash (pHash): the image is shrunk to 32 x 32 brightness cells,
+transformed with a 2-D DCT, and each of the 12 x 12 lowest frequencies (except
+the constant term) becomes one bit, set if the coefficient is above their
+median. That keeps the layout of the page and ignores re-compression,
+resizing and brightness changes. A new image whose hash differs from a stored
+one in at most IMAGE_DEDUP_DISTANCE bits (Hamming distance) gets that image's
+text without an OCR call; byte-identical images match by SHA-256 first.
+Cropped or rotated re-uploads usually don't match.
+
+Hashes are kept in SQLite, so every worker process shares them. Each process
+holds them as rows of a NumPy byte matrix and compares a query with all of
+them at once (XOR, then popcount), the same way the answer cache scans its
+question vectors; rows written by other processes are appended on the next
+lookup. backend/benchmarks/image_dedup.py measures matches and false matches
+per distance on a test set, and this scan against a BK-tree:
+    python -m backend.benchmarks.image_dedup
+
+Environment:
+    IMAGE_DEDUP            set to 0 to disable
+    IMAGE_DEDUP_DISTANCE   largest Hamming distance (of 143 bits) that counts as the same image (default 16)
+    IMAGE_DEDUP_DB_PATH    SQLite file (default backend/data/image_hashes.sqlite3)
+    IMAGE_DEDUP_TTL        seconds an image's text is reused (default 30 days)
+"""
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+
+from . import metrics
+from .jobs import _Closing
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "image_hashes.sqlite3")
+DEFAULT_DISTANCE = 16
+# Brightness cells per side, and low frequencies per side that make up the hash
+DCT_SIZE = 32
+HASH_FREQUENCIES = 12
+HASH_BITS = HASH_FREQUENCIES * HASH_FREQUENCIES - 1
+HASH_BYTES = (HASH_BITS + 7) // 8
+# Images are reduced to this size by the decoder before the cells are averaged
+PREVIEW_SIDE = 256
+
+lookups_counter = metrics.counter("image_dedup_lookups_total", "Perceptual-hash lookups before OCR, by result")
+distance_histogram = metrics.histogram(
+    "image_dedup_match_distance", "Hamming distance of near-duplicate image matches", buckets=(2, 4, 6, 8, 10, 12, 16, 20, 24, 32)
+)
+entries_gauge = metrics.gauge("image_dedup_entries", "Image hashes held by this worker")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_texts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sha256 TEXT NOT NULL,
+    phash TEXT NOT NULL,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS image_texts_sha256 ON image_texts (sha256);
+CREATE INDEX IF NOT EXISTS image_texts_created ON image_texts (created_at);
+"""
+
+_dct_matrix = None
+_popcount_table = None
+_index_lock = threading.Lock()
+_index = None
+
+
+def enabled():
+    return os.getenv("IMAGE_DEDUP", "1").lower() not in ("0", "false", "no", "off")
+
+
+def phash(contents):
+    """Perceptual hash of an encoded image, as HASH_BYTES bytes"""
+    global _dct_matrix
+    import numpy as np
+    from PIL import Image, ImageOps
+
+    if _dct_matrix is None:
+        frequencies = np.arange(DCT_SIZE)[:, None]
+        positions = np.arange(DCT_SIZE)[None, :]
+        _dct_matrix = np.cos(np.pi * (2 * positions + 1) * frequencies / (2 * DCT_SIZE))
+    image = Image.open(io.BytesIO(contents))
+    image.draft("L", (PREVIEW_SIDE, PREVIEW_SIDE))
+    image = ImageOps.exif_transpose(image).convert("L")
+    image.thumbnail((PREVIEW_SIDE, PREVIEW_SIDE))
+    cells = np.asarray(image.resize((DCT_SIZE, DCT_SIZE), Image.BOX), dtype=np.float64)
+    low = (_dct_matrix @ cells @ _dct_matrix.T)[:HASH_FREQUENCIES, :HASH_FREQUENCIES].ravel()[1:]
+    return np.packbits(low > np.median(low)).tobytes()
+
+
+def distances(matrix, image_hash):
+    """Hamming distance of `image_hash` to each row of a (n, HASH_BYTES) uint8 matrix"""
+    global _popcount_table
+    import numpy as np
+
+    xor = matrix ^ np.frombuffer(image_hash, dtype=np.uint8)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(xor).sum(axis=1, dtype=np.int32)
+    # NumPy < 2.0
+    if _popcount_table is None:
+        _popcount_table = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.int32)
+    return _popcount_table[xor].sum(axis=1)
+
+
+def hamming(a, b):
+    return sum(bin(x ^ y).count("1") for x, y in zip(a, b))
+
+
+class ImageTextIndex:
+    def __init__(self, path=None, distance=None, ttl=None):
+        import numpy as np
+        self.path = path or os.getenv("IMAGE_DEDUP_DB_PATH", DEFAULT_DB_PATH)
+        if distance is None:
+            distance = int(os.getenv("IMAGE_DEDUP_DISTANCE", str(DEFAULT_DISTANCE)))
+        self.distance = distance
+        self.ttl = ttl or float(os.getenv("IMAGE_DEDUP_TTL", str(30 * 24 * 3600)))
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        self._matrix = np.zeros((0, HASH_BYTES), dtype=np.uint8)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return _Closing(conn)
+
+    def _refresh(self, conn):
+        """Append rows written since the last refresh (by any process)"""
+        import numpy as np
+        loaded = int(self._ids[-1]) if len(self._ids) else 0
+        rows = conn.execute("SELECT id, phash FROM image_texts WHERE id > ? ORDER BY id", (loaded,)).fetchall()
+        if rows:
+            hashes = np.frombuffer(b"".join(bytes.fromhex(row["phash"]) for row in rows), dtype=np.uint8)
+            self._matrix = np.vstack([self._matrix, hashes.reshape(len(rows), HASH_BYTES)])
+            self._ids = np.concatenate([self._ids, np.array([row["id"] for row in rows], dtype=np.int64)])
+            entries_gauge.set(len(self._ids))
+
+    def lookup(self, contents):
+        """
+        {"text", "match", "distance", "phash"} for a stored image that is the
+        same or nearly the same as `contents`; "text" is None if there is none
+        ("phash" is None for exact matches, which don't need it)
+        """
+        import numpy as np
+        sha256 = hashlib.sha256(contents).hexdigest()
+        oldest = time.time() - self.ttl
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT text FROM image_texts WHERE sha256 = ? AND created_at >= ? LIMIT 1", (sha256, oldest)
+            ).fetchone()
+            if row is not None:
+                lookups_counter.inc(result="exact")
+                return {"text": row["text"], "match": "exact", "distance": 0, "phash": None}
+            image_hash = phash(contents)
+            with self._lock:
+                self._refresh(conn)
+                scores = distances(self._matrix, image_hash)
+                close = np.flatnonzero(scores <= self.distance)
+                candidates = sorted((int(scores[index]), int(self._ids[index])) for index in close)
+            for distance, row_id in candidates:
+                row = conn.execute(
+                    "SELECT text FROM image_texts WHERE id = ? AND created_at >= ?", (row_id, oldest)
+                ).fetchone()
+                if row is not None:
+                    lookups_counter.inc(result="near")
+                    distance_histogram.observe(distance)
+                    return {"text": row["text"], "match": "near", "distance": distance, "phash": image_hash}
+        lookups_counter.inc(result="miss")
+        return {"text": None, "match": None, "distance": None, "phash": image_hash}
+
+    def store(self, contents, text, image_hash=None):
+        import numpy as np
+        if image_hash is None:
+            image_hash = phash(contents)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO image_texts (sha256, phash, text, created_at) VALUES (?, ?, ?, ?)",
+                (hashlib.sha256(contents).hexdigest(), image_hash.hex(), text, now),
+            )
+            expired = conn.execute("DELETE FROM image_texts WHERE created_at < ?", (now - self.ttl,)).rowcount
+        if expired:
+            # Reload the remaining rows on the next lookup; rows expired by other processes are skipped until then
+            with self._lock:
+                self._matrix = np.zeros((0, HASH_BYTES), dtype=np.uint8)
+                self._ids = np.zeros(0, dtype=np.int64)
+
+
+def get_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ImageTextIndex()
+        return _index
@@ -0,0 +1,275 @@
+"""
+Incremental /enhance-summary for documents that grow over time.
+
+The text is cut into content-defined chunks: a chunk ends after a line whose
+hash hits a fixed pattern (once the chunk is at least CHUNK_MIN_CHARS long),
+or at CHUNK_MAX_CHARS. Boundaries depend only on nearby content, so appending
+pages or editing one page leaves the other chunks byte-identical.
+
+Each chunk is corrected and summarized on its own, and the results are stored
+per document under the chunk's SHA-256. When the same document_id comes back,
+only chunks that aren't stored yet go to Gemini; the per-chunk summaries are
+then merged locally (sections with the same heading are combined, repeated
+bullets dropped), so the cost of an update follows the size of the change.
+A chunk whose correction call fails is summarized from its raw text for this
+request but not stored, so the next request corrects it again.
+
+Environment:
+    SUMMARY_DB_PATH         SQLite file (default backend/data/summaries.sqlite3)
+    SUMMARY_CHUNK_WORKERS   chunks processed concurrently per request (default 4)
+    SUMMARY_CACHE_TTL       seconds an untouched document is kept (default 30 days)
+"""
+import contextvars
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from . import metrics
+from .gemini_scheduler import SchedulerBusy
+from .jobs import _Closing
+from .structured_log import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "summaries.sqlite3")
+CHUNK_MIN_CHARS = 4000
+CHUNK_MAX_CHARS = 12000
+# A line ends a chunk when its CRC is 0 modulo this (once the chunk is long enough)
+BOUNDARY_DIVISOR = 8
+
+chunks_counter = metrics.counter("incremental_summary_chunks_total", "Chunks seen by incremental summaries, by outcome")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS summary_chunks (
+    document_id TEXT NOT NULL,
+    chunk_hash TEXT NOT NULL,
+    corrected TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    PRIMARY KEY (document_id, chunk_hash)
+);
+CREATE TABLE IF NOT EXISTS summary_documents (
+    document_id TEXT PRIMARY KEY,
+    chunk_hashes TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+_store_lock = threading.Lock()
+_store = None
+
+
+def chunk_text(text):
+    """Split text into content-defined chunks of whole lines"""
+    chunks = []
+    current = []
+    size = 0
+    for line in text.splitlines(keepends=True):
+        current.append(line)
+        size += len(line)
+        at_boundary = size >= CHUNK_MIN_CHARS and zlib.crc32(line.strip().encode("utf-8")) % BOUNDARY_DIVISOR == 0
+        if at_boundary or size >= CHUNK_MAX_CHARS:
+            chunks.append("".join(current))
+            current, size = [], 0
+    if current:
+        chunks.append("".join(current))
+    # Whitespace-only differences (e.g. a trailing newline) shouldn't create new chunks
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def chunk_hash(chunk):
+    return hashlib.sha256(chunk.strip().encode("utf-8")).hexdigest()
+
+
+_SECTION_NUMBER = re.compile(r"^section\s+\d+\s*[:.-]\s*", re.IGNORECASE)
+
+
+def _parse_summary(markdown):
+    """(title, [(heading, lines)]) of a structured summary; the first heading may be None"""
+    title = None
+    sections = [(None, [])]
+    for line in markdown.splitlines():
+        if line.startswith("# ") and title is None:
+            title = line[2:].strip()
+        elif line.startswith("## "):
+            sections.append((line[3:].strip(), []))
+        else:
+            sections[-1][1].append(line)
+    return title, [(heading, lines) for heading, lines in sections if heading or any(line.strip() for line in lines)]
+
+
+def merge_summaries(summaries):
+    """Combine per-chunk structured summaries, in order, into one"""
+    title = None
+    merged = {}    # key -> [heading, lines, seen bullet texts]
+    numbered = False
+    for summary in summaries:
+        chunk_title, sections = _parse_summary(summary)
+        title = title or chunk_title
+        for heading, lines in sections:
+            if heading and _SECTION_NUMBER.match(heading):
+                numbered = True
+                heading = _SECTION_NUMBER.sub("", heading)
+            key = re.sub(r"\W+", " ", heading or "").strip().lower()
+            section = merged.setdefault(key, [heading, [], set()])
+            for line in lines:
+                bullet = line.strip()
+                if bullet.startswith(("-", "*")) and bullet in section[2]:
+                    continue
+                section[2].add(bullet)
+                section[1].append(line)
+    parts = [f"# {title or 'Summary'}"]
+    number = 0
+    for heading, lines, _ in merged.values():
+        body = "\n".join(lines).strip("\n")
+        if heading:
+            number += 1
+            parts.append(f"## Section {number}: {heading}" if numbered else f"## {heading}")
+        if body:
+            parts.append(body)
+    return "\n\n".join(parts) + "\n"
+
+
+class SummaryStore:
+    """Corrected text and partial summary of each chunk, per document"""
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return _Closing(conn)
+
+    def load(self, document_id):
+        """chunk hash -> (corrected, summary) for the stored chunks of a document"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT chunk_hash, corrected, summary FROM summary_chunks WHERE document_id = ?", (document_id,)
+            ).fetchall()
+        return {row["chunk_hash"]: (row["corrected"], row["summary"]) for row in rows}
+
+    def save(self, document_id, hashes, new_chunks, now):
+        """Store new chunks and make `hashes` the document's current version, dropping unused chunks"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO summary_chunks (document_id, chunk_hash, corrected, summary) VALUES (?, ?, ?, ?)",
+                    [(document_id, digest, corrected, summary) for digest, (corrected, summary) in new_chunks.items()],
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO summary_documents (document_id, chunk_hashes, updated_at) VALUES (?, ?, ?)",
+                    (document_id, json.dumps(hashes), now),
+                )
+                placeholders = ",".join("?" for _ in hashes)
+                removed = conn.execute(
+                    f"DELETE FROM summary_chunks WHERE document_id = ? AND chunk_hash NOT IN ({placeholders})",
+                    (document_id, *hashes),
+                ).rowcount
+                expired = [row[0] for row in conn.execute(
+                    "SELECT document_id FROM summary_documents WHERE updated_at < ?", (now - self.ttl,)
+                )]
+                for expired_id in expired:
+                    conn.execute("DELETE FROM summary_chunks WHERE document_id = ?", (expired_id,))
+                    conn.execute("DELETE FROM summary_documents WHERE document_id = ?", (expired_id,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return removed
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SummaryStore(
+                os.getenv("SUMMARY_DB_PATH", DEFAULT_DB_PATH),
+                float(os.getenv("SUMMARY_CACHE_TTL", str(30 * 24 * 3600))),
+            )
+        return _store
+
+
+def run(document_id, text, correct, summarize, report):
+    """
+    Incremental version of the enhance-summary pipeline.
+    `correct` and `summarize` are the single-text steps (correct_ocr_text,
+    generate_structured_summary); `correct` must raise when it fails rather
+    than return the text unchanged. `report(stage, progress)` as for jobs.
+    """
+    store = get_store()
+    chunks = chunk_text(text)
+    if not chunks:
+        raise ValueError("No text to summarize")
+    hashes = [chunk_hash(chunk) for chunk in chunks]
+    stored = store.load(document_id)
+    pending = {digest: chunk for digest, chunk in zip(hashes, chunks) if digest not in stored}
+    reused = len(set(hashes)) - len(pending)
+    chunks_counter.inc(reused, outcome="reused")
+    chunks_counter.inc(len(pending), outcome="processed")
+    log.info("Incremental summary", document_id=document_id, chunks=len(chunks), reused=reused, processed=len(pending))
+
+    new_chunks = {}
+    uncached = set()
+    done = []
+    progress_lock = threading.Lock()
+
+    def process(digest, chunk):
+        try:
+            corrected, stored = correct(chunk), True
+        except SchedulerBusy:
+            raise
+        except Exception as e:
+            log.warning("Chunk correction failed, not caching the chunk", document_id=document_id, error=str(e))
+            corrected, stored = chunk, False
+        summary = summarize(corrected)
+        if summary.startswith("Error generating summary"):
+            raise RuntimeError(summary)
+        with progress_lock:
+            done.append(digest)
+            report("summarizing", 0.1 + 0.8 * len(done) / len(pending))
+        return digest, (corrected, summary), stored
+
+    if pending:
+        report("summarizing", 0.1)
+        workers = max(1, min(len(pending), int(os.getenv("SUMMARY_CHUNK_WORKERS", "4"))))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="summary-chunk") as pool:
+            # Each chunk runs in a copy of this context: Gemini priority, Server-Timing and token budget reports
+            futures = [
+                pool.submit(contextvars.copy_context().run, process, digest, chunk)
+                for digest, chunk in pending.items()
+            ]
+            for future in futures:
+                digest, result, cacheable = future.result()
+                new_chunks[digest] = result
+                if not cacheable:
+                    uncached.add(digest)
+
+    results = {**stored, **new_chunks}
+    report("merging", 0.9)
+    cacheable = {digest: result for digest, result in new_chunks.items() if digest not in uncached}
+    removed = store.save(document_id, hashes, cacheable, time.time())
+    return {
+        "corrected_text": "\n\n".join(results[digest][0] for digest in hashes),
+        "structured_summary": merge_summaries(results[digest][1] for digest in hashes),
+        "incremental": {
+            "document_id": document_id,
+            "chunks": len(chunks),
+            "reused": reused,
+            "processed": len(pending),
+            "removed": removed,
+        },
+    }
@@ -0,0 +1,397 @@
+"""
+Persistent background jobs for long-running pipelines.
+
+Jobs are stored in a SQLite table so they survive restarts and can be shared by
+several worker processes. Each process runs a small poller that claims queued
+jobs (an atomic UPDATE ... WHERE status = 'queued') into a thread pool, keeps a
+heartbeat on the jobs it is running and hands orphaned jobs (whose worker died)
+back to the queue. Identical submissions are de-duplicated by a hash of their
+input, and finished jobs expire after a TTL.
+
+On shutdown, jobs not started yet are cancelled and requeued at once; running
+jobs get up to JOB_STOP_TIMEOUT seconds to finish before they are requeued
+too. A job's progress and result are only written while the process still
+owns it, so a job requeued (and claimed elsewhere) under a thread that is
+still running can't be overwritten by that thread.
+
+Environment:
+    JOB_DB_PATH       SQLite file (default backend/data/jobs.sqlite3)
+    JOB_WORKERS       jobs run concurrently per process (default 2)
+    JOB_RESULT_TTL    seconds a finished job and its result are kept (default 3600)
+    JOB_STALE_AFTER   seconds without a heartbeat before a running job is requeued (default 300)
+    JOB_STOP_TIMEOUT  seconds shutdown waits for running jobs before requeuing them (default 20)
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from .structured_log import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "jobs.sqlite3")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL,
+    attachment BLOB,
+    result BLOB,
+    media_type TEXT,
+    error TEXT,
+    owner TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+"""
+
+# Columns returned by status lookups (everything except the potentially large blobs)
+STATUS_COLUMNS = "id, kind, status, stage, progress, media_type, error, attempts, created_at, updated_at, expires_at"
+
+
+class JobNotFound(Exception):
+    pass
+
+
+def dedup_key(kind, payload, attachment=None):
+    """Stable hash of a job's kind and input"""
+    digest = hashlib.sha256(kind.encode("utf-8"))
+    digest.update(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+    if attachment is not None:
+        digest.update(hashlib.sha256(attachment).digest())
+    return digest.hexdigest()
+
+
+class JobStore:
+    """Thin data-access layer over the SQLite jobs table"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return _Closing(conn)
+
+    def insert_unless_live(self, job_id, kind, key, payload, attachment, now):
+        """Insert a queued job unless a live (not failed, not expired) one has the same key; returns that one, or None
+
+        The lookup and the insert share one write transaction, so concurrent identical submissions
+        (from any worker process) create a single job.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    f"SELECT {STATUS_COLUMNS} FROM jobs WHERE dedup_key = ? AND status != ? "
+                    "AND (expires_at IS NULL OR expires_at > ?) ORDER BY created_at DESC LIMIT 1",
+                    (key, FAILED, now),
+                ).fetchone()
+                if row is None:
+                    conn.execute(
+                        "INSERT INTO jobs (id, kind, dedup_key, status, progress, payload, attachment, created_at, updated_at) "
+                        "VALUES (?, ?, ?, ?, 0, ?, ?, ?, ?)",
+                        (job_id, kind, key, QUEUED, json.dumps(payload), attachment, now, now),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return dict(row) if row else None
+
+    def get(self, job_id, with_result=False):
+        columns = STATUS_COLUMNS + (", result" if with_result else "")
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {columns} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def claim(self, kinds, owner, now):
+        """Atomically move the oldest queued job to running and return it with its input"""
+        placeholders = ",".join("?" for _ in kinds)
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    f"SELECT id, kind, payload, attachment FROM jobs WHERE status = ? AND kind IN ({placeholders}) "
+                    "ORDER BY created_at LIMIT 1",
+                    (QUEUED, *kinds),
+                ).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, owner = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (RUNNING, owner, now, row["id"]),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return dict(row) if row else None
+
+    def update_progress(self, job_id, owner, stage, progress, now):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET stage = ?, progress = ?, updated_at = ? WHERE id = ? AND status = ? AND owner = ?",
+                (stage, progress, now, job_id, RUNNING, owner),
+            )
+
+    def heartbeat(self, job_ids, now):
+        if not job_ids:
+            return
+        placeholders = ",".join("?" for _ in job_ids)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET updated_at = ? WHERE id IN ({placeholders})", (now, *job_ids))
+
+    def finish(self, job_id, owner, result, media_type, now, ttl):
+        """Store the result, unless the job was requeued meanwhile; returns whether it was stored"""
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = ?, stage = 'done', progress = 1, result = ?, media_type = ?, "
+                "attachment = NULL, updated_at = ?, expires_at = ? WHERE id = ? AND status = ? AND owner = ?",
+                (SUCCEEDED, result, media_type, now, now + ttl, job_id, RUNNING, owner),
+            ).rowcount > 0
+
+    def fail(self, job_id, owner, error, now, ttl):
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, attachment = NULL, updated_at = ?, expires_at = ? "
+                "WHERE id = ? AND status = ? AND owner = ?",
+                (FAILED, error, now, now + ttl, job_id, RUNNING, owner),
+            ).rowcount > 0
+
+    def requeue_stale(self, stale_before):
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL WHERE status = ? AND updated_at < ?",
+                (QUEUED, RUNNING, stale_before),
+            ).rowcount
+
+    def requeue(self, job_id, owner):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL WHERE id = ? AND status = ? AND owner = ?",
+                (QUEUED, job_id, RUNNING, owner),
+            )
+
+    def requeue_owned(self, owner):
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL WHERE status = ? AND owner = ?",
+                (QUEUED, RUNNING, owner),
+            ).rowcount
+
+    def running_owners(self):
+        with self._connect() as conn:
+            return [row["owner"] for row in conn.execute(
+                "SELECT DISTINCT owner FROM jobs WHERE status = ? AND owner IS NOT NULL", (RUNNING,)
+            )]
+
+    def purge_expired(self, now):
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)).rowcount
+
+
+class _Closing:
+    """Context manager that closes (not just commits) a sqlite3 connection"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, *exc):
+        self.conn.close()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class JobManager:
+    """Registers job handlers and runs claimed jobs on a thread pool"""
+
+    def __init__(self, db_path=None, workers=None, result_ttl=None, stale_after=None, poll_interval=0.5,
+                 stop_timeout=None):
+        self.db_path = db_path or os.getenv("JOB_DB_PATH", DEFAULT_DB_PATH)
+        self.workers = workers or int(os.getenv("JOB_WORKERS", "2"))
+        self.result_ttl = result_ttl or float(os.getenv("JOB_RESULT_TTL", "3600"))
+        self.stale_after = stale_after or float(os.getenv("JOB_STALE_AFTER", "300"))
+        self.stop_timeout = stop_timeout if stop_timeout is not None else float(os.getenv("JOB_STOP_TIMEOUT", "20"))
+        self.poll_interval = poll_interval
+        self.handlers = {}
+        self.store = None
+        self.owner = None
+        self._executor = None
+        self._running = {}    # job id -> future, from claim until the job is done
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._poller = None
+
+    def register(self, kind, handler):
+        """handler(payload, attachment, report) -> dict (JSON result) or (bytes, media_type)"""
+        self.handlers[kind] = handler
+
+    def start(self):
+        if self._poller is not None:
+            return
+        self.store = JobStore(self.db_path)
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._stop.clear()
+        self._requeue_dead_owners()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self._poller = threading.Thread(target=self._poll_loop, name="job-poller", daemon=True)
+        self._poller.start()
+        log.info("Job manager started", db_path=self.db_path, workers=self.workers)
+
+    def stop(self):
+        if self._poller is None:
+            return
+        self._stop.set()
+        self._wakeup.set()
+        self._poller.join()
+        self._poller = None
+        # Claimed jobs that haven't started are cancelled; running ones may still finish in time
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            futures = [future for future in self._running.values() if not future.cancelled()]
+        _, unfinished = wait(futures, timeout=self.stop_timeout)
+        # Cancelled and still-running jobs go back to the queue for the next process; threads
+        # still running can't overwrite them afterwards (finish/fail check the owner)
+        requeued = self.store.requeue_owned(self.owner)
+        with self._lock:
+            self._running.clear()
+        log.info("Job manager stopped", requeued=requeued, unfinished=len(unfinished))
+
+    def _requeue_dead_owners(self):
+        """Requeue jobs left running by processes on this host that no longer exist"""
+        requeued = 0
+        for owner in self.store.running_owners():
+            pid_text = owner.split("-", 1)[0]
+            if not pid_text.isdigit() or not _pid_alive(int(pid_text)):
+                requeued += self.store.requeue_owned(owner)
+        if requeued:
+            log.info("Requeued jobs from a previous run", requeued=requeued)
+
+    def submit(self, kind, payload, attachment=None):
+        """Create a job, or return the live job with the same input; returns (status, deduplicated)"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        key = dedup_key(kind, payload, attachment)
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        existing = self.store.insert_unless_live(job_id, kind, key, payload, attachment, now)
+        if existing:
+            return existing, True
+        self._wakeup.set()
+        return self.store.get(job_id), False
+
+    def status(self, job_id):
+        job = self.store.get(job_id)
+        if job is None or (job["expires_at"] and job["expires_at"] <= time.time()):
+            raise JobNotFound(job_id)
+        return job
+
+    def result(self, job_id):
+        job = self.store.get(job_id, with_result=True)
+        if job is None or (job["expires_at"] and job["expires_at"] <= time.time()):
+            raise JobNotFound(job_id)
+        return job
+
+    # -- worker side -------------------------------------------------------
+
+    def _poll_loop(self):
+        last_maintenance = 0.0
+        while not self._stop.is_set():
+            now = time.time()
+            if now - last_maintenance > min(30.0, self.stale_after / 2):
+                last_maintenance = now
+                self._maintenance(now)
+            while self._free_slots() > 0 and not self._stop.is_set():
+                job = self.store.claim(list(self.handlers), self.owner, time.time())
+                if job is None:
+                    break
+                with self._lock:
+                    self._running[job["id"]] = self._executor.submit(self._run, job)
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _maintenance(self, now):
+        try:
+            with self._lock:
+                running = list(self._running)
+            self.store.heartbeat(running, now)
+            requeued = self.store.requeue_stale(now - self.stale_after)
+            purged = self.store.purge_expired(now)
+            if requeued or purged:
+                log.info("Job maintenance", requeued=requeued, purged=purged)
+        except sqlite3.Error as e:
+            log.warning("Job maintenance failed", error=str(e))
+
+    def _free_slots(self):
+        with self._lock:
+            return self.workers - len(self._running)
+
+    def _run(self, job):
+        job_id = job["id"]
+
+        def report(stage, progress):
+            self.store.update_progress(job_id, self.owner, stage, progress, time.time())
+
+        started = time.perf_counter()
+        try:
+            output = self.handlers[job["kind"]](json.loads(job["payload"]), job["attachment"], report)
+            if isinstance(output, tuple):
+                body, media_type = output
+            else:
+                body, media_type = json.dumps(output).encode("utf-8"), "application/json"
+            if not self.store.finish(job_id, self.owner, bytes(body), media_type, time.time(), self.result_ttl):
+                log.warning("Job result discarded, the job was requeued meanwhile", job_id=job_id, kind=job["kind"])
+                return
+            log.info("Job succeeded", job_id=job_id, kind=job["kind"],
+                     duration_ms=round((time.perf_counter() - started) * 1000, 1))
+        except Exception as e:
+            retry_after = getattr(e, "retry_after", None)
+            if retry_after is not None:
+                # Upstream is saturated (e.g. SchedulerBusy): back off, then put the job back
+                log.info("Job deferred", job_id=job_id, kind=job["kind"], retry_after=retry_after)
+                self._stop.wait(min(retry_after, 60))
+                self.store.requeue(job_id, self.owner)
+                return
+            self.store.fail(job_id, self.owner, str(e), time.time(), self.result_ttl)
+            log.warning("Job failed", job_id=job_id, kind=job["kind"], error=str(e))
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+            self._wakeup.set()
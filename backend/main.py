@@ -1,21 +1,98 @@
-from fastapi import File, UploadFile
-from fastapi import FastAPI
-# Add dotenv import for load_dotenv
-from dotenv import load_dotenv
-
-# ...existing code...
+import asyncio
+import functools
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
 
-from fastapi import Form
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
+from dotenv import load_dotenv
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel
 
-# ...existing code...
+from . import metrics
+from .artifacts import ArtifactNotFound, ArtifactStore
+from .ai_clients import detect_text, generate_text, synthesize_mp3, vision_available, warm_up
+from .gemini_scheduler import BACKGROUND, HEAVY, SchedulerBusy, use_priority
+from . import answer_cache, image_dedup, incremental_summary, ocr_cleanup, page_analysis, prefetch, token_budget
+from . import extractive_summary, speech_text
+from .jobs import JobManager, JobNotFound, SUCCEEDED, FAILED
+from . import profiling
+from .prefetch import Prefetcher
+from .responses import BufferResponse
+from .pdf_text import extract_pages as extract_pdf_pages, extract_text as extract_pdf_text
+from .server_timing import ServerTimingMiddleware, TimedJSONResponse, stage
+from .upload_sessions import SessionClosed, SessionNotFound, UploadSessionManager
+from .structured_log import get_logger, Preview
+
+# Heavy dependencies (google.generativeai, google.cloud.vision, reportlab, PIL,
+# gTTS, PyPDF2, fpdf) are imported inside the functions that use them so that
+# importing this module, and answering /health, stays fast on a cold worker.
+# Set WARMUP_ON_STARTUP=1 to load them in the background right after startup.
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="AI Backend API", version="1.0.0")
+log = get_logger(__name__)
+
+# Initialize Gemini API
+gemini_api_key = os.getenv("GEMINI_API_KEY")
+
+
+# Background jobs for the long-running pipelines (handlers registered below)
+job_manager = JobManager()
+# Files produced by /notebot/process, downloaded by id
+artifact_store = ArtifactStore()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if os.getenv("WARMUP_ON_STARTUP", "").lower() in ("1", "true", "yes"):
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    job_manager.start()
+    upload_sessions.start()
+    yield
+    prefetcher.stop()
+    upload_sessions.stop()
+    job_manager.stop()
+
+
+app = FastAPI(title="AI Backend API", version="1.0.0", lifespan=lifespan, default_response_class=TimedJSONResponse)
+
+
+@app.exception_handler(SchedulerBusy)
+async def scheduler_busy_handler(request: Request, exc: SchedulerBusy):
+    # Gemini quota is saturated for this priority class: ask the client to retry later
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "success": False, "error": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+# Enable CORS for Next.js frontend
+ALLOWED_ORIGINS = ["http://localhost:3000", "http://localhost:3001", "http://localhost:3002", "http://localhost:3003", "http://127.0.0.1:3000", "http://127.0.0.1:3001", "http://127.0.0.1:3002", "http://127.0.0.1:3003", "http://localhost:8001", "http://localhost:8002"]
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=ALLOWED_ORIGINS,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Id"],
+)
+
+# Opt-in per-request profiling (X-Profile header or PROFILE_SAMPLE_RATE)
+app.add_middleware(profiling.ProfilingMiddleware)
+
+# Per-stage durations in a Server-Timing header on every response
+app.add_middleware(ServerTimingMiddleware, allowed_origins=ALLOWED_ORIGINS)
+
 
 @app.post("/ocr/pdf-report")
 async def ocr_pdf_report(file: UploadFile = File(...), summary: str = Form("")):
@@ -25,85 +102,15 @@ async def ocr_pdf_report(file: UploadFile = File(...), summary: str = Form("")):
     """
     try:
         contents = await file.read()
-        from PyPDF2 import PdfReader
-        import io
-        pdf_reader = PdfReader(io.BytesIO(contents))
-        extracted_text = ""
-        for page in pdf_reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                extracted_text += page_text + "\n"
-        if not extracted_text.strip():
-            raise Exception("Could not extract text from the PDF. Please try a clearer file.")
-
-        # Generate a new PDF report using reportlab
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        styles = getSampleStyleSheet()
-        story = []
-        story.append(Paragraph(f"<b>PDF OCR Report</b>", styles['Title']))
-        story.append(Spacer(1, 12))
-        if summary:
-            story.append(Paragraph(f"<b>Summary:</b> {summary}", styles['Normal']))
-            story.append(Spacer(1, 12))
-        story.append(Paragraph(f"<b>Extracted Text:</b>", styles['Heading2']))
-        story.append(Paragraph(extracted_text.replace("\n", "<br/>"), styles['Normal']))
-        doc.build(story)
-        pdf_bytes = buffer.getvalue()
-        buffer.close()
-        return StreamingResponse(
-            io.BytesIO(pdf_bytes),
+        output = await run_in_threadpool(render_ocr_pdf_report, contents, summary)
+        return BufferResponse(
+            output,
             media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=ocr_report_{file.filename or 'output'}.pdf"
-            }
+            filename=f"ocr_report_{file.filename or 'output'}.pdf",
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"PDF OCR report generation failed: {str(e)}")
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Request
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-import google.generativeai as genai
-from google.cloud import vision
-import os
-from dotenv import load_dotenv
-import base64
-import io
-from PIL import Image
-import json
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.colors import HexColor
-from datetime import datetime
-from gtts import gTTS
-from PyPDF2 import PdfReader
-
-
-from .pdf_generator_fpdf import generate_pdf_with_fpdf
-from .roadmap_generator import generate_roadmap_with_gemini
-from .roadmap_pdf import generate_roadmap_pdf
-
-
-
-# ...existing code...
-
-# Place this endpoint after app is defined
-
-# (moved below, after app = FastAPI(...))
-import tempfile
-import re
-
-# Load environment variables
-load_dotenv()
-
-
-app = FastAPI(title="AI Backend API", version="1.0.0")
-
-# Now define the /download-roadmap-pdf endpoint here
 @app.post("/download-roadmap-pdf")
 async def download_roadmap_pdf(request: Request):
     try:
@@ -115,7 +122,9 @@ async def download_roadmap_pdf(request: Request):
         if not roadmap:
             if not gemini_api_key:
                 raise HTTPException(status_code=500, detail="Gemini API key not configured")
-            roadmap = generate_roadmap_with_gemini(topic, gemini_api_key)
+            from .roadmap_generator import generate_roadmap_with_gemini
+            with use_priority(BACKGROUND), stage("gemini_roadmap"):
+                roadmap = await run_in_threadpool(generate_roadmap_with_gemini, topic, gemini_api_key)
 
         # If roadmap is a string (Markdown), convert to a simple roadmap object
         if isinstance(roadmap, str):
@@ -129,33 +138,20 @@ async def download_roadmap_pdf(request: Request):
         else:
             roadmap_obj = roadmap
 
-        pdf_bytes = generate_roadmap_pdf(roadmap_obj)
-        return StreamingResponse(
-            io.BytesIO(pdf_bytes),
+        from .roadmap_pdf import generate_roadmap_pdf
+        with stage("render"):
+            pdf_bytes = generate_roadmap_pdf(roadmap_obj)
+        return BufferResponse(
+            pdf_bytes,
             media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=roadmap_{topic.replace(' ', '_')}.pdf"
-            }
+            filename=f"roadmap_{topic.replace(' ', '_')}.pdf",
         )
+    except SchedulerBusy:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Roadmap PDF generation failed: {str(e)}")
 
-# Enable CORS for Next.js frontend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://localhost:3001", "http://localhost:3002", "http://localhost:3003", "http://127.0.0.1:3000", "http://127.0.0.1:3001", "http://127.0.0.1:3002", "http://127.0.0.1:3003", "http://localhost:8001", "http://localhost:8002"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Initialize Gemini API
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-
-
 # Roadmap generation endpoint
-from fastapi.responses import JSONResponse
-
 @app.post("/generate-roadmap")
 async def generate_roadmap(request: Request):
     try:
@@ -165,28 +161,14 @@ async def generate_roadmap(request: Request):
             raise HTTPException(status_code=400, detail="Missing topic")
         if not gemini_api_key:
             raise HTTPException(status_code=500, detail="Gemini API key not configured")
-        roadmap = generate_roadmap_with_gemini(topic, gemini_api_key)
+        from .roadmap_generator import generate_roadmap_with_gemini
+        with use_priority(BACKGROUND), stage("gemini_roadmap"):
+            roadmap = await run_in_threadpool(generate_roadmap_with_gemini, topic, gemini_api_key)
         return JSONResponse(content={"roadmap": roadmap})
+    except SchedulerBusy:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Roadmap generation failed: {str(e)}")
-if gemini_api_key and gemini_api_key != "your_gemini_api_key_here":
-    genai.configure(api_key=gemini_api_key)
-    print(f"✅ Gemini API configured successfully")
-else:
-    print("⚠️  Gemini API key not found or invalid")
-
-# Initialize Google Cloud Vision client
-# Set the credentials path if provided
-credentials_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-if credentials_path and os.path.exists(credentials_path):
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
-    print(f"✅ Vision API credentials found at: {credentials_path}")
-
-try:
-    vision_client = vision.ImageAnnotatorClient()
-except Exception as e:
-    print(f"Warning: Could not initialize Vision API client: {e}")
-    vision_client = None
 
 # Pydantic models for request/response
 class ChatRequest(BaseModel):
@@ -202,6 +184,8 @@ class OCRResponse(BaseModel):
     extracted_text: str
     success: bool = True
     error: str = None
+    # Pages found to have no text and not sent to OCR
+    skipped_pages: int = 0
 
 class NotebotChatRequest(BaseModel):
     question: str
@@ -209,15 +193,31 @@ class NotebotChatRequest(BaseModel):
 
 class AudioRequest(BaseModel):
     text: str
+    # "local" converts the Markdown with rules (no Gemini call), "llm" rewrites it with Gemini; default SPEECH_TEXT_MODE
+    mode: str = None
 
 class EnhanceSummaryRequest(BaseModel):
     text: str
+    # Set to summarize incrementally: unchanged parts of the same document are reused
+    document_id: str = None
+    # Stream NDJSON: an extractive preview first, then the structured summary
+    stream: bool = False
 
 # Enhanced NoteBot Functions (moved here to be available for endpoints)
-def correct_ocr_text(ocr_text):
-    """Correct OCR errors and improve text quality"""
+def correct_ocr_text(ocr_text, strict=False):
+    """
+    Correct OCR errors and improve text quality; text that scores as clean after local cleanup skips Gemini.
+    If the Gemini call fails the text is returned uncorrected, or with `strict` the error is raised,
+    for callers that keep the result (batch outputs, incremental chunks).
+    """
+    if ocr_cleanup.enabled():
+        with stage("ocr_cleanup"):
+            ocr_text, quality = ocr_cleanup.clean(ocr_text)
+        if quality["route"] == "local":
+            return ocr_text
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash-thinking-exp')
+        # Only the prompt gets the trimmed text; a failed correction returns the whole document
+        fitted_text, _ = token_budget.fit(ocr_text, "correct_ocr")
         prompt = f"""
 You are a smart AI assistant. The following text has been extracted using OCR and may contain errors such as misrecognized characters, punctuation issues, or broken words.
 
@@ -227,20 +227,28 @@ IMPORTANT: Remove any institution contact information, addresses, phone numbers,
 
 Text to correct:
 \"\"\"
-{ocr_text}
+{fitted_text}
 \"\"\"
 
 Return only the corrected version of the educational content, excluding any institutional contact details:
 """
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        with stage("gemini_correct"):
+            response_text = generate_text(prompt)
+        return response_text.strip()
+    except SchedulerBusy:
+        raise
     except Exception as e:
+        if strict:
+            raise
         return ocr_text  # Return original if correction fails
 
+# For results that are stored: a failed correction raises instead of passing the text through
+_correct_strict = functools.partial(correct_ocr_text, strict=True)
+
 def generate_structured_summary(text):
     """Generate a well-structured summary with headings and key points"""
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash-thinking-exp')
+        text, _ = token_budget.fit(text, "summary")
         prompt = f"""
 Create a comprehensive, well-structured summary of the given content.
 
@@ -281,30 +289,33 @@ CONTENT TO SUMMARIZE:
 
 Generate the Markdown-formatted educational summary following the exact format above:
 """
-        response = model.generate_content(prompt)
+        with stage("gemini_summary"):
+            response_text = generate_text(prompt)
         
         # Get the result and ensure it's proper Markdown
-        result = response.text.strip()
-        print(f"🔍 Raw AI response: {result[:300]}...")
+        result = response_text.strip()
+        log.debug("Raw summary response", preview=Preview(result, 300))
         
         # Ensure it starts with a proper heading
         if not result.startswith('#'):
-            print("⚠️  AI didn't start with proper heading, adding fallback...")
+            log.info("Summary did not start with a heading, adding fallback title")
             lines = result.split('\n')
             if lines and lines[0].strip():
                 # Make first line the main heading
                 title = lines[0].strip().rstrip(':')
                 result = f"# {title}\n\n" + '\n'.join(lines[1:])
         
-        print(f"📊 Final Markdown result preview: {result[:200]}...")
+        log.debug("Final summary markdown", length=len(result), preview=Preview(result))
         return result
+    except SchedulerBusy:
+        raise
     except Exception as e:
         return f"Error generating summary: {e}"
 
 def notebot_chat(question, notes_context):
     """NoteBot contextual chat function"""
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash-thinking-exp')
+        notes_context, _ = token_budget.fit(notes_context, "notebot")
         prompt = f"""
 You are NoteBot, an assistant who only answers questions based on the following notes.
 
@@ -321,15 +332,37 @@ Question:
 
 Answer:
 """
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        with stage("gemini_notebot"):
+            response_text = generate_text(prompt)
+        return response_text.strip()
+    except SchedulerBusy:
+        raise
     except Exception as e:
         return f"Error: {e}"
 
+def answer_notebot_question(question, notes_context):
+    """NoteBot answer, reused for near-identical questions on the same notes; returns (answer, cache info)"""
+    if not answer_cache.enabled():
+        return notebot_chat(question, notes_context), None
+    cache = answer_cache.get_cache()
+    with stage("answer_cache"):
+        hit = cache.lookup(notes_context, question)
+    if hit:
+        return hit["answer"], {
+            "hit": True,
+            "similarity": round(hit["similarity"], 3),
+            "saved_ms": round(hit["saved_seconds"] * 1000, 1),
+        }
+    started = time.perf_counter()
+    answer = notebot_chat(question, notes_context)
+    if not answer.startswith("Error:"):
+        cache.store(notes_context, question, answer, time.perf_counter() - started)
+    return answer, {"hit": False}
+
 def make_text_speech_friendly(summary_text):
     """Convert summary to speech-friendly format"""
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash-thinking-exp')
+        summary_text, _ = token_budget.fit(summary_text, "speech")
         prompt = f"""
 You are a voice assistant preparing a summary for spoken output.
 Don't speak unnecessary things like "of course, here is the summary" or something like that.
@@ -350,23 +383,260 @@ Summary:
 
 Speak-friendly version:
 """
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        with stage("gemini_speech"):
+            response_text = generate_text(prompt)
+        return response_text.strip()
+    except SchedulerBusy:
+        raise
     except Exception as e:
         return summary_text  # Return original if conversion fails
 
+# Pipelines shared by the HTTP endpoints and background jobs.
+# `report(stage, progress)` is called as each stage starts.
+def _no_progress(stage, progress):
+    pass
+
+def run_enhance_summary(text, report=_no_progress, document_id=None):
+    """Correct OCR errors, then build the structured Markdown summary"""
+    if document_id:
+        with token_budget.collect() as budget_reports:
+            result = incremental_summary.run(document_id, text, _correct_strict, generate_structured_summary, report)
+        log.info("Incremental summary generated", summary_length=len(result["structured_summary"]), **result["incremental"])
+        return {**result, "token_budget": token_budget.summarize(budget_reports), "success": True}
+
+    with token_budget.collect() as budget_reports:
+        # First correct OCR errors
+        report("correcting", 0.1)
+        corrected_text = correct_ocr_text(text)
+        log.info("OCR correction completed", corrected_length=len(corrected_text))
+
+        # Then generate structured summary
+        report("summarizing", 0.5)
+        structured_summary = generate_structured_summary(corrected_text)
+    log.info("Structured summary generated", summary_length=len(structured_summary))
+    log.debug("Structured summary preview", preview=Preview(structured_summary, 100))
+
+    return {
+        "corrected_text": corrected_text,
+        "structured_summary": structured_summary,
+        "token_budget": token_budget.summarize(budget_reports),
+        "success": True
+    }
+
+# Source lines per report paragraph: reportlab lays out one huge paragraph in superlinear time
+REPORT_PARAGRAPH_LINES = 20
+# Reports larger than this spill from memory to a temporary file
+REPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+def _report_paragraphs(page_text):
+    """Split a page into blank-line separated paragraphs of at most REPORT_PARAGRAPH_LINES lines"""
+    lines = []
+    for line in page_text.splitlines():
+        if line.strip():
+            lines.append(line)
+            if len(lines) < REPORT_PARAGRAPH_LINES:
+                continue
+        if lines:
+            yield lines
+            lines = []
+    if lines:
+        yield lines
+
+def render_ocr_pdf_report(contents, summary="", report=_no_progress):
+    """Extract the text of a PDF and render it, with an optional summary, as a new PDF report.
+
+    Returns a spooled temporary file positioned at the start; the caller closes it.
+    """
+    from xml.sax.saxutils import escape
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    report("extracting", 0.1)
+    with stage("pdf_parse"):
+        pages = extract_pdf_pages(contents)
+    if not any(page.strip() for page in pages):
+        raise Exception("Could not extract text from the PDF. Please try a clearer file.")
+
+    # Generate a new PDF report using reportlab: one flowable per source paragraph
+    report("rendering", 0.5)
+    styles = getSampleStyleSheet()
+    story = []
+    story.append(Paragraph(f"<b>PDF OCR Report</b>", styles['Title']))
+    story.append(Spacer(1, 12))
+    if summary:
+        story.append(Paragraph(f"<b>Summary:</b> {escape(summary)}", styles['Normal']))
+        story.append(Spacer(1, 12))
+    story.append(Paragraph(f"<b>Extracted Text:</b>", styles['Heading2']))
+    for page_text in pages:
+        for lines in _report_paragraphs(page_text):
+            story.append(Paragraph("<br/>".join(escape(line) for line in lines), styles['Normal']))
+            story.append(Spacer(1, 6))
+    output = tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_BYTES)
+    try:
+        with stage("render"):
+            SimpleDocTemplate(output, pagesize=letter).build(story)
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
+def build_ocr_pdf_report(contents, summary="", report=_no_progress):
+    """render_ocr_pdf_report() as bytes, for the job store"""
+    with render_ocr_pdf_report(contents, summary, report) as output:
+        return output.read()
+
+def synthesize_speech(text, report=_no_progress, mode=None):
+    """Rewrite text for listening (see speech_text.MODES) and render it to MP3 bytes with gTTS"""
+    # Make text speech-friendly
+    report("rewriting", 0.1)
+    if speech_text.resolve_mode(mode) == "local":
+        with stage("speech_text"):
+            speech_friendly_text = speech_text.markdown_to_speech(text)
+    else:
+        prefetched = prefetcher.take("speech", text) if prefetch.enabled() else None
+        speech_friendly_text = prefetched[0] if prefetched else make_text_speech_friendly(text)
+
+    # Generate speech
+    report("synthesizing", 0.5)
+    with stage("tts"):
+        return synthesize_mp3(speech_friendly_text, lang='en')
+
+# Speculative follow-ups after OCR (PREFETCH=1): summary, then the speech-friendly text of that summary
+prefetcher = Prefetcher()
+
+def _prefetch_summary(text):
+    result = run_enhance_summary(text)
+    structured_summary = result["structured_summary"]
+    if structured_summary.startswith("Error generating summary"):
+        raise RuntimeError(structured_summary)
+    if speech_text.resolve_mode() == "llm":
+        prefetcher.submit("speech", structured_summary, make_text_speech_friendly, structured_summary)
+    return result
+
+def prefetch_follow_ups(text):
+    if prefetch.enabled() and text.strip():
+        prefetcher.submit("summary", text, _prefetch_summary, text)
+
+OCR_PROMPT = """
+            Please extract ALL text from this image. Be very thorough and accurate:
+
+            1. Read every single word, number, symbol, and equation visible in the image
+            2. Preserve the original formatting and structure as much as possible
+            3. Include mathematical equations, formulas, and special symbols
+            4. Maintain line breaks and spacing where appropriate
+            5. If there are tables, preserve their structure
+            6. Include any handwritten text if present
+            7. Don't add any commentary or explanations - just extract the text
+
+            Return only the extracted text without any additional formatting or commentary.
+            """
+
+def extract_image_text(contents, filename=None):
+    """
+    Text of an image: from an earlier upload of the same (or a re-compressed)
+    image if there is one, otherwise OCR'd and remembered. Raises
+    page_analysis.BlankPage without OCR if the image has no text.
+    """
+    with stage("page_check"):
+        page_analysis.check(contents)
+    if not image_dedup.enabled():
+        return ocr_image(contents, filename)
+    index = image_dedup.get_index()
+    with stage("image_dedup"):
+        seen = index.lookup(contents)
+    if seen["text"] is not None:
+        log.info("Image text reused", filename=filename, match=seen["match"], distance=seen["distance"])
+        return seen["text"]
+    text = ocr_image(contents, filename)
+    if text:
+        index.store(contents, text, seen["phash"])
+    return text
+
+def ocr_image(contents, filename=None):
+    """OCR an image with Google Cloud Vision, falling back to Gemini"""
+    # Try Google Cloud Vision API first if available
+    try:
+        with stage("vision"):
+            detection = detect_text(contents)
+        if detection and detection["text"]:
+            if detection["error"]:
+                raise Exception(detection["error"])
+            return detection["text"]
+    except Exception as vision_error:
+        log.warning("Vision API failed, falling back to Gemini", error=str(vision_error))
+
+    # Fallback to Gemini Vision API
+    log.info("Using Gemini Vision API for OCR", filename=filename)
+    try:
+        from PIL import Image
+        image_pil = Image.open(io.BytesIO(contents))
+    except Exception as pil_error:
+        raise ValueError(f"Image extraction error: {pil_error}")
+    with stage("gemini_ocr"):
+        response_text = generate_text([OCR_PROMPT, image_pil])
+    return response_text.strip()
+
+def extract_upload_text(contents, filename=None):
+    """Text of an uploaded PDF or image; raises ValueError for unsupported or unreadable files"""
+    name = filename.lower() if filename else ""
+    # Check for PDF by extension or magic bytes
+    if name.endswith(".pdf") or contents[:5] == b'%PDF-':
+        # PDF text layer extraction (backend chosen by PDF_TEXT_BACKEND)
+        try:
+            with stage("pdf_parse"):
+                extracted_text = extract_pdf_text(contents)
+        except Exception as pdf_error:
+            raise ValueError(f"PDF extraction error: {pdf_error}")
+        if not extracted_text.strip():
+            raise ValueError("PDF extraction error: Could not extract text from the PDF. Please try a clearer file.")
+        return extracted_text.strip()
+    # Check for common image signatures (PNG, JPEG, etc.)
+    if contents[:4] == b'\x89PNG' or contents[:2] == b'\xff\xd8':
+        return extract_image_text(contents, filename)
+    raise ValueError("Unsupported file type. Please upload a PDF or image file.")
+
+upload_sessions = UploadSessionManager(extract_upload_text)
+# Long-polling limits for GET /ocr/sessions/{id}?wait=
+UPLOAD_SESSION_MAX_WAIT = 60
+UPLOAD_SESSION_POLL_INTERVAL = 0.1
+
 @app.get("/")
 async def root():
     return {"message": "AI Backend API is running"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus text exposition of this worker's metrics"""
+    return metrics.render_prometheus()
+
+def _require_profile_access(request: Request):
+    client_host = request.client.host if request.client else None
+    if not profiling.can_read_profiles(request.headers.get("x-profile"), client_host):
+        raise HTTPException(status_code=403, detail="Profiles require the X-Profile admin token")
+
+@app.get("/debug/profiles")
+async def list_profiles(request: Request):
+    """Saved request profiles, newest first"""
+    _require_profile_access(request)
+    return {"profiles": profiling.list_profiles()}
+
+@app.get("/debug/profiles/{profile_id}")
+async def download_profile(profile_id: str, request: Request):
+    """Download one profile (folded stacks or cProfile stats)"""
+    _require_profile_access(request)
+    path = profiling.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=os.path.basename(path), media_type="application/octet-stream")
+
 @app.get("/health")
 async def health_check():
     gemini_key = os.getenv("GEMINI_API_KEY")
-    credentials_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
     return {
         "status": "healthy",
         "gemini_configured": bool(gemini_key and gemini_key != "your_gemini_api_key_here"),
-        "vision_available": vision_client is not None and bool(credentials_path and os.path.exists(credentials_path))
+        "vision_available": vision_available()
     }
 
 @app.post("/chat", response_model=ChatResponse)
@@ -375,22 +645,22 @@ async def chat_with_gemini(request: ChatRequest):
     Chat endpoint using Google Gemini API
     """
     try:
-        # Initialize Gemini model - Latest thinking model for enhanced reasoning
-        model = genai.GenerativeModel('gemini-2.0-flash-thinking-exp')
-        
         # Prepare the prompt with context if provided
         prompt = request.message
         if request.context:
             prompt = f"Context: {request.context}\n\nUser: {request.message}"
         
         # Generate response
-        response = model.generate_content(prompt)
+        with stage("gemini_chat"):
+            response_text = await run_in_threadpool(generate_text, prompt)
         
         return ChatResponse(
-            response=response.text,
+            response=response_text,
             success=True
         )
     
+    except SchedulerBusy:
+        raise
     except Exception as e:
         return ChatResponse(
             response="",
@@ -410,99 +680,22 @@ async def extract_text_from_image(file: UploadFile = File(...)):
 
         # Read the uploaded file
         contents = await file.read()
+        extracted_text = await run_in_threadpool(extract_upload_text, contents, file.filename)
+        prefetch_follow_ups(extracted_text)
+        return OCRResponse(
+            extracted_text=extracted_text,
+            success=True
+        )
 
-
-        # Robust file type detection
-        filename = file.filename.lower() if file.filename else ""
-        is_pdf = False
-        is_image = False
-        # Check for PDF by extension or magic bytes
-        if filename.endswith(".pdf") or contents[:5] == b'%PDF-':
-            is_pdf = True
-        # Check for common image signatures (PNG, JPEG, etc.)
-        elif contents[:4] == b'\x89PNG' or contents[:2] == b'\xff\xd8':
-            is_image = True
-
-        if is_pdf:
-            # PDF extraction using PyPDF2
-            try:
-                from PyPDF2 import PdfReader
-                import io
-                pdf_reader = PdfReader(io.BytesIO(contents))
-                extracted_text = ""
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        extracted_text += page_text + "\n"
-                if not extracted_text.strip():
-                    raise Exception("Could not extract text from the PDF. Please try a clearer file.")
-                return OCRResponse(
-                    extracted_text=extracted_text.strip(),
-                    success=True
-                )
-            except Exception as pdf_error:
-                return OCRResponse(
-                    extracted_text="",
-                    success=False,
-                    error=f"PDF extraction error: {pdf_error}"
-                )
-
-        elif is_image:
-            # Try Google Cloud Vision API first if available
-            if vision_client:
-                try:
-                    image = vision.Image(content=contents)
-                    response = vision_client.text_detection(image=image)
-                    texts = response.text_annotations
-                    if texts:
-                        extracted_text = texts[0].description
-                        if response.error.message:
-                            raise Exception(response.error.message)
-                        return OCRResponse(
-                            extracted_text=extracted_text,
-                            success=True
-                        )
-                except Exception as vision_error:
-                    print(f"Vision API failed, falling back to Gemini: {vision_error}")
-
-            # Fallback to Gemini Vision API
-            print("Using Gemini Vision API for OCR...")
-            try:
-                image_pil = Image.open(io.BytesIO(contents))
-            except Exception as pil_error:
-                return OCRResponse(
-                    extracted_text="",
-                    success=False,
-                    error=f"Image extraction error: {pil_error}"
-                )
-            model = genai.GenerativeModel('gemini-2.0-flash-thinking-exp')
-            prompt = """
-            Please extract ALL text from this image. Be very thorough and accurate:
-
-            1. Read every single word, number, symbol, and equation visible in the image
-            2. Preserve the original formatting and structure as much as possible
-            3. Include mathematical equations, formulas, and special symbols
-            4. Maintain line breaks and spacing where appropriate
-            5. If there are tables, preserve their structure
-            6. Include any handwritten text if present
-            7. Don't add any commentary or explanations - just extract the text
-
-            Return only the extracted text without any additional formatting or commentary.
-            """
-            response = model.generate_content([prompt, image_pil])
-            extracted_text = response.text.strip()
-            return OCRResponse(
-                extracted_text=extracted_text,
-                success=True
-            )
-        else:
-            # Not a supported file type
-            return OCRResponse(
-                extracted_text="",
-                success=False,
-                error="Unsupported file type. Please upload a PDF or image file."
-            )
-
+    except SchedulerBusy:
+        raise
+    except page_analysis.BlankPage as e:
+        return OCRResponse(
+            extracted_text="",
+            success=False,
+            error=str(e),
+            skipped_pages=1
+        )
     except Exception as e:
         return OCRResponse(
             extracted_text="",
@@ -510,6 +703,55 @@ async def extract_text_from_image(file: UploadFile = File(...)):
             error=str(e)
         )
 
+# Multi-page upload sessions: pages are OCR'd concurrently as they arrive
+class UploadSessionRequest(BaseModel):
+    expected_pages: int = None
+
+@app.post("/ocr/sessions", status_code=201)
+async def create_upload_session(request: UploadSessionRequest = None):
+    expected_pages = request.expected_pages if request else None
+    return await run_in_threadpool(upload_sessions.create, expected_pages)
+
+@app.post("/ocr/sessions/{session_id}/pages", status_code=202)
+async def add_upload_session_page(session_id: str, file: UploadFile = File(...), page_index: int = Form(None)):
+    if not gemini_api_key or gemini_api_key == "your_gemini_api_key_here":
+        raise HTTPException(status_code=500, detail="Gemini API not configured")
+    if page_index is not None and page_index < 0:
+        raise HTTPException(status_code=400, detail="page_index must not be negative")
+    contents = await file.read()
+    try:
+        return await run_in_threadpool(upload_sessions.add_page, session_id, contents, file.filename, page_index)
+    except SessionNotFound:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    except SessionClosed:
+        raise HTTPException(status_code=409, detail="Session is already complete")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/ocr/sessions/{session_id}/complete")
+async def complete_upload_session(session_id: str, request: UploadSessionRequest = None):
+    expected_pages = request.expected_pages if request else None
+    try:
+        return await run_in_threadpool(upload_sessions.complete, session_id, expected_pages)
+    except SessionNotFound:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+
+@app.get("/ocr/sessions/{session_id}")
+async def get_upload_session(session_id: str, wait: float = 0):
+    """Session status; with `wait`, holds the request up to that many seconds until the text is assembled"""
+    deadline = time.monotonic() + min(max(wait, 0), UPLOAD_SESSION_MAX_WAIT)
+    try:
+        while True:
+            status = await run_in_threadpool(upload_sessions.status, session_id)
+            if "text" in status:
+                prefetch_follow_ups(status["text"])
+                return status
+            if time.monotonic() >= deadline:
+                return status
+            await asyncio.sleep(UPLOAD_SESSION_POLL_INTERVAL)
+    except SessionNotFound:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+
 @app.post("/chat/with-image")
 async def chat_with_image(
     message: str,
@@ -523,19 +765,20 @@ async def chat_with_image(
         contents = await file.read()
         
         # Convert to PIL Image
+        from PIL import Image
         image = Image.open(io.BytesIO(contents))
         
-        # Initialize Gemini Vision model - Latest thinking model for enhanced reasoning
-        model = genai.GenerativeModel('gemini-2.0-flash-thinking-exp')
-        
         # Generate response with image and text
-        response = model.generate_content([message, image])
+        with stage("gemini_chat"):
+            response_text = await run_in_threadpool(generate_text, [message, image])
         
         return {
-            "response": response.text,
+            "response": response_text,
             "success": True
         }
     
+    except SchedulerBusy:
+        raise
     except Exception as e:
         return {
             "response": "",
@@ -554,42 +797,43 @@ async def generate_summary_pdf(
     Generate a well-structured PDF report using weasyprint for better HTML to PDF conversion
     """
     try:
-        # Debug logging
-        print(f"📋 PDF Generation Request:")
-        print(f"   Title: {title}")
-        print(f"   Extracted Text Length: {len(extracted_text)}")
-        print(f"   Summary Length: {len(summary)}")
-        print(f"   Questions Length: {len(questions)}")
-        print(f"   Extracted Text Preview: {extracted_text[:200] if extracted_text else 'None'}...")
-        print(f"   Summary Preview: {summary[:200] if summary else 'None'}...")
+        log.info(
+            "PDF generation request",
+            title=title,
+            extracted_text_length=len(extracted_text),
+            summary_length=len(summary),
+            questions_length=len(questions),
+        )
+        log.debug(
+            "PDF generation request previews",
+            extracted_text_preview=Preview(extracted_text),
+            summary_preview=Preview(summary),
+        )
         # Ensure all fields are strings (never files or images)
         for field_name, value in [("title", title), ("extracted_text", extracted_text), ("summary", summary), ("questions", questions)]:
             if not isinstance(value, str):
-                print(f"[WARN] Field {field_name} is not a string. Forcing to string.")
+                log.warning("PDF field is not a string, forcing to string", field=field_name)
                 locals()[field_name] = str(value)
 
-        print("🔄 Generating PDF with fpdf2...")
-
         # Defensive: never try to open images, only process as text
         try:
-            pdf_bytes = generate_pdf_with_fpdf(title, extracted_text, summary, questions)
+            from .pdf_generator_fpdf import generate_pdf_with_fpdf
+            with stage("render"):
+                pdf_bytes = generate_pdf_with_fpdf(title, extracted_text, summary, questions)
         except Exception as pdf_error:
-            print(f"❌ PDF generation failed in fpdf2: {pdf_error}")
+            log.error("PDF generation failed in fpdf2", error=str(pdf_error))
             raise HTTPException(status_code=500, detail=f"PDF generation failed: {pdf_error}")
 
-        print(f"✅ PDF generated successfully - Size: {len(pdf_bytes)} bytes")
+        log.info("PDF generated successfully", size_bytes=len(pdf_bytes))
 
-        # Return the PDF as a streaming response
-        return StreamingResponse(
-            io.BytesIO(pdf_bytes),
+        return BufferResponse(
+            pdf_bytes,
             media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=summary_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            }
+            filename=f"summary_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
         )
 
     except Exception as e:
-        print(f"❌ PDF generation failed: {str(e)}")
+        log.error("PDF generation failed", error=str(e))
         raise HTTPException(status_code=500, detail=f"PDF generation failed: {str(e)}")
 
 @app.post("/notebot/chat")
@@ -598,11 +842,18 @@ async def notebot_chat_endpoint(request: NotebotChatRequest):
     Chat with NoteBot using context from uploaded notes
     """
     try:
-        response = notebot_chat(request.question, request.notes_context)
-        return {
+        with token_budget.collect() as budget_reports:
+            response, cache = await run_in_threadpool(answer_notebot_question, request.question, request.notes_context)
+        result = {
             "response": response,
+            "token_budget": token_budget.summarize(budget_reports),
             "success": True
         }
+        if cache is not None:
+            result["cache"] = cache
+        return result
+    except SchedulerBusy:
+        raise
     except Exception as e:
         return {
             "response": "I'm sorry, I encountered an error. Please try again.",
@@ -616,54 +867,46 @@ async def text_to_speech(request: AudioRequest):
     Convert summary text to speech audio
     """
     try:
-        # Make text speech-friendly
-        speech_friendly_text = make_text_speech_friendly(request.text)
-        
-        # Generate speech
-        tts = gTTS(speech_friendly_text, lang='en')
-        mp3_buffer = io.BytesIO()
-        tts.write_to_fp(mp3_buffer)
-        mp3_buffer.seek(0)
-        
-        return StreamingResponse(
-            mp3_buffer,
-            media_type="audio/mpeg",
-            headers={
-                "Content-Disposition": "attachment; filename=summary_audio.mp3"
-            }
-        )
+        mode = speech_text.resolve_mode(request.mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        with use_priority(HEAVY):
+            mp3_bytes = await run_in_threadpool(synthesize_speech, request.text, _no_progress, mode)
+        return BufferResponse(mp3_bytes, media_type="audio/mpeg", filename="summary_audio.mp3")
+    except SchedulerBusy:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Audio generation failed: {str(e)}")
 
-class EnhanceSummaryRequest(BaseModel):
-    text: str
+async def _enhance(request):
+    with use_priority(HEAVY):
+        if prefetch.enabled() and not request.document_id:
+            prefetched = await run_in_threadpool(prefetcher.take, "summary", request.text)
+            if prefetched:
+                result, state = prefetched
+                return {**result, "prefetch": state}
+        return await run_in_threadpool(run_enhance_summary, request.text, document_id=request.document_id)
+
+def _preview_event(text):
+    with stage("summary_preview"):
+        return {"stage": "preview", **extractive_summary.preview(text)}
 
 @app.post("/enhance-summary")
 async def enhance_summary(request: EnhanceSummaryRequest):
     """
-    Enhance extracted text with proper structure and formatting
+    Enhance extracted text with proper structure and formatting.
+    With `stream`, an extractive preview is sent first and the structured summary replaces it.
     """
+    log.info("Received enhance-summary request", text_length=len(request.text), stream=request.stream)
+    if request.stream:
+        return StreamingResponse(_enhance_events(request), media_type="application/x-ndjson")
     try:
-        print(f"📝 Received enhance-summary request with text length: {len(request.text)}")
-        
-        # First correct OCR errors
-        corrected_text = correct_ocr_text(request.text)
-        print(f"✅ OCR correction completed, length: {len(corrected_text)}")
-        
-        # Then generate structured summary
-        structured_summary = generate_structured_summary(corrected_text)
-        print(f"📊 Structured summary generated, length: {len(structured_summary)}")
-        print(f"📊 Summary preview: {structured_summary[:100]}...")
-        
-        result = {
-            "corrected_text": corrected_text,
-            "structured_summary": structured_summary,
-            "success": True
-        }
-        print(f"🚀 Returning result with success: {result['success']}")
-        return result
+        return await _enhance(request)
+    except SchedulerBusy:
+        raise
     except Exception as e:
-        print(f"❌ Error in enhance-summary: {str(e)}")
+        log.error("Error in enhance-summary", error=str(e))
         return {
             "corrected_text": request.text,
             "structured_summary": request.text,
@@ -671,6 +914,225 @@ async def enhance_summary(request: EnhanceSummaryRequest):
             "error": str(e)
         }
 
+async def _enhance_events(request):
+    started = time.perf_counter()
+    if extractive_summary.enabled():
+        yield _ndjson(await run_in_threadpool(_preview_event, request.text))
+    try:
+        yield _ndjson({"stage": "summary", **(await _enhance(request))})
+    except SchedulerBusy as e:
+        yield _ndjson({"stage": "error", "error": str(e), "retry_after": e.retry_after})
+        return
+    except Exception as e:
+        log.error("Error in enhance-summary", error=str(e))
+        yield _ndjson({"stage": "error", "error": str(e)})
+        return
+    yield _ndjson({"stage": "done", "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)})
+
+# One round trip for the whole NoteBot flow: upload once, stream each stage's result
+def _ndjson(event):
+    return (json.dumps(event) + "\n").encode("utf-8")
+
+def _run_heavy(budget_reports, func, *args):
+    # Stream events are yielded between steps, so each step sets its own priority and budget collection
+    with use_priority(HEAVY), token_budget.collect() as reports:
+        result = func(*args)
+    budget_reports.extend(reports)
+    return result
+
+def _pdf_artifact(title, corrected_text, summary):
+    from .pdf_generator_fpdf import generate_pdf_with_fpdf
+    with stage("render"):
+        pdf_bytes = generate_pdf_with_fpdf(title, corrected_text, summary, "")
+    filename = f"summary_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    return artifact_store.put(pdf_bytes, "application/pdf", filename)
+
+def _audio_artifact(summary, speech_mode=None):
+    return artifact_store.put(synthesize_speech(summary, mode=speech_mode), "audio/mpeg", "summary_audio.mp3")
+
+@app.post("/notebot/process")
+async def notebot_process(
+    file: UploadFile = File(...),
+    pdf: bool = Form(False),
+    audio: bool = Form(False),
+    title: str = Form(None),
+    document_id: str = Form(None),
+    speech_mode: str = Form(None),
+):
+    """
+    OCR -> correction -> summary (+ optional PDF report and MP3) from one upload.
+    Streams newline-delimited JSON, one event per finished stage, plus an extractive
+    preview of the summary right after OCR; the PDF and MP3 are returned as artifact
+    ids, downloaded from /artifacts/{id}.
+    """
+    if not gemini_api_key or gemini_api_key == "your_gemini_api_key_here":
+        raise HTTPException(status_code=500, detail="Gemini API not configured")
+    try:
+        speech_mode = speech_text.resolve_mode(speech_mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    started = time.perf_counter()
+    contents = await file.read()
+    filename = file.filename
+    title = title or (os.path.splitext(filename)[0] if filename else "Document Summary")
+    # OCR runs before the stream starts so unreadable files get a plain 400
+    try:
+        with use_priority(HEAVY):
+            extracted_text = await run_in_threadpool(extract_upload_text, contents, filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def events():
+        yield _ndjson({"stage": "ocr", "extracted_text": extracted_text})
+        if extractive_summary.enabled():
+            yield _ndjson(await run_in_threadpool(_preview_event, extracted_text))
+        budget_reports = []
+        try:
+            if document_id:
+                result = await run_in_threadpool(
+                    _run_heavy, budget_reports, incremental_summary.run, document_id, extracted_text,
+                    _correct_strict, generate_structured_summary, _no_progress,
+                )
+                corrected_text, structured_summary = result["corrected_text"], result["structured_summary"]
+                yield _ndjson({"stage": "correct", "corrected_text": corrected_text})
+            else:
+                corrected_text = await run_in_threadpool(_run_heavy, budget_reports, correct_ocr_text, extracted_text)
+                yield _ndjson({"stage": "correct", "corrected_text": corrected_text})
+                structured_summary = await run_in_threadpool(
+                    _run_heavy, budget_reports, generate_structured_summary, corrected_text
+                )
+            if structured_summary.startswith("Error generating summary"):
+                raise RuntimeError(structured_summary)
+            yield _ndjson({
+                "stage": "summary",
+                "structured_summary": structured_summary,
+                "token_budget": token_budget.summarize(budget_reports),
+            })
+
+            # PDF and audio only need the summary, so they run side by side
+            async def artifact(name, func, *args):
+                try:
+                    return {"stage": name, **(await run_in_threadpool(_run_heavy, [], func, *args))}
+                except Exception as e:
+                    log.error("Pipeline artifact failed", artifact=name, error=str(e))
+                    return {"stage": name, "error": str(e)}
+
+            pending = []
+            if pdf:
+                pending.append(artifact("pdf", _pdf_artifact, title, corrected_text, structured_summary))
+            if audio:
+                pending.append(artifact("audio", _audio_artifact, structured_summary, speech_mode))
+            for finished in asyncio.as_completed(pending):
+                yield _ndjson(await finished)
+        except SchedulerBusy as e:
+            yield _ndjson({"stage": "error", "error": str(e), "retry_after": e.retry_after})
+            return
+        except Exception as e:
+            log.error("Error in notebot process", error=str(e))
+            yield _ndjson({"stage": "error", "error": str(e)})
+            return
+        yield _ndjson({"stage": "done", "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)})
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.get("/artifacts/{artifact_id}")
+async def get_artifact(artifact_id: str):
+    try:
+        artifact = await run_in_threadpool(artifact_store.get, artifact_id)
+    except ArtifactNotFound:
+        raise HTTPException(status_code=404, detail="Artifact not found or expired")
+    return BufferResponse(artifact["data"], media_type=artifact["media_type"], filename=artifact["filename"])
+
+# Asynchronous job API: submit returns a job id, then poll the status and fetch the result
+JOB_FILENAMES = {
+    "ocr-pdf-report": "ocr_report.pdf",
+    "text-to-speech": "summary_audio.mp3",
+}
+
+def _background_job(handler):
+    # Jobs are polled for, so their Gemini calls queue behind interactive traffic
+    def run(payload, attachment, report):
+        with use_priority(BACKGROUND):
+            return handler(payload, attachment, report)
+    return run
+
+job_manager.register(
+    "enhance-summary",
+    _background_job(lambda payload, attachment, report: run_enhance_summary(payload["text"], report, payload.get("document_id"))),
+)
+job_manager.register(
+    "ocr-pdf-report",
+    lambda payload, attachment, report: (build_ocr_pdf_report(attachment, payload["summary"], report), "application/pdf"),
+)
+job_manager.register(
+    "text-to-speech",
+    _background_job(
+        lambda payload, attachment, report: (synthesize_speech(payload["text"], report, payload.get("mode")), "audio/mpeg")
+    ),
+)
+
+def _job_status(job, deduplicated=None):
+    status = {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": job["progress"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "expires_at": job["expires_at"],
+    }
+    if deduplicated is not None:
+        status["deduplicated"] = deduplicated
+    return status
+
+async def _submit_job(kind, payload, attachment=None):
+    # SQLite may wait up to 30 s for the write lock; keep that off the event loop
+    job, deduplicated = await run_in_threadpool(job_manager.submit, kind, payload, attachment)
+    return JSONResponse(status_code=202, content=_job_status(job, deduplicated))
+
+@app.post("/jobs/enhance-summary", status_code=202)
+async def submit_enhance_summary_job(request: EnhanceSummaryRequest):
+    payload = {"text": request.text}
+    if request.document_id:
+        payload["document_id"] = request.document_id
+    return await _submit_job("enhance-summary", payload)
+
+@app.post("/jobs/ocr/pdf-report", status_code=202)
+async def submit_ocr_pdf_report_job(file: UploadFile = File(...), summary: str = Form("")):
+    contents = await file.read()
+    return await _submit_job("ocr-pdf-report", {"summary": summary}, contents)
+
+@app.post("/jobs/text-to-speech", status_code=202)
+async def submit_text_to_speech_job(request: AudioRequest):
+    try:
+        mode = speech_text.resolve_mode(request.mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await _submit_job("text-to-speech", {"text": request.text, "mode": mode})
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    try:
+        return _job_status(await run_in_threadpool(job_manager.status, job_id))
+    except JobNotFound:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    try:
+        job = await run_in_threadpool(job_manager.result, job_id)
+    except JobNotFound:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    if job["status"] == FAILED:
+        raise HTTPException(status_code=500, detail=f"Job failed: {job['error']}")
+    if job["status"] != SUCCEEDED:
+        return JSONResponse(status_code=202, content=_job_status(job))
+    if job["media_type"] == "application/json":
+        return Response(content=job["result"], media_type="application/json")
+    return BufferResponse(job["result"], media_type=job["media_type"], filename=JOB_FILENAMES.get(job["kind"], "result"))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
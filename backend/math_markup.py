@@ -0,0 +1,234 @@
+"""
+Maths highlighting for the HTML report (pdf_generator_weasy.py).
+
+`to_html(text)` escapes text for HTML, turns newlines into <br> and marks up
+maths with <strong> (and <sup> for exponents). It replaces six regular
+expressions applied one after another with re.sub: the first of them allowed
+whitespace both inside its repeated character class and around the operator,
+so long OCR lines of words without an operator backtracked quadratically or
+worse. Here each line is scanned a fixed number of times; the only regular
+expressions used find maximal runs of a single character class, which can't
+backtrack, so the time is linear in the length of the text.
+
+Recognized, in order of precedence:
+    relations   letters, digits, spaces and + - * / ^ ( ) . around one of
+                = ≤ ≥ < > ≠ ≈ ≅ ∝ ≡, e.g. "F = m a"       -> bold
+    arithmetic  numbers joined by + - × ÷ * /, e.g. "3.5 × 2" -> bold
+    functions   sin(x), log (n), sqrt(2) ...                   -> bold
+    fractions   a/b, (x+1)/2                                   -> bold
+    powers      x^2, e^(i*pi)                                  -> bold, exponent in <sup>
+    symbols     π, √, ∑, α, °, % ...                           -> bold
+Adjacent relations ("a = b = c") form one bold span.
+"""
+import re
+
+LETTERS_DIGITS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789")
+DIGITS = frozenset("0123456789")
+RELATIONS = "=≤≥<>≠≈≅∝≡"
+ARITHMETIC = "+-×÷*/"
+SYMBOLS = frozenset(
+    "π∞αβγδεζηθικλμνξοπρστυφχψωΑΒΓΔΕΖΗΘΙΚΛΜΝΞΟΠΡΣΤΥΦΧΨΩ√∛∜∑∏∫∬∭∮∯∰∇∂∆∴∵∀∃∈∉⊂⊃⊆⊇∩∪∅"
+    "ℝℂℕℤℚ℘ℵ≈≅≡≠≤≥⊥∥⟂∠∡∢°′″‰‱%"
+)
+FUNCTIONS = frozenset((
+    "sin", "cos", "tan", "cot", "sec", "csc", "sinh", "cosh", "tanh", "asin", "acos", "atan",
+    "log", "ln", "lg", "exp", "sqrt", "cbrt", "abs", "floor", "ceil", "round", "min", "max",
+    "det", "trace", "rank", "dim", "lim", "sup", "inf",
+))
+
+# Maximal runs of one character class: matched greedily with nothing after, so never backtracked
+_RELATION_RUN = re.compile(r"[A-Za-z0-9 \t+\-*/^().=≤≥<>≠≈≅∝≡]+")
+_ARITHMETIC_RUN = re.compile(r"[0-9. \t+\-×÷*/]+")
+_TOKEN_RUN = re.compile(r"[A-Za-z0-9()\[\]_{}^+\-*/.]+")
+_FRACTION_OPERAND = LETTERS_DIGITS | frozenset("()[]_{}^+-*")
+
+
+def escape(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _trim(line, start, end, keep):
+    """Shrink [start, end) to its first and last characters in `keep`; None if there are none"""
+    while start < end and line[start] not in keep:
+        start += 1
+    while end > start and line[end - 1] not in keep:
+        end -= 1
+    return (start, end) if start < end else None
+
+
+def _balance(line, start, end, limit_start, limit_end):
+    """Widen [start, end) over adjacent parentheses it leaves unbalanced, within the run limits"""
+    depth = 0
+    for index in range(start, end):
+        if line[index] == "(":
+            depth += 1
+        elif line[index] == ")":
+            depth -= 1
+    while depth > 0 and end < limit_end and line[end] == ")":
+        end += 1
+        depth -= 1
+    while depth < 0 and start > limit_start and line[start - 1] == "(":
+        start -= 1
+        depth += 1
+    return start, end
+
+
+def _operator_between(line, start, end, operators, operand):
+    """True if an operator in [start, end) has an operand character somewhere before and after it"""
+    seen_operand = False
+    pending = False
+    for index in range(start, end):
+        char = line[index]
+        if char in operand:
+            if pending:
+                return True
+            seen_operand = True
+        elif seen_operand and char in operators:
+            pending = True
+    return False
+
+
+def _relation_spans(line, start, end):
+    spans = []
+    for match in _RELATION_RUN.finditer(line, start, end):
+        run_start, run_end = match.span()
+        if not _operator_between(line, run_start, run_end, RELATIONS, LETTERS_DIGITS):
+            continue
+        span_start, span_end = _trim(line, run_start, run_end, LETTERS_DIGITS)
+        spans.append(_balance(line, span_start, span_end, run_start, run_end))
+    return spans
+
+
+def _arithmetic_spans(line, start, end):
+    spans = []
+    for match in _ARITHMETIC_RUN.finditer(line, start, end):
+        run_start, run_end = match.span()
+        if _operator_between(line, run_start, run_end, ARITHMETIC, DIGITS):
+            spans.append(_trim(line, run_start, run_end, DIGITS))
+    return spans
+
+
+def _token_spans(line, start, end):
+    """Function calls, fractions and powers"""
+    spans = []
+    close_at = -1    # position of the next ")" at or after the last lookup, or `end` if there is none
+    position = start
+    for match in _TOKEN_RUN.finditer(line, start, end):
+        run_start, run_end = match.span()
+        if run_start < position:
+            continue    # inside a function call already marked
+        name_end = run_start
+        while name_end < run_end and line[name_end].isalpha():
+            name_end += 1
+        if line[run_start:name_end] in FUNCTIONS:
+            paren = name_end
+            while paren < end and line[paren] in " \t":
+                paren += 1
+            if paren < end and line[paren] == "(":
+                if close_at < paren + 1:
+                    close_at = line.find(")", paren + 1, end)
+                    close_at = end if close_at < 0 else close_at
+                if close_at < end and close_at > paren + 1:
+                    spans.append((run_start, close_at + 1))
+                    position = close_at + 1
+                    continue
+        slash = line.find("/", run_start, run_end)
+        is_fraction = slash > run_start and slash + 1 < run_end and (
+            line[slash - 1] in _FRACTION_OPERAND and line[slash + 1] in _FRACTION_OPERAND
+        )
+        caret = line.find("^", run_start, run_end)
+        is_power = caret > run_start and caret + 1 < run_end
+        if is_fraction or is_power:
+            trimmed = _trim(line, run_start, run_end, LETTERS_DIGITS | frozenset("()[]{}"))
+            if trimmed:
+                spans.append(_balance(line, *trimmed, run_start, run_end))
+    return spans
+
+
+def _gaps(spans, start, end):
+    """Parts of [start, end) not covered by the sorted, non-overlapping spans"""
+    position = start
+    for span_start, span_end in spans:
+        if span_start > position:
+            yield position, span_start
+        position = max(position, span_end)
+    if position < end:
+        yield position, end
+
+
+def _find_spans(line):
+    spans = _relation_spans(line, 0, len(line))
+    for finder in (_arithmetic_spans, _token_spans):
+        found = []
+        for gap_start, gap_end in _gaps(spans, 0, len(line)):
+            found.extend(finder(line, gap_start, gap_end))
+        spans = sorted(spans + found)
+    return spans
+
+
+def _render_maths(text):
+    """Escaped maths span with exponents as <sup>"""
+    parts = []
+    index = 0
+    length = len(text)
+    while index < length:
+        char = text[index]
+        if char == "^" and index > 0 and index + 1 < length:
+            exponent_start = index + 1
+            exponent_end = exponent_start
+            if text[exponent_end] == "(":
+                depth = 0
+                while exponent_end < length:
+                    depth += {"(": 1, ")": -1}.get(text[exponent_end], 0)
+                    exponent_end += 1
+                    if depth == 0:
+                        break
+            else:
+                if text[exponent_end] in "+-":
+                    exponent_end += 1
+                while exponent_end < length and text[exponent_end] in LETTERS_DIGITS:
+                    exponent_end += 1
+            if exponent_end > exponent_start:
+                parts.append(f"<sup>{escape(text[exponent_start:exponent_end])}</sup>")
+                index = exponent_end
+                continue
+        parts.append(escape(char))
+        index += 1
+    return "".join(parts)
+
+
+def _render_text(text):
+    """Escaped plain text with maths symbols in bold"""
+    parts = []
+    index = 0
+    length = len(text)
+    while index < length:
+        if text[index] in SYMBOLS:
+            symbols_end = index
+            while symbols_end < length and text[symbols_end] in SYMBOLS:
+                symbols_end += 1
+            parts.append(f"<strong>{escape(text[index:symbols_end])}</strong>")
+            index = symbols_end
+        else:
+            plain_end = index
+            while plain_end < length and text[plain_end] not in SYMBOLS:
+                plain_end += 1
+            parts.append(escape(text[index:plain_end]))
+            index = plain_end
+    return "".join(parts)
+
+
+def format_line(line):
+    parts = []
+    position = 0
+    for start, end in _find_spans(line):
+        parts.append(_render_text(line[position:start]))
+        parts.append(f"<strong>{_render_maths(line[start:end])}</strong>")
+        position = end
+    parts.append(_render_text(line[position:]))
+    return "".join(parts)
+
+
+def to_html(text):
+    """HTML for `text` with maths marked up; newlines become <br>"""
+    return "<br>".join(format_line(line) for line in text.split("\n"))
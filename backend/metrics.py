@@ -0,0 +1,123 @@
+"""
+In-process metrics with Prometheus text exposition (served at /metrics).
+
+Deliberately tiny: counters, gauges and fixed-bucket histograms keyed by a
+sorted tuple of label pairs. Each worker process keeps its own values.
+"""
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_lock = threading.Lock()
+_registry = {}
+
+
+def _key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self.values.get(_key(labels), 0)
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield self.name, key, (), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with _lock:
+            self.values[_key(labels)] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.values = {}    # key -> [bucket counts..., count, sum]
+
+    def observe(self, value, **labels):
+        key = _key(labels)
+        with _lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += 1
+            state[-1] += value
+
+    def count(self, **labels):
+        state = self.values.get(_key(labels))
+        return state[-2] if state else 0
+
+    def total(self, **labels):
+        state = self.values.get(_key(labels))
+        return state[-1] if state else 0.0
+
+    def samples(self):
+        for key, state in self.values.items():
+            for bound, cumulative in zip(self.buckets, state):
+                yield self.name + "_bucket", key, (("le", bound),), cumulative
+            yield self.name + "_bucket", key, (("le", "+Inf"),), state[-2]
+            yield self.name + "_count", key, (), state[-2]
+            yield self.name + "_sum", key, (), state[-1]
+
+
+def _register(metric):
+    with _lock:
+        existing = _registry.get(metric.name)
+        if existing is not None:
+            return existing
+        _registry[metric.name] = metric
+        return metric
+
+
+def counter(name, help_text):
+    return _register(Counter(name, help_text))
+
+
+def gauge(name, help_text):
+    return _register(Gauge(name, help_text))
+
+
+def histogram(name, help_text, buckets=DEFAULT_BUCKETS):
+    return _register(Histogram(name, help_text, buckets))
+
+
+def render_prometheus():
+    lines = []
+    with _lock:
+        metrics = list(_registry.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, extra, value in list(metric.samples()):
+                lines.append(f"{name}{_format_labels(key, extra)} {value}")
+    return "\n".join(lines) + "\n"
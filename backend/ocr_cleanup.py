@@ -0,0 +1,282 @@
+"""
+Local OCR text cleanup, and a quality score that decides whether Gemini still has to correct it.
+
+correct_ocr_text used to send every extracted text through a Gemini call, even
+the text layer of born-digital PDFs, which has nothing to correct.
+`normalize(text)` now does the mechanical part locally and deterministically:
+
+    - joins words hyphenated across line breaks ("equi-" + "librium" ->
+      "equilibrium"); compounds of two known words ("well-known") keep the hyphen
+    - removes soft hyphens and zero-width characters, expands ligatures
+      ("ﬁ" -> "fi"), collapses runs of spaces and of blank lines, and drops
+      the space OCR puts before punctuation
+    - fixes common OCR confusions where the result is a known word: digits
+      inside words (0/o, 1/l, 5/s), "rn"/"m" and "vv"/"w", and O/o/l/I
+      between digits ("1O5" -> "105")
+    - drops lines that are only contact information ("Tel: ...", "Address:
+      12 ...", an e-mail address or phone number with at most a name or a
+      label next to it) or a copyright notice ("© 2023 ...", "Copyright 2023
+      ...", "... All rights reserved."), as the correction prompt asks Gemini
+      to; sentences that merely mention an address or copyright are kept
+
+`score(text)` then rates the result:
+
+    dictionary   share of its words that are common English words
+                 (backend/english_words.py, after stripping suffixes and
+                 prefixes), acronyms, or recur in the text, as subject terms do
+                 and OCR garbage rarely does
+    noise        share of characters that are neither letters, digits,
+                 punctuation nor maths symbols, plus the share of words with a
+                 digit between letters ("c0mputer")
+    score        dictionary * (1 - NOISE_WEIGHT * noise), 0 to 1
+
+Text scoring at least OCR_CLEAN_MIN_SCORE is used as normalized; only text
+below it, or with fewer than MIN_WORDS words to judge, is sent to Gemini
+(normalized, so the prompt is shorter too). `/metrics` counts both routes in
+ocr_corrections_total{route="local|llm"}, and ocr_correction_llm_avoided_ratio
+is the share of texts that didn't need Gemini. backend/benchmarks/ocr_cleanup.py
+shows scores and routes for clean and increasingly corrupted texts:
+    python -m backend.benchmarks.ocr_cleanup
+
+Environment:
+    OCR_LOCAL_CLEANUP     set to 0 to send every text to Gemini as before (default on)
+    OCR_CLEAN_MIN_SCORE   lowest score used without Gemini, 0-1 (default 0.85)
+"""
+import os
+import re
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+
+from . import metrics
+from .english_words import WORDS
+from .structured_log import get_logger
+from .token_budget import _EMAIL, _PHONE, _PHONE_CUE
+
+log = get_logger(__name__)
+
+DEFAULT_MIN_SCORE = 0.85
+# Texts with fewer words than this can't be judged and go to Gemini
+MIN_WORDS = 8
+# Words this long that occur this often in a text count as known (subject terms, names)
+REPEATED_WORD_CHARS = 4
+REPEATED_WORD_COUNT = 2
+NOISE_WEIGHT = 5
+_CONTACT_LINE_MAX = 100
+# An e-mail address or phone number with more words than this next to it is part of a sentence
+CONTACT_MAX_OTHER_WORDS = 3
+
+corrections_counter = metrics.counter(
+    "ocr_corrections_total", "OCR texts cleaned up locally or sent to Gemini for correction, by route"
+)
+avoided_gauge = metrics.gauge(
+    "ocr_correction_llm_avoided_ratio", "Share of OCR texts whose Gemini correction call was skipped"
+)
+score_histogram = metrics.histogram(
+    "ocr_text_quality_score", "Quality score of normalized OCR text", buckets=(0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 1)
+)
+
+_TRANSLATE = str.maketrans({
+    **dict.fromkeys("\u00ad\u200b\u200c\u200d\u2060\ufeff", None),
+    **dict.fromkeys("\u00a0\u2002\u2003\u2009\u202f\t", " "),
+    "\ufb00": "ff", "\ufb01": "fi", "\ufb02": "fl", "\ufb03": "ffi", "\ufb04": "ffl", "\ufb05": "st", "\ufb06": "st",
+})
+_HYPHENATED = re.compile(r"\b([A-Za-z]+)-[ ]*\n[ ]*([a-z]+)\b")
+_INNER_SPACES = re.compile(r"(?<=\S) {2,}")
+_SPACE_BEFORE_PUNCTUATION = re.compile(r"(?<=[A-Za-z)]) +(?=[,.;:!?](?:\s|$))")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_TOKEN = re.compile(r"[A-Za-z0-9]+")
+_LETTER_IN_NUMBER = re.compile(r"(?<=\d)[OolI](?=\d)")
+_DIGIT_IN_WORD = re.compile(r"[A-Za-z][0-9][a-z]|[a-z]{2}[015]\b|\b[015][a-z]{3,}")
+_CONFUSED_DIGITS = str.maketrans("015", "ols")
+_CONFUSED_LETTERS = (("rn", "m"), ("vv", "w"))
+_CONTACT_LABEL = re.compile(r"^\s*(tel|telephone|phone|ph|mobile|mob|fax|e-?mail|website)\b\s*(no\.?)?\s*[:.]", re.IGNORECASE)
+# "Address:" lines are only contact details if they hold a number (CS notes talk about memory addresses)
+_ADDRESS_LABEL = re.compile(r"^\s*(address|addr|contact|contact us)\s*[:.].*\d", re.IGNORECASE)
+_COPYRIGHT_NOTICE = re.compile(
+    r"^\W*(©|\(c\)|copyright\s*(©|\(c\))?\s*\d{4})|\ball rights reserved\W*$", re.IGNORECASE
+)
+# Words that label contact details rather than say something
+_CONTACT_WORDS = frozenset(
+    "tel telephone phone ph mobile mob fax email mail call helpline office contact us at or and on".split()
+)
+_WORD = re.compile(r"^[^A-Za-z0-9]*([A-Za-z]+(?:'[A-Za-z]+)?)[^A-Za-z0-9]*$")
+# Characters that are never text: symbols outside maths and currency, private use, controls
+_NOISE_CATEGORIES = {"So", "Sk", "Co", "Cn", "Cc", "Cs"}
+_NOISE_CHARACTERS = set("~`|\\¦¬§¤¨´¸¯")
+_TEXT_SYMBOLS = set("^°©®™✓✔✗•◦▪")
+
+_SUFFIXES = (
+    ("ies", "y"), ("ied", "y"), ("ier", "y"), ("iest", "y"), ("ily", "y"), ("ves", "f"),
+    ("ing", ""), ("ing", "e"), ("ed", ""), ("ed", "e"), ("es", ""), ("s", ""), ("'s", ""),
+    ("ly", ""), ("er", ""), ("er", "e"), ("est", ""), ("est", "e"), ("ally", ""), ("al", ""),
+    ("ation", ""), ("ation", "e"), ("ion", ""), ("ion", "e"), ("ment", ""), ("ness", ""), ("ity", ""), ("ity", "e"),
+    ("ive", ""), ("ive", "e"), ("able", ""), ("able", "e"), ("ful", ""), ("less", ""), ("ism", ""), ("ist", ""),
+    ("ise", ""), ("ize", ""), ("ic", ""), ("ical", ""), ("ous", ""), ("ence", "ent"), ("ance", "ant"),
+)
+_PREFIXES = ("un", "re", "in", "im", "dis", "non", "pre", "sub", "over", "under", "inter", "multi", "co", "mis", "anti")
+
+
+def enabled():
+    return os.getenv("OCR_LOCAL_CLEANUP", "1").lower() not in ("0", "false", "no", "off")
+
+
+def _stems(word):
+    yield word
+    for suffix, replacement in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            stem = word[:-len(suffix)] + replacement
+            yield stem
+            if len(stem) > 3 and stem[-1] == stem[-2]:
+                yield stem[:-1]    # running -> runn -> run
+
+
+@lru_cache(maxsize=65536)
+def is_known(word):
+    """Whether a lowercase word is a common English word, or one with regular prefixes and suffixes"""
+    for stem in _stems(word):
+        if stem in WORDS:
+            return True
+        if stem != word and any(inner in WORDS for inner in _stems(stem)):
+            return True    # repeatedly -> repeated -> repeat
+    for prefix in _PREFIXES:
+        if word.startswith(prefix) and len(word) - len(prefix) >= 3:
+            if any(stem in WORDS for stem in _stems(word[len(prefix):])):
+                return True
+    return False
+
+
+def _is_contact_line(line):
+    stripped = line.strip()
+    if not stripped or len(stripped) > _CONTACT_LINE_MAX:
+        return False
+    if _COPYRIGHT_NOTICE.search(stripped):
+        return True
+    if _CONTACT_LABEL.match(stripped) or _ADDRESS_LABEL.match(stripped):
+        return True
+    if not (_EMAIL.search(stripped) or (_PHONE.search(stripped) and _PHONE_CUE.search(stripped))):
+        return False
+    rest = _PHONE.sub(" ", _EMAIL.sub(" ", stripped))
+    other_words = [word for word in _TOKEN.findall(rest) if word.isalpha() and word.lower() not in _CONTACT_WORDS]
+    return len(other_words) <= CONTACT_MAX_OTHER_WORDS
+
+
+def _join_hyphenated(match):
+    left, right = match.group(1), match.group(2)
+    joined = left + right
+    if not is_known(joined.lower()) and is_known(left.lower()) and is_known(right):
+        joined = f"{left}-{right}"
+    # The word moves down to the second line, so punctuation after it stays attached
+    if match.start() == 0 or match.string[match.start() - 1] == "\n":
+        return joined
+    return "\n" + joined
+
+
+def _with_case(replacement, original):
+    if original.isupper() and len(original) > 1:
+        return replacement.upper()
+    if original[0].isupper():
+        return replacement[0].upper() + replacement[1:]
+    return replacement
+
+
+def _fix_token(token, vocabulary):
+    """`token` with OCR confusions repaired, if that turns it into a known word"""
+    if token.isdigit():
+        return token
+    if any(c.isdigit() for c in token):
+        if sum(c.isdigit() for c in token) > len(token) / 2:
+            return _LETTER_IN_NUMBER.sub(lambda m: "0" if m.group() in "Oo" else "1", token)
+        if not _DIGIT_IN_WORD.search(token):
+            return token    # units, formulas and ordinals: 5kg, H2O, 2nd
+        candidate = token.lower().translate(_CONFUSED_DIGITS)
+        if candidate.isalpha() and (is_known(candidate) or vocabulary[candidate] >= REPEATED_WORD_COUNT):
+            return _with_case(candidate, token)
+        return token
+    lower = token.lower()
+    if is_known(lower) or vocabulary[lower] >= REPEATED_WORD_COUNT:
+        return token
+    for wrong, right in _CONFUSED_LETTERS:
+        if wrong in lower:
+            candidate = lower.replace(wrong, right)
+            if is_known(candidate) or vocabulary[candidate] >= REPEATED_WORD_COUNT:
+                return _with_case(candidate, token)
+    return token
+
+
+def normalize(text):
+    """Deterministic local cleanup of OCR or PDF text (see the module docstring)"""
+    text = text.translate(_TRANSLATE).replace("\r\n", "\n").replace("\r", "\n")
+    text = _HYPHENATED.sub(_join_hyphenated, text)
+    lines = []
+    for line in text.split("\n"):
+        if _is_contact_line(line):
+            continue
+        line = _INNER_SPACES.sub(" ", line.rstrip())
+        lines.append(_SPACE_BEFORE_PUNCTUATION.sub("", line))
+    text = "\n".join(lines)
+    vocabulary = Counter(token.lower() for token in _TOKEN.findall(text) if token.isalpha())
+    text = _TOKEN.sub(lambda m: _fix_token(m.group(), vocabulary), text)
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def _is_noise(character):
+    if character in _NOISE_CHARACTERS:
+        return True
+    return character not in _TEXT_SYMBOLS and unicodedata.category(character) in _NOISE_CATEGORIES
+
+
+def score(text):
+    """{"score", "dictionary", "noise", "words"} for a text, scores 0-1"""
+    tokens = text.split()
+    words = []
+    for token in tokens:
+        match = _WORD.match(token)
+        # Single letters are mostly variables (x, b, n) and say nothing about the quality
+        if match and len(match.group(1)) > 1:
+            words.append(match.group(1))
+    counts = Counter(word.lower() for word in words)
+    known = sum(
+        1 for word in words
+        if is_known(word.lower().removesuffix("'s"))
+        or (word.isupper() and len(word) <= 5)
+        or (len(word) >= REPEATED_WORD_CHARS and counts[word.lower()] >= REPEATED_WORD_COUNT)
+    )
+    characters = [c for c in text if not c.isspace()]
+    noise_characters = sum(_is_noise(c) for c in characters)
+    mixed = sum(1 for token in tokens if _DIGIT_IN_WORD.search(token))
+    dictionary = known / len(words) if words else 0.0
+    noise = (noise_characters / len(characters) if characters else 0.0) + (mixed / len(tokens) if tokens else 0.0)
+    return {
+        "score": round(dictionary * max(0.0, 1 - NOISE_WEIGHT * noise), 4),
+        "dictionary": round(dictionary, 4),
+        "noise": round(noise, 4),
+        "words": len(words),
+    }
+
+
+def min_score():
+    return float(os.getenv("OCR_CLEAN_MIN_SCORE", str(DEFAULT_MIN_SCORE)))
+
+
+def clean(text):
+    """
+    (normalized text, quality) where quality is score() plus "route": "local"
+    if the text can be used as it is, "llm" if it should still go to Gemini
+    """
+    normalized = normalize(text)
+    quality = score(normalized)
+    if not normalized:
+        route = "local"    # nothing to correct
+    elif quality["words"] < MIN_WORDS or quality["score"] < min_score():
+        route = "llm"
+    else:
+        route = "local"
+    quality["route"] = route
+    corrections_counter.inc(route=route)
+    local = corrections_counter.value(route="local")
+    avoided_gauge.set(round(local / (local + corrections_counter.value(route="llm")), 4))
+    if normalized:
+        score_histogram.observe(quality["score"])
+    log.info("OCR text scored", chars=len(text), normalized_chars=len(normalized), **quality)
+    return normalized, quality
@@ -0,0 +1,137 @@
+"""
+Cheap check for pages with no text, run before an image is sent to OCR.
+
+Scanned notes often include blank backs of pages, dividers and photos of
+covers; each of them used to cost a Vision call and, since Vision finds
+nothing on them, a Gemini call as well. `analyze(contents)` decodes the image
+at reduced size (JPEG decoding is scaled down by the decoder itself), converts
+it to grayscale and measures, with NumPy:
+
+    ink     pixels clearly darker than the paper around them (the paper level
+            is the median of each block, so shading and uneven lighting don't
+            count as ink)
+    std     largest standard deviation of the brightness within a block; near
+            zero everywhere on an empty page, high around any writing
+    edges   sharp brightness steps between neighbouring pixels; strokes of
+            text have many, smooth photos and shadows few
+
+A page plausibly has text if it isn't uniform and has both enough ink and
+enough edges. Ink and edges are counted in pixels of the analysed image
+(longest side ANALYSIS_SIDE) rather than as a fraction of the page, and the
+thresholds are deliberately low: a page holding only "x = 2" has about 80 ink
+pixels, and while sending a blank page to OCR costs one call, skipping a page
+with a single line of notes loses it.
+
+Environment:
+    PAGE_BLANK_CHECK   set to 0 to send every page to OCR (default on)
+    PAGE_MIN_INK       minimum ink pixels (default 20)
+    PAGE_MIN_EDGES     minimum edge pixels (default 48)
+    PAGE_MIN_STD       minimum block brightness standard deviation, 0-255 (default 3)
+"""
+import io
+import os
+import time
+
+from . import metrics
+
+# Longest side of the analysed image; strokes of handwriting stay a few pixels wide
+ANALYSIS_SIDE = 1024
+# Side of the blocks whose median brightness is taken as the paper level, and whose spread is measured
+BLOCK = 32
+# Brightness steps (0-255) that count as ink below the paper level, and as an edge between neighbours
+INK_DELTA = 48
+EDGE_DELTA = 40
+
+analyzed_counter = metrics.counter("ocr_pages_analyzed_total", "Images checked for text before OCR, by result")
+analysis_seconds = metrics.histogram("ocr_page_analysis_seconds", "Time to check an image for text before OCR")
+
+
+class BlankPage(ValueError):
+    """The image has no text worth sending to OCR"""
+
+    def __init__(self, analysis):
+        super().__init__(f"No text detected on the page ({analysis['reason']}); it was not sent to OCR")
+        self.analysis = analysis
+
+
+def enabled():
+    return os.getenv("PAGE_BLANK_CHECK", "1").lower() not in ("0", "false", "no")
+
+
+def _grayscale(contents):
+    import numpy as np
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(contents))
+    image.draft("L", (ANALYSIS_SIDE, ANALYSIS_SIDE))
+    image = ImageOps.exif_transpose(image).convert("L")
+    image.thumbnail((ANALYSIS_SIDE, ANALYSIS_SIDE))
+    return np.asarray(image, dtype=np.int16)
+
+
+def _blocks(pixels):
+    """
+    (paper level, largest block spread): the median brightness of each
+    BLOCK x BLOCK block expanded back to the image size, and the largest
+    standard deviation within a block
+    """
+    import numpy as np
+
+    height, width = pixels.shape
+    rows, cols = -(-height // BLOCK), -(-width // BLOCK)
+    padded = np.pad(pixels, ((0, rows * BLOCK - height), (0, cols * BLOCK - width)), mode="edge")
+    blocks = padded.reshape(rows, BLOCK, cols, BLOCK).transpose(0, 2, 1, 3).reshape(rows, cols, BLOCK * BLOCK)
+    medians = np.median(blocks, axis=2)
+    paper = np.repeat(np.repeat(medians, BLOCK, axis=0), BLOCK, axis=1)[:height, :width]
+    return paper, float(blocks.std(axis=2).max())
+
+
+def analyze(contents):
+    """
+    {"has_text", "reason", "ink", "std", "edges", "size"} for an encoded image;
+    raises ValueError if it can't be decoded
+    """
+    import numpy as np
+
+    started = time.perf_counter()
+    try:
+        pixels = _grayscale(contents)
+    except Exception as e:
+        raise ValueError(f"Image extraction error: {e}")
+    paper, std = _blocks(pixels)
+    ink = int(np.count_nonzero(pixels < paper - INK_DELTA))
+    edges = int(
+        np.count_nonzero(np.abs(np.diff(pixels, axis=1)) > EDGE_DELTA)
+        + np.count_nonzero(np.abs(np.diff(pixels, axis=0)) > EDGE_DELTA)
+    )
+
+    if std < float(os.getenv("PAGE_MIN_STD", "3")):
+        reason = "uniform"
+    elif ink < int(os.getenv("PAGE_MIN_INK", "20")):
+        reason = "no ink"
+    elif edges < int(os.getenv("PAGE_MIN_EDGES", "48")):
+        reason = "no sharp strokes"
+    else:
+        reason = None
+    seconds = time.perf_counter() - started
+    analysis_seconds.observe(seconds)
+    analyzed_counter.inc(result="text" if reason is None else "blank")
+    return {
+        "has_text": reason is None,
+        "reason": reason or "text",
+        "ink": ink,
+        "std": round(std, 2),
+        "edges": edges,
+        "size": list(pixels.shape[::-1]),
+        "seconds": round(seconds, 4),
+    }
+
+
+def check(contents):
+    """Raise BlankPage if the blank-page check is enabled and the image has no text"""
+    if not enabled():
+        return None
+    analysis = analyze(contents)
+    if not analysis["has_text"]:
+        raise BlankPage(analysis)
+    return analysis
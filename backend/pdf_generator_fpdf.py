@@ -2,6 +2,10 @@ import re
 from fpdf import FPDF
 from datetime import datetime
 
+from .structured_log import get_logger
+
+log = get_logger(__name__)
+
 class PDF(FPDF):
     def header(self):
         self.set_font('Arial', 'B', 16)
@@ -170,11 +174,13 @@ def add_formatted_text(pdf, text, font_size=11):
 def generate_pdf_with_fpdf(title, extracted_text, summary, questions):
     """Generate PDF using fpdf2 library"""
     
-    print(f"📋 PDF Generation (fpdf2):")
-    print(f"   Title: {title}")
-    print(f"   Extracted Text Length: {len(extracted_text) if extracted_text else 0}")
-    print(f"   Summary Length: {len(summary) if summary else 0}")
-    print(f"   Questions Length: {len(questions) if questions else 0}")
+    log.info(
+        "PDF generation (fpdf2)",
+        title=title,
+        extracted_text_length=len(extracted_text) if extracted_text else 0,
+        summary_length=len(summary) if summary else 0,
+        questions_length=len(questions) if questions else 0,
+    )
     
     # Create PDF
     pdf = PDF()
@@ -198,7 +204,7 @@ def generate_pdf_with_fpdf(title, extracted_text, summary, questions):
         add_formatted_text(pdf, formatted_text, 10)
         pdf.ln(10)
     else:
-        print("⚠️ No extracted text provided or empty")
+        log.debug("No extracted text provided or empty")
     
     # Add Summary section
     if summary and summary.strip():
@@ -212,7 +218,7 @@ def generate_pdf_with_fpdf(title, extracted_text, summary, questions):
         add_formatted_text(pdf, formatted_summary, 11)
         pdf.ln(10)
     else:
-        print("⚠️ No summary provided or empty")
+        log.debug("No summary provided or empty")
     
     # Add Questions section
     if questions and questions.strip():
@@ -225,11 +231,11 @@ def generate_pdf_with_fpdf(title, extracted_text, summary, questions):
         
         add_formatted_text(pdf, formatted_questions, 11)
     else:
-        print("⚠️ No questions provided or empty")
+        log.debug("No questions provided or empty")
     
     # Generate PDF bytes
     pdf_bytes = pdf.output(dest='S')
     
-    print(f"✅ PDF generated successfully, size: {len(pdf_bytes)} bytes")
+    log.info("PDF generated (fpdf2)", size_bytes=len(pdf_bytes))
     
     return pdf_bytes
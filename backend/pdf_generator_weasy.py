@@ -3,6 +3,8 @@ import io
 import re
 from datetime import datetime
 
+from .math_markup import to_html as maths_to_html
+
 def generate_pdf_with_weasyprint(title, extracted_text, summary, questions):
     """
     Generate a well-structured PDF report using weasyprint for better HTML to PDF conversion
@@ -28,16 +30,6 @@ def generate_pdf_with_weasyprint(title, extracted_text, summary, questions):
     # Generate current date
     current_date = datetime.now().strftime("%B %d, %Y at %I:%M %p")
     
-    # Mathematical expression patterns for formatting
-    math_patterns = [
-        (r'\b([a-zA-Z0-9\s\+\-\*\/\^\(\)\.]+\s*[=≤≥<>≠≈≅∝≡]\s*[a-zA-Z0-9\s\+\-\*\/\^\(\)\.]+)\b', r'<strong>\1</strong>'),
-        (r'\b(sin|cos|tan|cot|sec|csc|sinh|cosh|tanh|asin|acos|atan|log|ln|lg|exp|sqrt|cbrt|abs|floor|ceil|round|min|max|det|trace|rank|dim|lim|sup|inf)\s*\([^)]+\)', r'<strong>\1</strong>'),
-        (r'\b([a-zA-Z0-9\(\)\[\]_{}\^\+\-\*]+)\/([a-zA-Z0-9\(\)\[\]_{}\^\+\-\*]+)\b', r'<strong>\1/\2</strong>'),
-        (r'\b([a-zA-Z0-9\(\)]+)[\^]([a-zA-Z0-9\+\-\*\/]+)\b', r'<strong>\1<sup>\2</sup></strong>'),
-        (r'([π∞αβγδεζηθικλμνξοπρστυφχψωΑΒΓΔΕΖΗΘΙΚΛΜΝΞΟΠΡΣΤΥΦΧΨΩ√∛∜∑∏∫∬∭∮∯∰∇∂∆∴∵∀∃∈∉⊂⊃⊆⊇∩∪∅ℝℂℕℤℚ℘ℵ≈≅≡≠≤≥⊥∥⟂∠∡∢°′″‰‱%])', r'<strong>\1</strong>'),
-        (r'\b([0-9]+\.?\d*\s*[+\-×÷*/÷]\s*[0-9]+\.?\d*(?:\s*[+\-×÷*/÷]\s*[0-9]+\.?\d*)*)\b', r'<strong>\1</strong>'),
-    ]
-    
     # Create HTML content with better styling
     html_content = f"""
     <!DOCTYPE html>
@@ -163,13 +155,8 @@ def generate_pdf_with_weasyprint(title, extracted_text, summary, questions):
     
     # Add extracted text section
     if clean_extracted_text:
-        # Escape HTML and convert newlines to <br> tags
-        formatted_text = clean_extracted_text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-        formatted_text = formatted_text.replace('\n', '<br>')
-        
-        # Apply mathematical expression formatting
-        for pattern, replacement in math_patterns:
-            formatted_text = re.sub(pattern, replacement, formatted_text)
+        # Escape HTML, convert newlines to <br> tags and highlight maths (one linear scan)
+        formatted_text = maths_to_html(clean_extracted_text)
         
         html_content += f"""
         <div class="section">
@@ -182,13 +169,8 @@ def generate_pdf_with_weasyprint(title, extracted_text, summary, questions):
     
     # Add summary section
     if clean_summary:
-        # Process summary content
-        formatted_summary = clean_summary.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-        formatted_summary = formatted_summary.replace('\n', '<br>')
-        
-        # Apply mathematical formatting to summary as well
-        for pattern, replacement in math_patterns:
-            formatted_summary = re.sub(pattern, replacement, formatted_summary)
+        # Process summary content, with mathematical formatting as well
+        formatted_summary = maths_to_html(clean_summary)
         
         html_content += f"""
         <div class="section">
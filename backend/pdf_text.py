@@ -0,0 +1,127 @@
+"""
+PDF text extraction with pluggable backends.
+
+Every endpoint that needs the text layer of an uploaded PDF calls
+`extract_text(data)`. The engine is chosen by PDF_TEXT_BACKEND:
+
+    pypdf2     PyPDF2 (default, always installed)
+    pdfminer   pdfminer.six, if installed
+    pypdfium2  pypdfium2 (PDFium bindings), if installed; usually the fastest
+    auto       the fastest installed engine
+
+A backend that isn't installed falls back to PyPDF2 with a warning. New
+engines subclass PdfTextBackend and are added with `register_backend()`.
+Compare them with `python -m backend.benchmarks.pdf_text`.
+"""
+import importlib.util
+import io
+import os
+import threading
+
+from .structured_log import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_BACKEND = "pypdf2"
+# Preference order for PDF_TEXT_BACKEND=auto, fastest first
+AUTO_ORDER = ("pypdfium2", "pdfminer", "pypdf2")
+
+_lock = threading.Lock()
+_backends = {}
+_selected = {}
+
+
+class PdfTextBackend:
+    """Extracts the text of each page of a PDF given as bytes"""
+
+    name = None
+    module = None    # import name checked by available()
+
+    @classmethod
+    def available(cls):
+        return importlib.util.find_spec(cls.module) is not None
+
+    def page_texts(self, data):
+        """Yield the text of each page, in order ('' for pages without text)"""
+        raise NotImplementedError
+
+
+class PyPDF2Backend(PdfTextBackend):
+    name = "pypdf2"
+    module = "PyPDF2"
+
+    def page_texts(self, data):
+        from PyPDF2 import PdfReader
+        for page in PdfReader(io.BytesIO(data)).pages:
+            yield page.extract_text() or ""
+
+
+class PdfMinerBackend(PdfTextBackend):
+    name = "pdfminer"
+    module = "pdfminer"
+
+    def page_texts(self, data):
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LTTextContainer
+        for layout in extract_pages(io.BytesIO(data)):
+            yield "".join(element.get_text() for element in layout if isinstance(element, LTTextContainer))
+
+
+class PdfiumBackend(PdfTextBackend):
+    name = "pypdfium2"
+    module = "pypdfium2"
+
+    def page_texts(self, data):
+        import pypdfium2
+        document = pypdfium2.PdfDocument(data)
+        try:
+            for index in range(len(document)):
+                page = document[index]
+                text_page = page.get_textpage()
+                try:
+                    # PDFium separates lines with \r\n
+                    yield text_page.get_text_range().replace("\r\n", "\n")
+                finally:
+                    text_page.close()
+                    page.close()
+        finally:
+            document.close()
+
+
+def register_backend(backend_class):
+    _backends[backend_class.name] = backend_class
+    return backend_class
+
+
+for _backend_class in (PyPDF2Backend, PdfMinerBackend, PdfiumBackend):
+    register_backend(_backend_class)
+
+
+def available_backends():
+    return [name for name, backend_class in _backends.items() if backend_class.available()]
+
+
+def get_backend(name=None):
+    """Backend instance for `name`, or for PDF_TEXT_BACKEND when not given"""
+    name = (name or os.getenv("PDF_TEXT_BACKEND", DEFAULT_BACKEND)).lower()
+    with _lock:
+        if name not in _selected:
+            resolved = name
+            if name == "auto":
+                resolved = next(candidate for candidate in AUTO_ORDER if _backends[candidate].available())
+            elif name not in _backends or not _backends[name].available():
+                log.warning("PDF text backend unavailable, using PyPDF2", backend=name)
+                resolved = DEFAULT_BACKEND
+            _selected[name] = _backends[resolved]()
+            log.info("PDF text backend selected", requested=name, backend=resolved)
+        return _selected[name]
+
+
+def extract_pages(data, backend=None):
+    """Text of each page, in order"""
+    return list(get_backend(backend).page_texts(data))
+
+
+def extract_text(data, backend=None):
+    """Text of all pages, each non-empty page followed by a newline"""
+    return "".join(text + "\n" for text in get_backend(backend).page_texts(data) if text)
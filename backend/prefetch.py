@@ -0,0 +1,148 @@
+"""
+Speculative prefetch of the NoteBot follow-up steps.
+
+After /ocr/extract the frontend almost always asks for /enhance-summary of
+the same text, then /text-to-speech of the summary. With PREFETCH=1 the
+backend starts that work right after OCR, on a small thread pool at
+BACKGROUND Gemini priority, keyed by a hash of the input text. When the
+follow-up request arrives it takes the prefetched result, waiting for it if
+it is still running; a prefetch that hasn't started yet is cancelled and the
+request runs the step itself at its normal priority. Before waiting on a
+running prefetch, the request raises the prefetch's Gemini priority to its
+own (gemini_scheduler.Escalation), so it isn't left queuing in the
+background class.
+
+Speculative work is capped (PREFETCH_MAX_PENDING tasks queued or running;
+beyond that nothing new is prefetched) and results expire after PREFETCH_TTL.
+Metrics count prefetches started, skipped, used (completed or in flight) and
+wasted (expired or evicted without being used).
+
+Environment:
+    PREFETCH              set to 1 to enable (default off)
+    PREFETCH_WORKERS      prefetch tasks run at once (default 2)
+    PREFETCH_MAX_PENDING  prefetch tasks queued or running at once (default 4)
+    PREFETCH_MAX_ENTRIES  results kept (default 64)
+    PREFETCH_TTL          seconds a result is kept (default 600)
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+from . import metrics
+from .gemini_scheduler import BACKGROUND, Escalation, current_priority, scheduler, use_priority
+from .structured_log import get_logger
+
+log = get_logger(__name__)
+
+started_counter = metrics.counter("prefetch_started_total", "Speculative prefetches started, by kind")
+skipped_counter = metrics.counter("prefetch_skipped_total", "Prefetches not started because the cap was reached, by kind")
+used_counter = metrics.counter("prefetch_used_total", "Prefetched results taken by a request, by kind and state")
+wasted_counter = metrics.counter("prefetch_wasted_total", "Prefetched results dropped without being used, by kind")
+
+
+def enabled():
+    return os.getenv("PREFETCH", "").lower() in ("1", "true", "yes")
+
+
+def text_key(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class _Entry:
+    def __init__(self, future, escalation):
+        self.future = future
+        self.escalation = escalation
+        self.created_at = time.monotonic()
+        self.used = False
+
+
+class Prefetcher:
+    def __init__(self, workers=None, max_pending=None, max_entries=None, ttl=None):
+        self.workers = workers or int(os.getenv("PREFETCH_WORKERS", "2"))
+        self.max_pending = max_pending or int(os.getenv("PREFETCH_MAX_PENDING", "4"))
+        self.max_entries = max_entries or int(os.getenv("PREFETCH_MAX_ENTRIES", "64"))
+        self.ttl = ttl or float(os.getenv("PREFETCH_TTL", "600"))
+        self._entries = OrderedDict()    # (kind, text hash) -> _Entry
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _drop(self, key, entry):
+        del self._entries[key]
+        if not entry.used:
+            entry.future.cancel()
+            wasted_counter.inc(kind=key[0])
+
+    def _prune(self):
+        now = time.monotonic()
+        for key, entry in list(self._entries.items()):
+            if now - entry.created_at > self.ttl:
+                self._drop(key, entry)
+        while len(self._entries) > self.max_entries:
+            key, entry = next(iter(self._entries.items()))
+            self._drop(key, entry)
+
+    def submit(self, kind, text, func, *args):
+        """Start `func(*args)` in the background for `text`, unless it is already prefetched or the cap is reached"""
+        key = (kind, text_key(text))
+        with self._lock:
+            self._prune()
+            if key in self._entries:
+                return
+            pending = sum(not entry.future.done() for entry in self._entries.values())
+            if pending >= self.max_pending:
+                skipped_counter.inc(kind=kind)
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prefetch")
+            escalation = Escalation(BACKGROUND)
+            self._entries[key] = _Entry(self._executor.submit(self._run, kind, escalation, func, *args), escalation)
+            started_counter.inc(kind=kind)
+
+    @staticmethod
+    def _run(kind, escalation, func, *args):
+        started = time.perf_counter()
+        with use_priority(escalation):
+            result = func(*args)
+        log.info("Prefetch completed", kind=kind, duration_ms=round((time.perf_counter() - started) * 1000, 1))
+        return result
+
+    def take(self, kind, text):
+        """
+        Prefetched result for `text` as (result, state), or None if there is none
+        (never started, not started yet, failed or cancelled). Blocks while the
+        prefetch is running, after raising it to the caller's priority; state is
+        "completed" or "inflight".
+        """
+        key = (kind, text_key(text))
+        with self._lock:
+            self._prune()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            # Not picked up by a worker yet: the request is better off running it at its own priority
+            if entry.future.cancel():
+                del self._entries[key]
+                wasted_counter.inc(kind=kind)
+                return None
+            state = "completed" if entry.future.done() else "inflight"
+            entry.used = True
+            self._entries.move_to_end(key)
+        if state == "inflight":
+            scheduler.escalate(entry.escalation, current_priority())
+        try:
+            result = entry.future.result()
+        except (CancelledError, Exception) as e:
+            log.warning("Prefetched result unusable", kind=kind, error=str(e))
+            return None
+        used_counter.inc(kind=kind, state=state)
+        return result, state
+
+    def stop(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            self._entries.clear()
@@ -0,0 +1,270 @@
+"""
+On-demand profiling of single requests.
+
+`ProfilingMiddleware` profiles a request when it carries the admin header
+`X-Profile: <PROFILE_TOKEN>`, or when it is picked by PROFILE_SAMPLE_RATE.
+Everything else goes straight to the app after one header lookup.
+
+Two profilers:
+    sampling  (default) samples the stacks of every thread every
+              PROFILE_INTERVAL seconds, so work offloaded to the threadpool
+              is included. Saved as folded stacks (`*.folded`), one
+              "thread;frame;frame count" line per stack, ready for
+              flamegraph.pl or speedscope.
+    cprofile  deterministic cProfile of the event-loop thread (`*.prof`,
+              open with pstats or snakeviz). Work in threadpool threads
+              doesn't appear; use the sampler for those endpoints.
+
+Only one request is profiled at a time; others pass through unprofiled.
+Profiles go to PROFILE_DIR, named after the time, route, request id and
+duration; the oldest are deleted beyond PROFILE_KEEP. The response of a
+profiled request carries `X-Profile-Id`, and `list_profiles()` backs the
+`/debug/profiles` endpoints.
+
+Environment:
+    PROFILE_TOKEN         value of the X-Profile header that enables profiling
+                          (the header is ignored while this is unset)
+    PROFILE_SAMPLE_RATE   fraction of all requests to profile (default 0)
+    PROFILER              sampling (default) or cprofile
+    PROFILE_INTERVAL      sampling interval in seconds (default 0.005)
+    PROFILE_DIR           output directory (default backend/data/profiles)
+    PROFILE_KEEP          profiles kept (default 50)
+"""
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+from fastapi.concurrency import run_in_threadpool
+
+from .structured_log import get_logger
+
+log = get_logger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+REQUEST_ID_HEADER = b"x-request-id"
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DIR = os.path.join(BACKEND_DIR, "data", "profiles")
+BENCHMARKS_DIR = os.path.join(BACKEND_DIR, "benchmarks")
+EXTENSIONS = (".folded", ".prof")
+# Background loops that are always alive and never part of a request
+IGNORED_THREADS = ("job-poller", "profile-sampler")
+_ID = r"(?P<created>\d{8}T\d{9})_(?P<route>[\w.-]+)_(?P<request_id>[A-Za-z0-9-]+)"
+_NAME = re.compile(rf"^(?P<id>{_ID})_(?P<duration_ms>\d+)ms\.(?P<kind>folded|prof)$")
+
+
+def profile_dir():
+    return os.getenv("PROFILE_DIR", DEFAULT_DIR)
+
+
+def admin_token():
+    return os.getenv("PROFILE_TOKEN")
+
+
+def is_admin(token):
+    expected = admin_token()
+    if not expected or not token:    # no token configured, or no X-Profile header
+        return False
+    # Constant-time, so response times don't leak how much of the token matched
+    return hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8"))
+
+
+def can_read_profiles(token, client_host):
+    """Profiles need the admin token, or a loopback client while no token is configured"""
+    if admin_token():
+        return is_admin(token)
+    return client_host in ("127.0.0.1", "::1", "localhost")
+
+
+class StackSampler:
+    """Samples all threads' stacks from a background thread"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        names = {}
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                thread_name = names.get(thread_id, str(thread_id))
+                if thread_name in IGNORED_THREADS:
+                    continue
+                stack = []
+                in_backend = False
+                while frame is not None:
+                    code = frame.f_code
+                    filename = code.co_filename
+                    in_backend = in_backend or (filename.startswith(BACKEND_DIR) and not filename.startswith(BENCHMARKS_DIR))
+                    stack.append(f"{os.path.basename(filename)}:{code.co_name}")
+                    frame = frame.f_back
+                # Idle threads (event loop in select, pool workers waiting for work) have no backend frames
+                if not in_backend:
+                    continue
+                stack.append(thread_name.replace(" ", "_"))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class CProfiler:
+    def __init__(self):
+        import cProfile
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def save(self, path):
+        self.profile.dump_stats(path)
+
+
+def _route_slug(scope):
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path", "/")
+    return re.sub(r"[^\w.-]+", "-", path).strip("-") or "root"
+
+
+def _rotate(directory, keep):
+    profiles = sorted(name for name in os.listdir(directory) if name.endswith(EXTENSIONS))
+    for name in profiles[:max(0, len(profiles) - keep)]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+def _save(profiler, name, keep):
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    profiler.save(os.path.join(directory, name))
+    _rotate(directory, keep)
+
+
+def list_profiles():
+    """Saved profiles, newest first"""
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        match = _NAME.match(name)
+        if not match:
+            continue
+        created = datetime.strptime(match["created"][:15], "%Y%m%dT%H%M%S").replace(tzinfo=timezone.utc)
+        profiles.append({
+            "id": match["id"],
+            "file": name,
+            "route": match["route"],
+            "request_id": match["request_id"],
+            "profiler": "sampling" if match["kind"] == "folded" else "cprofile",
+            "duration_ms": int(match["duration_ms"]),
+            "created_at": created.isoformat(),
+            "size_bytes": os.path.getsize(os.path.join(directory, name)),
+        })
+    return profiles
+
+
+def profile_path(profile_id):
+    """Path of the saved profile with this id (as in X-Profile-Id), or None"""
+    directory = profile_dir()
+    if not re.fullmatch(_ID, profile_id) or not os.path.isdir(directory):
+        return None
+    for name in os.listdir(directory):
+        match = _NAME.match(name)
+        if match and match["id"] == profile_id:
+            return os.path.join(directory, name)
+    return None
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware; see the module docstring"""
+
+    def __init__(self, app):
+        self.app = app
+        self.sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        self.profiler = os.getenv("PROFILER", "sampling")
+        self.interval = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+        self.keep = int(os.getenv("PROFILE_KEEP", "50"))
+        self.header_enabled = bool(admin_token())
+        self._busy = threading.Lock()
+
+    def _wanted(self, scope):
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        if not self.header_enabled:
+            return False
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return is_admin(value.decode("latin-1"))
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope) or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self._profile(scope, receive, send)
+        finally:
+            self._busy.release()
+
+    async def _profile(self, scope, receive, send):
+        request_id = next(
+            (value.decode("latin-1") for name, value in scope["headers"] if name == REQUEST_ID_HEADER),
+            uuid.uuid4().hex[:12],
+        )
+        request_id = re.sub(r"[^A-Za-z0-9-]+", "-", request_id)[:64]
+        started_at = datetime.now(timezone.utc)
+        stamp = started_at.strftime("%Y%m%dT%H%M%S") + f"{started_at.microsecond // 1000:03d}"
+        profile_ids = []
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile_ids.append(f"{stamp}_{_route_slug(scope)}_{request_id}")
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_ids[0].encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiler = CProfiler() if self.profiler == "cprofile" else StackSampler(self.interval)
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            base = profile_ids[0] if profile_ids else f"{stamp}_{_route_slug(scope)}_{request_id}"
+            extension = ".prof" if isinstance(profiler, CProfiler) else ".folded"
+            name = f"{base}_{duration_ms}ms{extension}"
+            try:
+                # Profiles can be megabytes; write them without blocking the event loop
+                await run_in_threadpool(_save, profiler, name, self.keep)
+                log.info("Request profiled", profile=name, path=scope.get("path"), duration_ms=duration_ms)
+            except OSError as e:
+                log.warning("Could not save profile", profile=name, error=str(e))
@@ -0,0 +1,151 @@
+"""
+Binary responses sent straight from the buffer they were rendered into.
+
+The PDF and MP3 endpoints used to wrap finished bytes in a new io.BytesIO for
+StreamingResponse, which iterates a BytesIO line by line: a PDF went out as
+thousands of small chunks split at b"\\n", with no Content-Length. BufferResponse
+takes the finished buffer (bytes, bytearray, memoryview, a BytesIO or a
+SpooledTemporaryFile) and sends it in CHUNK_BYTES pieces with Content-Length:
+BytesIO contents are exported with getbuffer() and files on disk are mmap'd,
+so the body is never copied as a whole. ASGI requires each body message to be
+bytes, so every piece is copied out of the view just before it is sent; per
+piece the server waits for the socket to drain, so about one piece per
+connection is in memory at a time.
+
+GET and HEAD requests may ask for part of the body with a single
+`Range: bytes=...` (e.g. an <audio> element seeking in an MP3); the answer is
+206 with Content-Range, or 416 if the range is outside the body. Other
+methods, multiple ranges and If-Range (there are no validators to compare)
+get the whole body, as RFC 9110 allows. Seeking therefore only works on the
+GET downloads (/artifacts/{id} and job results), not on the POST endpoints
+that render a PDF or MP3.
+"""
+import io
+import mmap
+import re
+
+from starlette.responses import Response
+
+CHUNK_BYTES = 1024 * 1024
+_RANGE = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    (start, end) with `end` exclusive for a single-range Range header, None if
+    the header should be ignored; raises RangeNotSatisfiable
+    """
+    match = _RANGE.match(header)
+    if match is None:
+        return None    # malformed or several ranges: send everything
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - length), size
+    start = int(first)
+    end = size if not last else min(int(last) + 1, size)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+def _view_of(content):
+    """(memoryview of the content's bytes, function that releases what the view was taken from)"""
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        return memoryview(content).cast("B"), None
+    if isinstance(content, io.BytesIO):
+        return content.getbuffer(), content.close
+    # SpooledTemporaryFile: still a BytesIO in memory, or a real file once it rolled over to disk
+    inner = getattr(content, "_file", content)
+    if isinstance(inner, io.BytesIO):
+        return inner.getbuffer(), content.close
+    size = content.seek(0, io.SEEK_END)
+    if size == 0:
+        content.close()
+        return memoryview(b""), None
+    mapped = mmap.mmap(content.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close():
+        mapped.close()
+        content.close()
+    return memoryview(mapped), close
+
+
+class BufferResponse(Response):
+    """Response whose body is a view of an already rendered buffer; `filename` sets Content-Disposition"""
+
+    def __init__(self, content, media_type=None, filename=None, headers=None, status_code=200):
+        self.status_code = status_code
+        if media_type is not None:
+            self.media_type = media_type
+        self.background = None
+        self.body, self._release = _view_of(content)
+        headers = dict(headers or {})
+        if filename:
+            headers.setdefault("Content-Disposition", f"attachment; filename={filename}")
+        self.init_headers(headers)
+
+    async def __call__(self, scope, receive, send):
+        views = [self.body]
+        try:
+            status, headers, body = self._partial(scope)
+            if isinstance(body, memoryview) and body is not self.body:
+                views.append(body)
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            if scope.get("method") == "HEAD":
+                body = b""
+            offsets = range(0, len(body), CHUNK_BYTES) or [0]
+            for offset in offsets:
+                chunk = memoryview(body)[offset:offset + CHUNK_BYTES]
+                try:
+                    data = bytes(chunk)
+                finally:
+                    chunk.release()
+                await send({"type": "http.response.body", "body": data, "more_body": offset != offsets[-1]})
+        finally:
+            self._close(views)
+
+    def _close(self, views):
+        for view in reversed(views):
+            try:
+                view.release()
+            except BufferError:
+                # Still exported somewhere; left to the GC
+                pass
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    def _partial(self, scope):
+        """(status, raw headers, body) for the request's Range header, if any"""
+        size = len(self.body)
+        headers = [(name, value) for name, value in self.raw_headers if name != b"content-length"]
+        if scope.get("method") not in ("GET", "HEAD") or self.status_code != 200:
+            return self.status_code, headers + [(b"content-length", str(size).encode())], self.body
+        headers.append((b"accept-ranges", b"bytes"))
+        request_headers = dict(scope.get("headers") or [])
+        header = request_headers.get(b"range")
+        if header is None or b"if-range" in request_headers:
+            return 200, headers + [(b"content-length", str(size).encode())], self.body
+        try:
+            span = parse_range(header.decode("latin-1"), size)
+        except RangeNotSatisfiable:
+            return 416, headers + [(b"content-range", f"bytes */{size}".encode()), (b"content-length", b"0")], b""
+        if span is None:
+            return 200, headers + [(b"content-length", str(size).encode())], self.body
+        start, end = span
+        return 206, headers + [
+            (b"content-range", f"bytes {start}-{end - 1}/{size}".encode()),
+            (b"content-length", str(end - start).encode()),
+        ], self.body[start:end]
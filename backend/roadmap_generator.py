@@ -1,9 +1,26 @@
 import os
-import requests
 from fastapi import HTTPException
 
+from . import cassette, server_timing
+from .ai_clients import gemini_rest_base
+from .gemini_scheduler import scheduler
+from .structured_log import get_logger
+
+log = get_logger(__name__)
+
+def _post(url, payload, gemini_api_key):
+    """POST to the Gemini REST API; returns the status and the JSON (or text) body"""
+    import requests
+    response = requests.post(url, params={"key": gemini_api_key}, json=payload,
+                             headers={"Content-Type": "application/json"})
+    try:
+        body = response.json()
+    except Exception:
+        body = response.text
+    return {"ok": response.ok, "status": response.status_code, "body": body}
+
 def generate_roadmap_with_gemini(topic: str, gemini_api_key: str) -> dict:
-    url = f"https://generativelanguage.googleapis.com/v1/models/gemini-1.5-pro:generateContent?key={gemini_api_key}"
+    url = f"{gemini_rest_base()}/v1/models/gemini-1.5-pro:generateContent"
     prompt = f'''
 Create a comprehensive, well-structured learning roadmap for the topic: {topic}
 
@@ -58,17 +75,22 @@ Return ONLY the markdown-formatted roadmap, no extra commentary or JSON.
             {"parts": [{"text": prompt}]}
         ]
     }
-    response = requests.post(url, json=payload, headers={"Content-Type": "application/json"})
-    if not response.ok:
-        try:
-            error_detail = response.json()
-        except Exception:
-            error_detail = response.text
-        print(f"Gemini API error: {error_detail}")
+    with scheduler.slot(len(prompt) // 4 + 4096) as usage:
+        response = cassette.call(
+            "gemini.rest_generate_content",
+            {"model": "gemini-1.5-pro", "payload": payload},
+            lambda: _post(url, payload, gemini_api_key),
+        )
+        if response["ok"]:
+            usage["total_tokens"] = response["body"].get("usageMetadata", {}).get("totalTokenCount")
+            server_timing.add_tokens(usage["total_tokens"])
+    if not response["ok"]:
+        error_detail = response["body"]
+        log.error("Gemini API error", detail=error_detail)
         raise HTTPException(status_code=500, detail=f"Failed to generate roadmap from Gemini API: {error_detail}")
     # Return markdown roadmap directly
     try:
-        content = response.json()
+        content = response["body"]
         text = content["candidates"][0]["content"]["parts"][0]["text"]
         return {"markdown": text}
     except Exception as e:
@@ -0,0 +1,311 @@
+"""
+Production process manager for the backend.
+
+Starts N uvicorn workers that share one listening socket. On POSIX the app is
+imported once in the supervisor and the workers are forked from it, so the
+imported code is shared copy-on-write. The supervisor restarts workers that
+crash, after a delay that doubles with each recent crash (RESTART_DELAY up to
+RESTART_MAX_DELAY), and gives up with exit status 1 when more than
+MAX_CRASHES workers die within CRASH_WINDOW seconds, e.g. because every new
+worker fails at startup. It performs a rolling restart on SIGHUP: a replacement worker is started
+and reported ready before the old one is asked to shut down gracefully, so
+in-flight requests finish and the socket is never left without a listener.
+
+With --no-preload each worker imports the app itself after forking, which lets a
+rolling restart pick up new code. On Windows (no fork) this falls back to
+`uvicorn --workers N`.
+
+Usage (from the project root):
+    python -m backend.server --workers 4 --host 0.0.0.0 --port 8001
+    kill -HUP <supervisor pid>    # rolling restart
+"""
+import argparse
+import collections
+import gc
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from .structured_log import get_logger
+
+log = get_logger("backend.server")
+
+APP_PATH = "backend.main:app"
+# Restart backoff after unexpected worker exits, and the crash loop that stops the supervisor
+RESTART_DELAY = 0.5
+RESTART_MAX_DELAY = 30.0
+MAX_CRASHES = 10
+CRASH_WINDOW = 60.0
+
+
+def default_worker_count():
+    """WEB_CONCURRENCY if set, otherwise one worker per CPU"""
+    if os.getenv("WEB_CONCURRENCY"):
+        return max(1, int(os.getenv("WEB_CONCURRENCY")))
+    return max(1, os.cpu_count() or 1)
+
+
+def wait_until_healthy(url, timeout=60.0, initial_delay=0.05, max_delay=2.0, proc=None):
+    """Poll `url` with exponential backoff until it returns 200; False on timeout or if `proc` exits"""
+    import requests
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            return False
+        try:
+            if requests.get(url, timeout=min(2.0, max(delay, 0.5))).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+        delay = min(delay * 2, max_delay)
+    return False
+
+
+def _bind_socket(host, port, backlog=2048):
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class PreforkServer:
+    """Supervises forked uvicorn workers sharing a single listening socket"""
+
+    def __init__(self, app_path=APP_PATH, host="127.0.0.1", port=8001, workers=None,
+                 preload=True, graceful_timeout=30, ready_timeout=60):
+        self.app_path = app_path
+        self.host = host
+        self.port = port
+        self.worker_count = workers or default_worker_count()
+        self.preload = preload
+        self.graceful_timeout = graceful_timeout
+        self.ready_timeout = ready_timeout
+        self.app = None
+        self.sock = None
+        self.workers = {}        # pid -> read end of the worker's readiness pipe
+        self.retiring = set()    # pids asked to stop as part of a rolling restart
+        self.stopping = False
+        self.restart_requested = False
+        self.exit_code = 0
+        self.crashes = collections.deque()    # monotonic times of unexpected worker exits
+        self.respawns = []                    # monotonic times replacement workers are due
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+
+    # -- worker side -----------------------------------------------------------
+
+    def _run_worker(self, ready_w):
+        import uvicorn
+        # uvicorn installs its own SIGINT/SIGTERM handlers for graceful shutdown
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(signum, signal.SIG_DFL)
+        app = self.app if self.preload else uvicorn.importer.import_from_string(self.app_path)
+        config = uvicorn.Config(
+            app,
+            lifespan="on",
+            timeout_graceful_shutdown=self.graceful_timeout,
+        )
+        server = uvicorn.Server(config)
+
+        def notify_ready():
+            while not server.started and not server.should_exit:
+                time.sleep(0.02)
+            if server.started:
+                os.write(ready_w, b"1")
+            os.close(ready_w)
+
+        threading.Thread(target=notify_ready, daemon=True).start()
+        server.run(sockets=[self.sock])
+
+    # -- supervisor side -------------------------------------------------------
+
+    def spawn_worker(self):
+        ready_r, ready_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            os.close(self._wakeup_r)
+            os.close(self._wakeup_w)
+            code = 0
+            try:
+                self._run_worker(ready_w)
+            except BaseException:
+                log.exception("Worker crashed during startup")
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(ready_w)
+        self.workers[pid] = ready_r
+        log.info("Worker started", pid=pid)
+        return pid
+
+    def wait_ready(self, pid, timeout):
+        ready_r = self.workers.get(pid)
+        if ready_r is None:
+            return False
+        readable, _, _ = select.select([ready_r], [], [], timeout)
+        return bool(readable) and os.read(ready_r, 1) == b"1"
+
+    def _forget(self, pid):
+        ready_r = self.workers.pop(pid, None)
+        if ready_r is not None:
+            os.close(ready_r)
+        self.retiring.discard(pid)
+
+    def reap_workers(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            expected = self.stopping or pid in self.retiring
+            self._forget(pid)
+            if expected:
+                log.info("Worker exited", pid=pid)
+            else:
+                self._schedule_respawn(pid, status)
+
+    def _schedule_respawn(self, pid, status):
+        now = time.monotonic()
+        self.crashes.append(now)
+        while self.crashes and self.crashes[0] < now - CRASH_WINDOW:
+            self.crashes.popleft()
+        if len(self.crashes) > MAX_CRASHES:
+            log.error("Workers keep crashing, stopping the supervisor", pid=pid, status=status,
+                      crashes=len(self.crashes), window_seconds=CRASH_WINDOW)
+            self.stopping = True
+            self.exit_code = 1
+            return
+        delay = min(RESTART_MAX_DELAY, RESTART_DELAY * 2 ** (len(self.crashes) - 1))
+        log.warning("Worker died unexpectedly, restarting", pid=pid, status=status, delay_seconds=delay)
+        self.respawns.append(now + delay)
+
+    def _spawn_due(self):
+        now = time.monotonic()
+        due = [at for at in self.respawns if at <= now]
+        self.respawns = [at for at in self.respawns if at > now]
+        for _ in due:
+            self.spawn_worker()
+
+    def rolling_restart(self):
+        log.info("Rolling restart started", workers=len(self.workers))
+        for old_pid in [pid for pid in self.workers if pid not in self.retiring]:
+            if self.stopping:
+                return
+            new_pid = self.spawn_worker()
+            if not self.wait_ready(new_pid, self.ready_timeout):
+                log.error("Replacement worker did not become ready, aborting rolling restart", pid=new_pid)
+                self.retiring.add(new_pid)
+                self._kill(new_pid, signal.SIGKILL)
+                return
+            self.retiring.add(old_pid)
+            self._kill(old_pid, signal.SIGTERM)
+        log.info("Rolling restart finished", workers=len(self.workers) - len(self.retiring))
+
+    def _kill(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def _signal(self, signum, frame):
+        if signum == signal.SIGHUP:
+            self.restart_requested = True
+        elif signum in (signal.SIGTERM, signal.SIGINT):
+            self.stopping = True
+        try:
+            os.write(self._wakeup_w, b"!")
+        except BlockingIOError:
+            pass
+
+    def run(self):
+        if self.preload:
+            import uvicorn
+            self.app = uvicorn.importer.import_from_string(self.app_path)
+            # Keep the preloaded objects out of the collector's reach so the
+            # forked workers don't dirty (and copy) the shared pages.
+            gc.collect()
+            gc.freeze()
+        self.sock = _bind_socket(self.host, self.port)
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(signum, self._signal)
+        log.info("Supervisor started", pid=os.getpid(), workers=self.worker_count,
+                 preload=self.preload, address=f"{self.host}:{self.port}")
+
+        for _ in range(self.worker_count):
+            self.spawn_worker()
+
+        while not self.stopping:
+            timeout = min([1.0] + [max(0.0, at - time.monotonic()) for at in self.respawns])
+            select.select([self._wakeup_r], [], [], timeout)
+            try:
+                os.read(self._wakeup_r, 64)
+            except BlockingIOError:
+                pass
+            self.reap_workers()
+            if not self.stopping:
+                self._spawn_due()
+            if self.restart_requested and not self.stopping:
+                self.restart_requested = False
+                self.rolling_restart()
+        self.shutdown()
+        return self.exit_code
+
+    def shutdown(self):
+        log.info("Supervisor stopping", workers=len(self.workers))
+        for pid in list(self.workers):
+            self._kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            self.reap_workers()
+            time.sleep(0.1)
+        for pid in list(self.workers):
+            self._kill(pid, signal.SIGKILL)
+        self.reap_workers()
+        self.sock.close()
+
+
+def run_without_fork(host, port, workers):
+    """Fallback for platforms without os.fork: uvicorn's own multi-process mode"""
+    log.warning("os.fork is unavailable; starting uvicorn --workers without preloading")
+    cmd = [sys.executable, "-m", "uvicorn", APP_PATH, "--host", host, "--port", str(port),
+           "--workers", str(workers)]
+    return subprocess.call(cmd)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8001)))
+    parser.add_argument("--workers", type=int, default=None, help="default: WEB_CONCURRENCY or CPU count")
+    parser.add_argument("--no-preload", action="store_true", help="import the app in each worker after forking")
+    parser.add_argument("--graceful-timeout", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    workers = args.workers or default_worker_count()
+    if not hasattr(os, "fork"):
+        return run_without_fork(args.host, args.port, workers)
+    return PreforkServer(
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        preload=not args.no_preload,
+        graceful_timeout=args.graceful_timeout,
+    ).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
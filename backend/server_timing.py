@@ -0,0 +1,138 @@
+"""
+Server-Timing breakdown of each response.
+
+`ServerTimingMiddleware` gives every HTTP request a recorder (in a context
+variable, so it is also visible in threadpool calls made by the request).
+Pipeline code wraps its steps in `stage(name)`; `add_tokens(n)` charges
+upstream tokens to the innermost stage open in the calling thread (the open
+stages are a context variable too, so parallel threadpool calls of one
+request each credit their own). When the response starts, the middleware
+adds a header such as
+
+    Server-Timing: upload;dur=3.1, gemini_correct;dur=812.4;desc="tokens=1534",
+                   gemini_summary;dur=1620.0;desc="tokens=2210", json;dur=0.4, total;dur=2441.7
+
+Repeated stages are summed. `upload` is the time spent receiving the request
+body, `json` the response rendering (via TimedJSONResponse) and `total` the
+time until the response headers were sent. Streaming responses (no
+Content-Length) get no header: their stages run after the headers are sent,
+and ASGI servers here don't send trailers. Stage durations are also exported
+as the `request_stage_seconds` histogram, for jobs and streams too.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from fastapi.responses import JSONResponse
+
+from . import metrics
+
+stage_seconds = metrics.histogram("request_stage_seconds", "Duration of pipeline stages")
+
+_recorder = contextvars.ContextVar("server_timing", default=None)
+_open_stages = contextvars.ContextVar("server_timing_open_stages", default=())
+
+
+class Recorder:
+    def __init__(self):
+        self.durations = {}    # stage -> seconds, in first-seen order
+        self.tokens = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self.lock:
+            self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def header(self, total_seconds):
+        with self.lock:
+            entries = []
+            for name, seconds in self.durations.items():
+                entry = f"{name};dur={seconds * 1000:.1f}"
+                if name in self.tokens:
+                    entry += f';desc="tokens={self.tokens[name]}"'
+                entries.append(entry)
+        entries.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(entries)
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as one Server-Timing stage"""
+    recorder = _recorder.get()
+    token = _open_stages.set(_open_stages.get() + (name,))
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        _open_stages.reset(token)
+        stage_seconds.observe(seconds, stage=name)
+        if recorder is not None:
+            recorder.add(name, seconds)
+
+
+def add_tokens(count, name=None):
+    """Charge upstream tokens to `name`, or to the innermost open stage"""
+    recorder = _recorder.get()
+    if recorder is None or not count:
+        return
+    open_stages = _open_stages.get()
+    name = name or (open_stages[-1] if open_stages else "upstream")
+    with recorder.lock:
+        recorder.tokens[name] = recorder.tokens.get(name, 0) + count
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse whose encoding shows up as the `json` stage"""
+
+    def render(self, content):
+        with stage("json"):
+            return super().render(content)
+
+
+class ServerTimingMiddleware:
+    """Pure ASGI middleware that adds the Server-Timing header"""
+
+    def __init__(self, app, allowed_origins=()):
+        self.app = app
+        # Browsers only expose cross-origin timings to pages allowed by Timing-Allow-Origin
+        self.allowed_origins = {origin.encode("latin-1") for origin in allowed_origins}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        recorder = Recorder()
+        token = _recorder.set(recorder)
+        started = time.perf_counter()
+        received = {"bytes": 0, "done": False}
+
+        async def timed_receive():
+            message = await receive()
+            if message["type"] == "http.request" and not received["done"]:
+                received["bytes"] += len(message.get("body", b""))
+                if not message.get("more_body", False):
+                    received["done"] = True
+                    if received["bytes"]:
+                        recorder.add("upload", time.perf_counter() - started)
+            return message
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                if not any(name.lower() == b"content-length" for name, _ in headers):
+                    # Streaming: nothing has run yet, an empty breakdown would only mislead
+                    await send(message)
+                    return
+                headers.append((b"server-timing", recorder.header(time.perf_counter() - started).encode("latin-1")))
+                origin = next((value for name, value in scope["headers"] if name == b"origin"), None)
+                if origin in self.allowed_origins:
+                    headers.append((b"timing-allow-origin", origin))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, timed_receive, send_with_timing)
+        finally:
+            _recorder.reset(token)
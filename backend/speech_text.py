@@ -0,0 +1,215 @@
+"""
+Rule-based conversion of summary Markdown into text for text-to-speech.
+
+Before gTTS runs, /text-to-speech rewrote the summary with a Gemini call
+(make_text_speech_friendly), which adds seconds before any audio exists.
+`markdown_to_speech(text)` handles the Markdown generate_structured_summary
+produces, locally and in a few milliseconds:
+
+    # Title               "Here is the summary of Title."
+    ## Section 1: Basics  "Let's start with basics." / "Next, details."
+    ### Heading           "Heading."
+    - bullet, 1. item     a sentence of its own
+    | a | b |             "a, b."
+    **bold**, `code`, [links](...)  their text only
+
+and reads maths out: "E = mc^2" -> "E equals mc squared", "a/b" -> "a over
+b", "x ≤ 5" -> "x is less than or equal to 5", "√x", "π", "±", "%", "°C",
+"->" and friends. ISO dates are read as dates ("2024-01-15" -> "15 January
+2024"), not as a range and a subtraction. The Gemini rewrite still sounds more natural and stays
+the "llm" mode; "local" is chosen per request (`mode` of /text-to-speech and
+/jobs/text-to-speech, `speech_mode` of /notebot/process) or for every request
+with SPEECH_TEXT_MODE. backend/benchmarks/speech_text.py compares the
+latency of both:
+    python -m backend.benchmarks.speech_text
+
+Environment:
+    SPEECH_TEXT_MODE   "llm" (default) or "local", for requests that don't choose
+"""
+import os
+import re
+import unicodedata
+
+MODES = ("llm", "local")
+
+_SECTION_PREFIX = re.compile(r"^(?:section|part|chapter|topic)\s+\w+\s*[:.\-–—]\s*", re.IGNORECASE)
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*$")
+_BULLET = re.compile(r"^\s*(?:[-*+•]|\d{1,3}[.)])\s+")
+_RULE = re.compile(r"^\s*(?:[-*_]\s*){3,}$")
+_TABLE_SEPARATOR = re.compile(r"^\s*\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?\s*$")
+_IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_LINK = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+_URL = re.compile(r"(?:https?://|www\.)\S+")
+_BOLD = re.compile(r"(\*\*|__)(?=\S)(.+?)(?<=\S)\1")
+_ITALIC = re.compile(r"(?<![\w*])([*_])(?=\S)([^*_\n]+?)(?<=\S)\1(?![\w*])")
+_CODE = re.compile(r"`+([^`]*)`+")
+
+_ABBREVIATIONS = [
+    (re.compile(r"\be\.g\.,?", re.IGNORECASE), "for example,"),
+    (re.compile(r"\bi\.e\.,?", re.IGNORECASE), "that is,"),
+    (re.compile(r"\betc\.(?=\s+[a-z])"), "and so on"),
+    (re.compile(r"\betc\."), "and so on."),
+    (re.compile(r"\bvs\.?(?=\s)"), "versus"),
+]
+# Checked in order: longer operators first
+_MATHS = [
+    # Unspaced hyphens between numbers are ranges ("pages 10-20", "1990-1995"), spaced ones subtraction
+    (re.compile(r"\b(\d+(?:\.\d+)?)[-–](\d+(?:\.\d+)?)\b"), r"\1 to \2"),
+    (re.compile(r"\s*−\s*"), " minus "),
+    # A hyphen is a minus between numbers, single-letter variables and brackets, not inside words ("x-ray")
+    (re.compile(r"(?:(?<=[\d)\]²³])|(?<=(?<![A-Za-z])[A-Za-z]))\s*-\s*(?=\d|[A-Za-z](?![A-Za-z])|\(|√)"), " minus "),
+    (re.compile(r"(?:(?<=^)|(?<=[\s(=]))-(?=\d|[A-Za-z](?![A-Za-z])|\(|√)"), "minus "),
+    (re.compile(r"√\s*\(([^)]*)\)|\bsqrt\s*\(([^)]*)\)"), lambda m: f" the square root of {m.group(1) or m.group(2)}"),
+    (re.compile(r"√\s*(\w+)"), r" the square root of \1"),
+    (re.compile(r"\^\s*2(?![\d.])|²"), " squared"),
+    (re.compile(r"\^\s*3(?![\d.])|³"), " cubed"),
+    (re.compile(r"\^\s*\(([^)]*)\)"), r" to the power of \1"),
+    (re.compile(r"\^\s*(-?[\w.]+)"), r" to the power of \1"),
+    (re.compile(r"\s*(?:<=>|⇔|<->|↔)\s*"), " if and only if "),
+    (re.compile(r"\s*(?:=>|⇒)\s*"), " implies "),
+    (re.compile(r"\s*(?:->|-->|→|⟶)\s*"), " gives "),
+    (re.compile(r"\s*(?:<-|←)\s*"), " comes from "),
+    (re.compile(r"\s*(?:<=|≤)\s*"), " is less than or equal to "),
+    (re.compile(r"\s*(?:>=|≥)\s*"), " is greater than or equal to "),
+    (re.compile(r"\s*(?:!=|≠)\s*"), " is not equal to "),
+    (re.compile(r"\s*(?:≈|~=|≅)\s*"), " is approximately "),
+    (re.compile(r"\s*∝\s*"), " is proportional to "),
+    (re.compile(r"(?<=[\w)])\s*<\s*(?=[\w(−-])"), " is less than "),
+    (re.compile(r"(?<=[\w)])\s*>\s*(?=[\w(−-])"), " is greater than "),
+    (re.compile(r"\s*={1,2}\s*"), " equals "),
+    (re.compile(r"\s*±\s*"), " plus or minus "),
+    (re.compile(r"(?<=[\w)\]])\s*\+\s*(?=[\w(√])"), " plus "),
+    (re.compile(r"(?<=[\w)\]])\s*[*×·]\s*(?=[\w(√])"), " times "),
+    (re.compile(r"(?<=[\w)\]])\s*÷\s*(?=[\w(√])"), " divided by "),
+    (re.compile(r"%"), " percent"),
+    (re.compile(r"\s*°\s*C\b"), " degrees Celsius"),
+    (re.compile(r"\s*°\s*F\b"), " degrees Fahrenheit"),
+    (re.compile(r"\s*°"), " degrees"),
+    (re.compile(r"\s*&\s*"), " and "),
+]
+_SYMBOLS = {
+    "π": " pi ", "∞": " infinity ", "Δ": " delta ", "δ": " delta ", "θ": " theta ", "α": " alpha ", "β": " beta ",
+    "γ": " gamma ", "λ": " lambda ", "μ": " mu ", "σ": " sigma ", "ω": " omega ", "Ω": " ohms ", "Σ": " the sum of ",
+    "∑": " the sum of ", "∫": " the integral of ", "∂": " partial ", "∈": " in ", "∴": " therefore ",
+}
+_UNITS = [
+    (re.compile(r"\bm\s*/\s*s(?:\^2|²)"), "metres per second squared"),
+    (re.compile(r"\bm\s*/\s*s\b"), "metres per second"),
+    (re.compile(r"\bkm\s*/\s*h(?:r)?\b"), "kilometres per hour"),
+    (re.compile(r"\bkg\s*/\s*m(?:\^3|³)"), "kilograms per cubic metre"),
+    (re.compile(r"\bg\s*/\s*cm(?:\^3|³)"), "grams per cubic centimetre"),
+]
+_SLASH = re.compile(r"([\w)\]]+)\s*/\s*([\w(\[]+)")
+_DATE = re.compile(r"\b\d{1,2}/\d{1,2}/\d{2,4}\b")
+# Read before the range and minus rules, which would make "2024-01-15" "2024 to 01 minus 15"
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_MONTHS = ("January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+           "November", "December")
+_LEFTOVER = re.compile(r"[*#_`|~<>\\]")
+_SPACES = re.compile(r"[ \t]+")
+_SPACE_BEFORE_PUNCTUATION = re.compile(r"\s+([,.;:!?)])")
+
+
+def resolve_mode(mode=None):
+    """`mode`, or SPEECH_TEXT_MODE if it's empty; raises ValueError for unknown modes"""
+    resolved = (mode or os.getenv("SPEECH_TEXT_MODE", "llm")).strip().lower()
+    if resolved not in MODES:
+        raise ValueError(f"Unknown speech mode {resolved!r}; use one of {', '.join(MODES)}")
+    return resolved
+
+
+def _slash(match):
+    left, right = match.group(1), match.group(2)
+    # Fractions and rates of numbers and variables are read "over"; between words a slash means "or"
+    if len(left.strip("()[]")) > 1 and len(right.strip("()[]")) > 1 and left.isalpha() and right.isalpha():
+        return f"{left} or {right}"
+    return f"{left} over {right}"
+
+
+def _iso_date(match):
+    year, month, day = (int(part) for part in match.groups())
+    if not (1 <= month <= 12 and 1 <= day <= 31):
+        return match.group()
+    return f"{day} {_MONTHS[month - 1]} {year}"
+
+
+def speak_inline(text):
+    """One line of Markdown with emphasis, links and maths turned into words"""
+    text = _IMAGE.sub(r"\1", text)
+    text = _LINK.sub(r"\1", text)
+    text = _URL.sub("", text)
+    text = _CODE.sub(r"\1", text)
+    text = _BOLD.sub(r"\2", text)
+    text = _ITALIC.sub(r"\2", text)
+    for pattern, replacement in _ABBREVIATIONS:
+        text = pattern.sub(replacement, text)
+    text = "".join(_SYMBOLS.get(c, c) for c in text)
+    for pattern, replacement in _UNITS:
+        text = pattern.sub(replacement, text)
+    if not _DATE.search(text):
+        text = _SLASH.sub(_slash, text)
+    text = _ISO_DATE.sub(_iso_date, text)
+    for pattern, replacement in _MATHS:
+        text = pattern.sub(replacement, text)
+    # Emoji and other pictographs aren't read well
+    text = "".join(c for c in text if unicodedata.category(c) != "So")
+    text = _LEFTOVER.sub(" ", text)
+    text = _SPACES.sub(" ", text).strip()
+    return _SPACE_BEFORE_PUNCTUATION.sub(r"\1", text)
+
+
+def _sentence(text):
+    text = text.strip(" :;,")
+    if not text:
+        return ""
+    text = text[0].upper() + text[1:]
+    return text if text[-1] in ".!?" else text + "."
+
+
+def markdown_to_speech(markdown):
+    """Spoken version of a Markdown summary (see the module docstring)"""
+    sentences = []
+    paragraph = []
+    sections = 0
+    titled = False
+
+    def flush():
+        if paragraph:
+            sentences.append(_sentence(" ".join(paragraph)))
+            paragraph.clear()
+
+    for line in markdown.splitlines():
+        stripped = line.strip().lstrip(">").strip()
+        if not stripped or _RULE.match(stripped) or _TABLE_SEPARATOR.match(stripped):
+            flush()
+            continue
+        heading = _HEADING.match(stripped)
+        if heading:
+            flush()
+            level, text = len(heading.group(1)), speak_inline(heading.group(2)).rstrip(".:")
+            if not text:
+                continue
+            if level == 1 and not titled:
+                sentences.append(f"Here is the summary of {text}.")
+                titled = True
+            elif level <= 2:
+                text = _SECTION_PREFIX.sub("", text) or text
+                lead = text if text[:2].isupper() else text[0].lower() + text[1:]
+                sentences.append(f"Let's start with {lead}." if sections == 0 else f"Next, {lead}.")
+                sections += 1
+            else:
+                sentences.append(_sentence(text))
+            continue
+        if stripped.startswith("|"):
+            flush()
+            cells = [speak_inline(cell) for cell in stripped.strip("|").split("|")]
+            sentences.append(_sentence(", ".join(cell for cell in cells if cell)))
+            continue
+        bullet = _BULLET.match(stripped)
+        if bullet:
+            flush()
+            sentences.append(_sentence(speak_inline(stripped[bullet.end():])))
+            continue
+        paragraph.append(speak_inline(stripped))
+    flush()
+    return "\n".join(sentence for sentence in sentences if sentence)
@@ -0,0 +1,191 @@
+"""
+Structured, non-blocking logging for the backend.
+
+Records are handed to a bounded in-memory queue and written to stderr by a
+background listener thread, so a slow pipe or container log driver never
+stalls a request. DEBUG/INFO records can be sampled, and large text previews
+are wrapped in `Preview` so they are only sliced when the record is emitted.
+
+Environment:
+    LOG_LEVEL        minimum level (default INFO)
+    LOG_FORMAT       "json" (default) or "text"
+    LOG_SAMPLE_RATE  fraction of DEBUG/INFO records kept (default 1.0)
+    LOG_QUEUE_SIZE   max queued records before new ones are dropped (default 10000)
+    LOG_PREVIEW_CHARS  characters shown by Preview (default 200)
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_PREVIEW_CHARS = int(os.getenv("LOG_PREVIEW_CHARS", "200"))
+
+# Keyword arguments that belong to logging itself rather than to the record's fields
+_LOGGING_KWARGS = {"exc_info", "stack_info", "stacklevel", "extra"}
+
+_configure_lock = threading.Lock()
+_listener = None
+
+
+class Preview:
+    """Lazy preview of a (possibly huge) string, sliced only when formatted"""
+    __slots__ = ("text", "limit")
+
+    def __init__(self, text, limit=None):
+        self.text = text
+        self.limit = limit or LOG_PREVIEW_CHARS
+
+    def __str__(self):
+        if not self.text:
+            return "None"
+        if len(self.text) <= self.limit:
+            return self.text
+        return self.text[:self.limit] + "..."
+
+    __repr__ = __str__
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of low-severity records; WARNING and above always pass"""
+
+    def __init__(self, rate=1.0, max_level=logging.INFO):
+        super().__init__()
+        self.rate = rate
+        self.max_level = max_level
+
+    def filter(self, record):
+        if self.rate >= 1.0 or record.levelno > self.max_level:
+            return True
+        return random.random() < self.rate
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message and fields"""
+
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            payload.update(fields)
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable single line with key=value fields appended"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking or raising when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Only merge msg % args here; structured fields are rendered by the
+        # listener thread so previews are never formatted on the request path.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """Logger adapter that turns extra keyword arguments into structured fields"""
+
+    def process(self, msg, kwargs):
+        fields = {key: kwargs.pop(key) for key in list(kwargs) if key not in _LOGGING_KWARGS}
+        if fields:
+            extra = dict(kwargs.get("extra") or {})
+            extra["fields"] = fields
+            kwargs["extra"] = extra
+        return msg, kwargs
+
+
+def configure_logging():
+    """Install the queue handler on the 'backend' logger (idempotent)"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        stream_handler = logging.StreamHandler(sys.stderr)
+        stream_handler.setFormatter(JSONFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+        queue_handler = DroppingQueueHandler(log_queue)
+        queue_handler.addFilter(SamplingFilter(LOG_SAMPLE_RATE))
+
+        root = logging.getLogger("backend")
+        root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+        for handler in list(root.handlers):
+            if isinstance(handler, DroppingQueueHandler):
+                root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    with _configure_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+
+
+def _restart_after_fork():
+    """The listener thread doesn't survive fork(); give the child its own"""
+    global _configure_lock, _listener
+    _configure_lock = threading.Lock()
+    if _listener is not None:
+        _listener = None
+        configure_logging()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def get_logger(name):
+    """Return a structured logger under the 'backend' namespace"""
+    configure_logging()
+    if not name.startswith("backend"):
+        name = f"backend.{name}"
+    return StructuredLogger(logging.getLogger(name), {})
@@ -0,0 +1,26 @@
+from backend.answer_cache import AnswerCache
+
+NOTES = "The French Revolution began in 1789. Britain and France were at war from 1793 to 1802."
+
+
+def _cache():
+    return AnswerCache(threshold=0.9, size=16, max_notes=4, ttl=3600)
+
+
+def test_paraphrase_hits():
+    cache = _cache()
+    cache.store(NOTES, "What is the difference between mitosis and meiosis?", "Mitosis makes ...", 1.0)
+    assert cache.lookup(NOTES, "Explain the difference between mitosis and meiosis") is not None
+
+
+def test_different_interrogative_misses():
+    cache = _cache()
+    cache.store(NOTES, "When did the French Revolution start?", "In 1789.", 1.0)
+    assert cache.lookup(NOTES, "Why did the French Revolution start?") is None
+    assert cache.lookup(NOTES, "When did the French Revolution start") is not None
+
+
+def test_reordered_words_miss():
+    cache = _cache()
+    cache.store(NOTES, "Did Britain declare war on France?", "Yes, in 1793.", 1.0)
+    assert cache.lookup(NOTES, "Did France declare war on Britain?") is None
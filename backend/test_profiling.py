@@ -0,0 +1,16 @@
+from backend import profiling
+
+
+def test_missing_header_is_not_admin(monkeypatch):
+    monkeypatch.setenv("PROFILE_TOKEN", "secret")
+    assert not profiling.is_admin(None)
+    assert not profiling.is_admin("")
+    assert not profiling.can_read_profiles(None, "203.0.113.5")
+    assert not profiling.can_read_profiles(None, "127.0.0.1")
+    assert profiling.can_read_profiles("secret", "203.0.113.5")
+
+
+def test_header_ignored_without_token(monkeypatch):
+    monkeypatch.delenv("PROFILE_TOKEN", raising=False)
+    assert not profiling.is_admin("secret")
+    assert profiling.can_read_profiles(None, "127.0.0.1")
@@ -0,0 +1,280 @@
+"""
+Token budgeting for the text interpolated into Gemini prompts.
+
+Every prompt helper in main.py passes user text through `fit(text, endpoint)`
+before building its prompt. Text over the endpoint's input budget is
+compressed locally instead of being sent and rejected upstream:
+
+1. drop boilerplate lines (page numbers, URLs, e-mail/phone contact lines,
+   copyright notices) and lines OCR picked up more than once (running
+   headers/footers, overlapping scans). A number only counts as a phone
+   number with a cue (a label, a leading + or phone-style grouping), and a
+   line holding just a number only counts as a page number when several
+   such lines stand alone between text, so numeric tables and value lists
+   are kept,
+2. collapse runs of blank lines and spaces,
+3. if still over budget, cut whole lines from the middle, keeping the start
+   and the end of the document.
+
+The estimate is a fast character-based heuristic. Near the budget boundary it
+is checked against Gemini's count_tokens API (when a key is configured), and
+the ratio between the two calibrates later estimates.
+
+Inside a `collect()` block each `fit()` appends a report of what it trimmed;
+the endpoints return `summarize(reports)` as `token_budget`.
+
+Environment:
+    TOKEN_BUDGETS         per-endpoint input budgets in tokens,
+                          e.g. "correct_ocr=16000,summary=24000,notebot=24000"
+    TOKEN_COUNT_VERIFY    set to 0 to never call count_tokens (default 1)
+"""
+import contextvars
+import math
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+from . import metrics
+from .structured_log import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_BUDGETS = {"correct_ocr": 16000, "summary": 24000, "notebot": 24000, "speech": 16000}
+# Estimates within this fraction of the budget are checked with count_tokens
+VERIFY_BAND = 0.25
+# Repeated lines shorter than this are only dropped if they occur this many times
+DEDUPE_MIN_CHARS = 20
+DEDUPE_MIN_REPEATS = 3
+
+# Bare page numbers are only dropped when at least this many stand alone between text lines
+PAGE_NUMBER_MIN_REPEATS = 3
+
+_PAGE_LABEL = re.compile(r"^(?:(page|pg\.?|p\.)\s*\d{1,4}(\s*(of|/)\s*\d{1,4})?|\d{1,4}\s+of\s+\d{1,4})$", re.IGNORECASE)
+_BARE_NUMBER = re.compile(r"^\d{1,4}$")
+# Lines of numbers and separators only: table rows, value lists
+_NUMERIC_LINE = re.compile(r"^[\d\s.,;:%()+/*=x-]+$")
+_URL = re.compile(r"(https?://|www\.)\S+", re.IGNORECASE)
+_EMAIL = re.compile(r"\b[\w.+-]+@[\w-]+\.[\w.-]+\b")
+_PHONE = re.compile(r"(\+?\d[\d\s().-]{7,}\d)")
+# What tells a phone number from other long numbers: a label, a leading +, or phone-style grouping
+_PHONE_CUE = re.compile(r"\b(tel|phone|ph|mobile|mob|fax|call|helpline|office)\b|^\s*\+", re.IGNORECASE)
+_PHONE_GROUPED = re.compile(r"\(\d{2,5}\)\s?\d{3,4}[\s.-]?\d{3,4}|\b\d{3}([.-])\d{3}\1\d{4}\b")
+_COPYRIGHT = re.compile(r"(©|\(c\)|copyright\b|all rights reserved)", re.IGNORECASE)
+_SPACES = re.compile(r"[ \t]{2,}")
+_CONTACT_LINE_MAX = 100
+# Lines longer than this are split before truncating, so unbroken PDF text can be cut too
+_TRUNCATE_LINE_CHARS = 2000
+
+_lock = threading.Lock()
+_ratio = 1.0
+_reports = contextvars.ContextVar("token_budget_reports", default=None)
+
+trimmed_tokens_total = metrics.counter(
+    "token_budget_trimmed_tokens_total", "Estimated prompt tokens removed to fit input budgets"
+)
+compressed_total = metrics.counter(
+    "token_budget_compressed_total", "Prompt inputs that were over budget and compressed"
+)
+
+
+def _parse_budgets(value):
+    budgets = dict(DEFAULT_BUDGETS)
+    for item in (value or "").split(","):
+        if "=" in item:
+            name, number = item.split("=", 1)
+            budgets[name.strip()] = int(number)
+    return budgets
+
+
+BUDGETS = _parse_budgets(os.getenv("TOKEN_BUDGETS"))
+
+
+def budget_for(endpoint):
+    return BUDGETS.get(endpoint, max(BUDGETS.values()))
+
+
+def _raw_estimate(text):
+    # About 4 characters per token for ASCII; non-ASCII scripts tokenize much denser
+    extra_bytes = len(text.encode("utf-8")) - len(text)
+    return len(text) / 4 + extra_bytes / 3
+
+
+def estimate_tokens(text):
+    """Fast local token estimate, scaled by the count_tokens calibration"""
+    if not text:
+        return 0
+    return int(math.ceil(_raw_estimate(text) * _ratio))
+
+
+def _verify(text, estimate, budget):
+    """Replace an estimate close to the budget with the model's own count"""
+    global _ratio
+    if os.getenv("TOKEN_COUNT_VERIFY", "1") == "0" or abs(estimate - budget) > budget * VERIFY_BAND:
+        return estimate
+    from .ai_clients import count_tokens, gemini_configured
+    if not gemini_configured():
+        return estimate
+    try:
+        actual = count_tokens(text)
+    except Exception as e:
+        log.warning("count_tokens failed, using the local estimate", error=str(e))
+        return estimate
+    raw = _raw_estimate(text)
+    if raw > 0 and actual > 0:
+        with _lock:
+            _ratio = min(3.0, max(0.5, 0.8 * _ratio + 0.2 * (actual / raw)))
+        log.debug("Token estimate calibrated", estimate=estimate, actual=actual, ratio=round(_ratio, 3))
+    return actual
+
+
+def _is_phone_line(line):
+    return bool(_PHONE.search(line) and (_PHONE_CUE.search(line) or _PHONE_GROUPED.search(line)))
+
+
+def _is_boilerplate(line):
+    if _PAGE_LABEL.match(line) or _COPYRIGHT.search(line):
+        return True
+    if _URL.fullmatch(line):
+        return True
+    return len(line) <= _CONTACT_LINE_MAX and bool(_EMAIL.search(line) or _is_phone_line(line))
+
+
+def _running_page_numbers(keys):
+    """Indexes of bare-number lines that look like page headers/footers: standing alone between text, repeatedly"""
+    filled = [index for index, key in enumerate(keys) if key]
+    alone = []
+    for position, index in enumerate(filled):
+        if not _BARE_NUMBER.match(keys[index]):
+            continue
+        neighbours = [keys[filled[p]] for p in (position - 1, position + 1) if 0 <= p < len(filled)]
+        # Next to other numbers it is part of a table or a list of values
+        if not any(_NUMERIC_LINE.match(neighbour) for neighbour in neighbours):
+            alone.append(index)
+    return set(alone) if len(alone) >= PAGE_NUMBER_MIN_REPEATS else set()
+
+
+def _normalize(line):
+    return _SPACES.sub(" ", line.strip()).lower()
+
+
+def strip_boilerplate_and_duplicates(text):
+    """Drop boilerplate lines and repeated OCR lines, keeping the first occurrence"""
+    lines = text.splitlines()
+    keys = [_normalize(line) for line in lines]
+    counts = {}
+    for key in keys:
+        counts[key] = counts.get(key, 0) + 1
+    page_numbers = _running_page_numbers(keys)
+    kept, seen = [], set()
+    for index, (line, key) in enumerate(zip(lines, keys)):
+        if not key:
+            kept.append("")
+            continue
+        if index in page_numbers or _is_boilerplate(key):
+            continue
+        # Short numeric lines repeat in tables and value lists; only long ones are OCR duplicates
+        short_repeat = counts[key] >= DEDUPE_MIN_REPEATS and not _NUMERIC_LINE.match(key)
+        if key in seen and (len(key) >= DEDUPE_MIN_CHARS or short_repeat):
+            continue
+        seen.add(key)
+        kept.append(_URL.sub("", line).rstrip())
+    return "\n".join(kept)
+
+
+def collapse_whitespace(text):
+    text = _SPACES.sub(" ", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def _split_long_lines(text):
+    lines = []
+    for line in text.splitlines():
+        while len(line) > _TRUNCATE_LINE_CHARS:
+            cut = line.rfind(" ", 0, _TRUNCATE_LINE_CHARS)
+            cut = cut if cut > 0 else _TRUNCATE_LINE_CHARS
+            lines.append(line[:cut])
+            line = line[cut:].lstrip()
+        lines.append(line)
+    return lines
+
+
+def truncate_middle(text, budget):
+    """Cut whole lines from the middle so the estimate fits `budget`"""
+    lines = _split_long_lines(text)
+    head_budget = budget * 0.8
+    head, tail = [], []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line + "\n")
+        if used + cost > head_budget:
+            break
+        head.append(line)
+        used += cost
+    for line in reversed(lines[len(head):]):
+        cost = estimate_tokens(line + "\n")
+        if used + cost > budget:
+            break
+        tail.append(line)
+        used += cost
+    tail.reverse()
+    omitted = len(lines) - len(head) - len(tail)
+    if omitted <= 0:
+        return text
+    return "\n".join(head + [f"[... {omitted} lines omitted to fit the input limit ...]"] + tail)
+
+
+def fit(text, endpoint):
+    """Return `text` compressed to the endpoint's input budget, and a report of what was trimmed"""
+    budget = budget_for(endpoint)
+    original = estimate_tokens(text)
+    original = _verify(text, original, budget)
+    report = {
+        "endpoint": endpoint,
+        "budget": budget,
+        "original_tokens": original,
+        "final_tokens": original,
+        "trimmed_tokens": 0,
+        "steps": [],
+    }
+    if original > budget:
+        compressed_total.inc(endpoint=endpoint)
+        tokens = original
+        for step, compress in (
+            ("strip_boilerplate_and_duplicates", strip_boilerplate_and_duplicates),
+            ("collapse_whitespace", collapse_whitespace),
+            ("truncate", lambda value: truncate_middle(value, budget)),
+        ):
+            if tokens <= budget:
+                break
+            text = compress(text)
+            after = estimate_tokens(text)
+            report["steps"].append({"step": step, "trimmed_tokens": max(0, tokens - after)})
+            tokens = after
+        report["final_tokens"] = tokens
+        report["trimmed_tokens"] = max(0, original - tokens)
+        trimmed_tokens_total.inc(report["trimmed_tokens"], endpoint=endpoint)
+        log.info("Prompt input compressed to fit budget", endpoint=endpoint, budget=budget,
+                 original_tokens=original, final_tokens=tokens)
+    reports = _reports.get()
+    if reports is not None:
+        reports.append(report)
+    return text, report
+
+
+@contextmanager
+def collect():
+    """Collect the reports of every fit() in the enclosed block"""
+    reports = []
+    token = _reports.set(reports)
+    try:
+        yield reports
+    finally:
+        _reports.reset(token)
+
+
+def summarize(reports):
+    return {
+        "trimmed_tokens": sum(report["trimmed_tokens"] for report in reports),
+        "inputs": reports,
+    }
@@ -0,0 +1,274 @@
+"""
+Upload sessions: multi-page documents OCR'd page by page as they arrive.
+
+A client opens a session, uploads its pages (in parallel, in any order, each
+with its page index), then marks the session complete. OCR of a page starts
+as soon as it is received, on a pool of UPLOAD_OCR_WORKERS threads, so an
+N-page upload takes about as long as its slowest page rather than the sum.
+Once the session is complete and every page has finished, the session status
+carries the pages' text joined in page order; `GET /sessions/{id}?wait=30`
+long-polls for that moment.
+
+Sessions and page results are kept in SQLite, so any worker process can
+answer for a session whose pages were OCR'd by another. A page whose worker
+died is reported as failed after UPLOAD_PAGE_TIMEOUT. Pages with no text
+(page_analysis.BlankPage: blank backs, dividers) are reported as skipped and
+don't make the session partial.
+
+Environment:
+    UPLOAD_DB_PATH        SQLite file (default backend/data/uploads.sqlite3)
+    UPLOAD_OCR_WORKERS    pages OCR'd concurrently per process (default 8)
+    UPLOAD_SESSION_TTL    seconds a session is kept after its last change (default 3600)
+    UPLOAD_PAGE_TIMEOUT   seconds before a page still being OCR'd is given up (default 300)
+    UPLOAD_MAX_PAGES      pages per session (default 200)
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from . import metrics
+from .jobs import _Closing
+from .page_analysis import BlankPage
+from .structured_log import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "uploads.sqlite3")
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"    # no text on the page, not sent to OCR
+
+# Session states reported to clients
+RECEIVING = "receiving"      # more pages may come
+PROCESSING = "processing"    # complete, pages still being OCR'd
+COMPLETE = "complete"        # every page has text
+PARTIAL = "partial"          # finished, but some pages failed
+
+page_seconds = metrics.histogram("upload_page_ocr_seconds", "OCR time of pages uploaded to sessions")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    id TEXT PRIMARY KEY,
+    expected_pages INTEGER,
+    completed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS upload_pages (
+    session_id TEXT NOT NULL,
+    page_index INTEGER NOT NULL,
+    attempt TEXT NOT NULL,
+    filename TEXT,
+    status TEXT NOT NULL,
+    text TEXT,
+    error TEXT,
+    seconds REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (session_id, page_index)
+);
+"""
+
+
+class SessionNotFound(Exception):
+    pass
+
+
+class SessionClosed(Exception):
+    pass
+
+
+class UploadStore:
+    """Data-access layer over the session and page tables"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return _Closing(conn)
+
+    def create(self, session_id, expected_pages, now, ttl):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO upload_sessions (id, expected_pages, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (session_id, expected_pages, now, now),
+            )
+            expired = [row[0] for row in conn.execute("SELECT id FROM upload_sessions WHERE updated_at < ?", (now - ttl,))]
+            for expired_id in expired:
+                conn.execute("DELETE FROM upload_pages WHERE session_id = ?", (expired_id,))
+                conn.execute("DELETE FROM upload_sessions WHERE id = ?", (expired_id,))
+
+    def add_page(self, session_id, page_index, filename, max_pages, now):
+        """Register a page (replacing an earlier upload of the same index); returns (index, attempt)"""
+        attempt = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                session = conn.execute("SELECT completed FROM upload_sessions WHERE id = ?", (session_id,)).fetchone()
+                if session is None:
+                    raise SessionNotFound(session_id)
+                if session["completed"]:
+                    raise SessionClosed(session_id)
+                if page_index is None:
+                    page_index = conn.execute(
+                        "SELECT COALESCE(MAX(page_index) + 1, 0) FROM upload_pages WHERE session_id = ?", (session_id,)
+                    ).fetchone()[0]
+                count = conn.execute(
+                    "SELECT COUNT(*) FROM upload_pages WHERE session_id = ? AND page_index != ?", (session_id, page_index)
+                ).fetchone()[0]
+                if count >= max_pages:
+                    raise ValueError(f"A session holds at most {max_pages} pages")
+                conn.execute(
+                    "INSERT OR REPLACE INTO upload_pages (session_id, page_index, attempt, filename, status, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (session_id, page_index, attempt, filename, PENDING, now),
+                )
+                conn.execute("UPDATE upload_sessions SET updated_at = ? WHERE id = ?", (now, session_id))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return page_index, attempt
+
+    def finish_page(self, session_id, page_index, attempt, status, text, error, seconds, now):
+        # Ignored if the page was re-uploaded in the meantime
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE upload_pages SET status = ?, text = ?, error = ?, seconds = ?, updated_at = ? "
+                "WHERE session_id = ? AND page_index = ? AND attempt = ?",
+                (status, text, error, seconds, now, session_id, page_index, attempt),
+            )
+
+    def complete(self, session_id, expected_pages, now):
+        with self._connect() as conn:
+            updated = conn.execute(
+                "UPDATE upload_sessions SET completed = 1, expected_pages = COALESCE(?, expected_pages), updated_at = ? "
+                "WHERE id = ?",
+                (expected_pages, now, session_id),
+            ).rowcount
+        if not updated:
+            raise SessionNotFound(session_id)
+
+    def get(self, session_id):
+        with self._connect() as conn:
+            session = conn.execute("SELECT * FROM upload_sessions WHERE id = ?", (session_id,)).fetchone()
+            if session is None:
+                raise SessionNotFound(session_id)
+            pages = conn.execute(
+                "SELECT page_index, filename, status, text, error, seconds, updated_at FROM upload_pages "
+                "WHERE session_id = ? ORDER BY page_index", (session_id,)
+            ).fetchall()
+        return dict(session), [dict(page) for page in pages]
+
+
+class UploadSessionManager:
+    """Runs page OCR in a thread pool and assembles session results; `extract(contents, filename)` returns text"""
+
+    def __init__(self, extract, db_path=None, workers=None):
+        self.extract = extract
+        self.db_path = db_path or os.getenv("UPLOAD_DB_PATH", DEFAULT_DB_PATH)
+        self.workers = workers or int(os.getenv("UPLOAD_OCR_WORKERS", "8"))
+        self.ttl = float(os.getenv("UPLOAD_SESSION_TTL", "3600"))
+        self.page_timeout = float(os.getenv("UPLOAD_PAGE_TIMEOUT", "300"))
+        self.max_pages = int(os.getenv("UPLOAD_MAX_PAGES", "200"))
+        self.store = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self.store = UploadStore(self.db_path)
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="upload-ocr")
+
+    def stop(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def create(self, expected_pages=None):
+        self.start()
+        session_id = uuid.uuid4().hex
+        self.store.create(session_id, expected_pages, time.time(), self.ttl)
+        return self.status(session_id)
+
+    def add_page(self, session_id, contents, filename=None, page_index=None):
+        """Register a page and start its OCR in the background"""
+        self.start()
+        page_index, attempt = self.store.add_page(session_id, page_index, filename, self.max_pages, time.time())
+        self._executor.submit(self._ocr_page, session_id, page_index, attempt, contents, filename)
+        return {"session_id": session_id, "page_index": page_index, "status": PENDING}
+
+    def _ocr_page(self, session_id, page_index, attempt, contents, filename):
+        started = time.perf_counter()
+        try:
+            text = self.extract(contents, filename)
+            status, error = DONE, None
+        except BlankPage as e:
+            text, status, error = None, SKIPPED, str(e)
+            log.info("Upload page skipped", session_id=session_id, page_index=page_index, reason=e.analysis["reason"])
+        except Exception as e:
+            text, status, error = None, FAILED, str(e)
+            log.warning("Upload page OCR failed", session_id=session_id, page_index=page_index, error=error)
+        seconds = time.perf_counter() - started
+        page_seconds.observe(seconds)
+        self.store.finish_page(session_id, page_index, attempt, status, text, error, round(seconds, 3), time.time())
+
+    def complete(self, session_id, expected_pages=None):
+        """No more pages will be added"""
+        self.start()
+        self.store.complete(session_id, expected_pages, time.time())
+        return self.status(session_id)
+
+    def status(self, session_id):
+        self.start()
+        session, pages = self.store.get(session_id)
+        now = time.time()
+        for page in pages:
+            if page["status"] == PENDING and now - page["updated_at"] > self.page_timeout:
+                page["status"], page["error"] = FAILED, "OCR did not finish in time"
+        finished = all(page["status"] != PENDING for page in pages)
+        expected = session["expected_pages"]
+        all_received = bool(session["completed"]) or (expected is not None and len(pages) >= expected)
+        if not all_received:
+            state = RECEIVING
+        elif not finished:
+            state = PROCESSING
+        elif any(page["status"] == FAILED for page in pages):
+            state = PARTIAL
+        else:
+            state = COMPLETE
+        status = {
+            "session_id": session_id,
+            "status": state,
+            "expected_pages": expected,
+            "pages_received": len(pages),
+            "pages_done": sum(page["status"] == DONE for page in pages),
+            "pages_skipped": sum(page["status"] == SKIPPED for page in pages),
+            "pages": [
+                {
+                    "page_index": page["page_index"],
+                    "filename": page["filename"],
+                    "status": page["status"],
+                    "error": page["error"],
+                    "seconds": page["seconds"],
+                }
+                for page in pages
+            ],
+        }
+        if state in (COMPLETE, PARTIAL):
+            status["text"] = "\n\n".join(page["text"].strip() for page in pages if page["status"] == DONE and page["text"])
+        return status
@@ -90,8 +90,33 @@ export function useOCR() {
     }
   };
 
+  const extractTextFromPages = async (files: File[]): Promise<string | null> => {
+    setIsLoading(true);
+    setError(null);
+
+    try {
+      const session = await backendAPI.extractTextFromPages(files);
+      const failed = session.pages.filter((page) => page.status === 'failed');
+      if (failed.length) {
+        console.warn("⚠️ Pages without text:", failed.map((page) => `${page.filename}: ${page.error}`))
+      }
+      if (!session.text) {
+        setError(failed[0]?.error || 'OCR extraction failed');
+        return null;
+      }
+      return session.text;
+    } catch (err) {
+      const errorMessage = err instanceof Error ? err.message : 'Unknown error occurred';
+      setError(errorMessage);
+      return null;
+    } finally {
+      setIsLoading(false);
+    }
+  };
+
   return {
     extractText,
+    extractTextFromPages,
     isLoading,
     error,
     clearError: () => setError(null),
@@ -202,12 +227,12 @@ export function useSummaryEnhancement() {
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
-  const enhanceSummary = async (text: string): Promise<EnhanceSummaryResponse | null> => {
+  const enhanceSummary = async (text: string, documentId?: string): Promise<EnhanceSummaryResponse | null> => {
     setIsLoading(true);
     setError(null);
     
     try {
-      const response = await backendAPI.enhanceSummary(text);
+      const response = await backendAPI.enhanceSummary(text, documentId);
       return response;
     } catch (err) {
       const errorMessage = err instanceof Error ? err.message : 'An unknown error occurred';
@@ -9,16 +9,33 @@ export interface ChatRequest {
   context?: string;
 }
 
+export interface TokenBudgetReport {
+  trimmed_tokens: number;
+  inputs: {
+    endpoint: string;
+    budget: number;
+    original_tokens: number;
+    final_tokens: number;
+    trimmed_tokens: number;
+    steps: { step: string; trimmed_tokens: number }[];
+  }[];
+}
+
 export interface ChatResponse {
   response: string;
   success: boolean;
   error?: string;
+  token_budget?: TokenBudgetReport;
+  // NoteBot only: whether the answer came from the answer cache
+  cache?: { hit: boolean; similarity?: number; saved_ms?: number };
 }
 
 export interface OCRResponse {
   extracted_text: string;
   success: boolean;
   error?: string;
+  // Pages found to have no text and not sent to OCR
+  skipped_pages?: number;
 }
 
 export interface HealthResponse {
@@ -32,8 +49,12 @@ export interface NotebotChatRequest {
   notes_context: string;
 }
 
+// 'local' converts the Markdown with rules (fast, no Gemini call), 'llm' rewrites it with Gemini
+export type SpeechMode = 'local' | 'llm';
+
 export interface AudioRequest {
   text: string;
+  mode?: SpeechMode;
 }
 
 export interface AudioResponse {
@@ -42,13 +63,101 @@ export interface AudioResponse {
   error?: string;
 }
 
+export interface IncrementalSummaryReport {
+  document_id: string;
+  chunks: number;
+  reused: number;
+  processed: number;
+  removed: number;
+}
+
 export interface EnhanceSummaryResponse {
   corrected_text: string;
   structured_summary: string;
+  token_budget?: TokenBudgetReport;
+  incremental?: IncrementalSummaryReport;
+  // Set when the summary was prefetched speculatively after OCR
+  prefetch?: 'completed' | 'inflight';
   success: boolean;
   error?: string;
 }
 
+export type JobKind = 'enhance-summary' | 'ocr-pdf-report' | 'text-to-speech';
+
+export interface JobStatus {
+  job_id: string;
+  kind: JobKind;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  stage: string | null;
+  progress: number;
+  error: string | null;
+  created_at: number;
+  updated_at: number;
+  expires_at: number | null;
+  deduplicated?: boolean;
+}
+
+export interface UploadSessionPage {
+  page_index: number;
+  filename: string | null;
+  status: 'pending' | 'done' | 'failed' | 'skipped';
+  error: string | null;
+  seconds: number | null;
+}
+
+export interface UploadSessionStatus {
+  session_id: string;
+  status: 'receiving' | 'processing' | 'complete' | 'partial';
+  expected_pages: number | null;
+  pages_received: number;
+  pages_done: number;
+  // Blank pages (no text detected), not sent to OCR
+  pages_skipped: number;
+  pages: UploadSessionPage[];
+  // Pages' text in page order, once every page has finished
+  text?: string;
+}
+
+export interface ArtifactInfo {
+  artifact_id: string;
+  url: string;
+  media_type: string;
+  size_bytes: number;
+  expires_at: number;
+}
+
+// Most central sentences of the text, shown until the structured summary arrives
+export interface PreviewEvent {
+  stage: 'preview';
+  preview_summary: string;
+  sentences: number;
+}
+
+// One line of the /notebot/process stream
+export type ProcessEvent =
+  | { stage: 'ocr'; extracted_text: string }
+  | PreviewEvent
+  | { stage: 'correct'; corrected_text: string }
+  | { stage: 'summary'; structured_summary: string; token_budget?: TokenBudgetReport }
+  | ({ stage: 'pdf' | 'audio' } & (ArtifactInfo | { error: string }))
+  | { stage: 'done'; elapsed_ms: number }
+  | { stage: 'error'; error: string; retry_after?: number };
+
+// One line of the streamed /enhance-summary response
+export type SummaryEvent =
+  | PreviewEvent
+  | ({ stage: 'summary' } & EnhanceSummaryResponse)
+  | { stage: 'done'; elapsed_ms: number }
+  | { stage: 'error'; error: string; retry_after?: number };
+
+export interface ProcessOptions {
+  pdf?: boolean;
+  audio?: boolean;
+  title?: string;
+  documentId?: string;
+  speechMode?: SpeechMode;
+}
+
 class BackendAPI {
   private baseUrl: string;
 
@@ -262,9 +371,10 @@ class BackendAPI {
   }
 
   /**
-   * Enhance summary with proper structure and formatting
+   * Enhance summary with proper structure and formatting.
+   * With a documentId, parts of the text already summarized for that document are reused.
    */
-  async enhanceSummary(text: string): Promise<EnhanceSummaryResponse> {
+  async enhanceSummary(text: string, documentId?: string): Promise<EnhanceSummaryResponse> {
     console.log("✨ Enhancing summary for text length:", text.length);
     
     const response = await fetch(`${this.baseUrl}/enhance-summary`, {
@@ -272,7 +382,7 @@ class BackendAPI {
       headers: {
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify({ text }),
+      body: JSON.stringify(documentId ? { text, document_id: documentId } : { text }),
     });
 
     if (!response.ok) {
@@ -283,6 +393,194 @@ class BackendAPI {
     console.log("✨ Enhanced summary response:", data);
     return data;
   }
+
+  /**
+   * Enhance summary, streamed: onEvent gets an extractive preview within milliseconds,
+   * then the structured summary that replaces it. Resolves with all events.
+   */
+  async enhanceSummaryStream(text: string, documentId?: string, onEvent?: (event: SummaryEvent) => void): Promise<SummaryEvent[]> {
+    const response = await fetch(`${this.baseUrl}/enhance-summary`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(documentId ? { text, document_id: documentId, stream: true } : { text, stream: true }),
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Summary enhancement failed: ${response.statusText}`);
+    }
+    return this.readEvents<SummaryEvent>(response.body, onEvent);
+  }
+
+  /**
+   * Submit a long-running pipeline as a background job.
+   * `/jobs/ocr/pdf-report` takes form data; the other kinds take JSON.
+   */
+  async submitJob(path: 'enhance-summary' | 'ocr/pdf-report' | 'text-to-speech', body: FormData | object): Promise<JobStatus> {
+    const isForm = body instanceof FormData;
+    const response = await fetch(`${this.baseUrl}/jobs/${path}`, {
+      method: 'POST',
+      headers: isForm ? undefined : { 'Content-Type': 'application/json' },
+      body: isForm ? body : JSON.stringify(body),
+    });
+
+    if (!response.ok) {
+      throw new Error(`Job submission failed: ${response.statusText}`);
+    }
+    return await response.json();
+  }
+
+  /**
+   * Get the status and current stage of a background job
+   */
+  async getJobStatus(jobId: string): Promise<JobStatus> {
+    const response = await fetch(`${this.baseUrl}/jobs/${jobId}`);
+    if (!response.ok) {
+      throw new Error(`Job status failed: ${response.statusText}`);
+    }
+    return await response.json();
+  }
+
+  /**
+   * Poll a job until it finishes and return its raw result response
+   */
+  async waitForJobResult(jobId: string, pollIntervalMs: number = 1000): Promise<Response> {
+    while (true) {
+      const response = await fetch(`${this.baseUrl}/jobs/${jobId}/result`);
+      if (response.status !== 202) {
+        if (!response.ok) {
+          throw new Error(`Job failed: ${response.statusText}`);
+        }
+        return response;
+      }
+      await new Promise((resolve) => setTimeout(resolve, pollIntervalMs));
+    }
+  }
+
+  /**
+   * Upload a file once and run OCR, correction, summary and optional PDF/audio on the server.
+   * onEvent is called as each stage finishes; resolves with all events.
+   */
+  async processNotes(file: File, options: ProcessOptions = {}, onEvent?: (event: ProcessEvent) => void): Promise<ProcessEvent[]> {
+    const formData = new FormData();
+    formData.append('file', file);
+    formData.append('pdf', String(Boolean(options.pdf)));
+    formData.append('audio', String(Boolean(options.audio)));
+    if (options.title) {
+      formData.append('title', options.title);
+    }
+    if (options.documentId) {
+      formData.append('document_id', options.documentId);
+    }
+    if (options.speechMode) {
+      formData.append('speech_mode', options.speechMode);
+    }
+    const response = await fetch(`${this.baseUrl}/notebot/process`, { method: 'POST', body: formData });
+    if (!response.ok || !response.body) {
+      throw new Error(`Processing failed: ${response.statusText}`);
+    }
+    return this.readEvents<ProcessEvent>(response.body, onEvent);
+  }
+
+  /**
+   * Read a newline-delimited JSON stream, calling onEvent for each line as it arrives
+   */
+  private async readEvents<T>(body: ReadableStream<Uint8Array>, onEvent?: (event: T) => void): Promise<T[]> {
+    const events: T[] = [];
+    const reader = body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      buffered += decoder.decode(value, { stream: !done });
+      const lines = buffered.split('\n');
+      buffered = lines.pop() ?? '';
+      for (const line of lines) {
+        if (!line.trim()) continue;
+        const event = JSON.parse(line) as T;
+        events.push(event);
+        onEvent?.(event);
+      }
+      if (done) break;
+    }
+    return events;
+  }
+
+  /**
+   * Absolute download URL of an artifact returned by processNotes
+   */
+  artifactUrl(artifact: ArtifactInfo): string {
+    return `${this.baseUrl}${artifact.url}`;
+  }
+
+  /**
+   * Open an upload session; pages added to it are OCR'd concurrently as they arrive
+   */
+  async createUploadSession(expectedPages?: number): Promise<UploadSessionStatus> {
+    const response = await fetch(`${this.baseUrl}/ocr/sessions`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(expectedPages ? { expected_pages: expectedPages } : {}),
+    });
+    if (!response.ok) {
+      throw new Error(`Upload session failed: ${response.statusText}`);
+    }
+    return await response.json();
+  }
+
+  /**
+   * Upload one page of a session; OCR starts right away
+   */
+  async addSessionPage(sessionId: string, file: File, pageIndex?: number): Promise<{ page_index: number; status: string }> {
+    const formData = new FormData();
+    formData.append('file', file);
+    if (pageIndex !== undefined) {
+      formData.append('page_index', String(pageIndex));
+    }
+    const response = await fetch(`${this.baseUrl}/ocr/sessions/${sessionId}/pages`, {
+      method: 'POST',
+      body: formData,
+    });
+    if (!response.ok) {
+      throw new Error(`Page upload failed: ${response.statusText}`);
+    }
+    return await response.json();
+  }
+
+  /**
+   * Tell the backend that no more pages will be added
+   */
+  async completeUploadSession(sessionId: string): Promise<UploadSessionStatus> {
+    const response = await fetch(`${this.baseUrl}/ocr/sessions/${sessionId}/complete`, { method: 'POST' });
+    if (!response.ok) {
+      throw new Error(`Completing upload session failed: ${response.statusText}`);
+    }
+    return await response.json();
+  }
+
+  /**
+   * Session status; with waitSeconds, the backend holds the request until the text is assembled
+   */
+  async getUploadSession(sessionId: string, waitSeconds: number = 0): Promise<UploadSessionStatus> {
+    const response = await fetch(`${this.baseUrl}/ocr/sessions/${sessionId}?wait=${waitSeconds}`);
+    if (!response.ok) {
+      throw new Error(`Upload session status failed: ${response.statusText}`);
+    }
+    return await response.json();
+  }
+
+  /**
+   * OCR several pages in parallel through an upload session and return the finished session
+   */
+  async extractTextFromPages(files: File[]): Promise<UploadSessionStatus> {
+    const session = await this.createUploadSession(files.length);
+    await Promise.all(files.map((file, index) => this.addSessionPage(session.session_id, file, index)));
+    let status = await this.completeUploadSession(session.session_id);
+    while (status.text === undefined) {
+      status = await this.getUploadSession(session.session_id, 30);
+    }
+    return status;
+  }
 }
 
 // Export a singleton instance